@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Admission Control
+Bounded priority queue in front of generation, shortest predicted job first, with load shedding
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from deadline import Deadline
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)      # served in this order
+SHORT = "short"                        # NO_SEARCH queries: no research, usually a short answer
+RESEARCH = "research"
+
+# Service time assumed for a class before any request of it has finished
+DEFAULT_SERVICE_MS = {SHORT: 2000.0, RESEARCH: 8000.0}
+
+
+def memory_percent() -> Optional[float]:
+    """System memory in use, or None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.virtual_memory().percent
+
+
+class AdmissionRejected(Exception):
+    """A request shed by admission control: answer status with Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class Ticket:
+    """One request waiting for, or holding, a generation slot"""
+    priority: str
+    kind: str
+    predicted_ms: float
+    enqueued_at: float
+    timeout: float
+    event: threading.Event = field(default_factory=threading.Event)
+    loop: Optional[asyncio.AbstractEventLoop] = None
+    future: Optional[asyncio.Future] = None
+    admitted_at: Optional[float] = None
+    released: bool = False
+
+    @property
+    def request_class(self) -> str:
+        return f"{self.priority}/{self.kind}"
+
+    def wake(self):
+        self.event.set()
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionController:
+    """Caps concurrent generations and orders the wait for a slot.
+
+    At most max_running requests generate at once; the rest wait in a queue
+    of at most max_queue. Free slots go to interactive requests before batch
+    ones and, within a priority, to the shortest predicted job: each
+    class's service time is a moving average of finished requests, so short
+    NO_SEARCH questions overtake research queries. Waiting earns credit
+    (aging_ms_per_s) so long jobs are not starved.
+
+    Requests are shed with AdmissionRejected instead of piling up:
+    - 429 when the queue is full (batch requests may use only
+      batch_queue_share of it);
+    - 503 under memory pressure (memory_percent and above, via psutil);
+    - 503 when a request waits longer than max_wait_s or its deadline.
+    """
+
+    def __init__(self, max_running: int = 16, max_queue: int = 64, batch_queue_share: float = 0.5,
+                 max_wait_s: float = 30.0, memory_percent: Optional[float] = 90.0, aging_ms_per_s: float = 1000.0):
+        self.max_running = max(1, max_running)
+        self.max_queue = max(0, max_queue)
+        self.batch_queue_share = batch_queue_share
+        self.max_wait_s = max_wait_s
+        self.memory_threshold = memory_percent
+        self.aging_ms_per_s = aging_ms_per_s
+
+        self.lock = threading.Lock()
+        self.queue: List[Ticket] = []
+        self.running = 0
+        self.service_ms: Dict[str, float] = {}
+        self.waits: Dict[str, deque] = {}
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_memory": 0,
+                      "timed_out": 0, "max_queue_depth": 0}
+
+    def predicted_ms(self, kind: str) -> float:
+        return self.service_ms.get(kind, DEFAULT_SERVICE_MS.get(kind, DEFAULT_SERVICE_MS[RESEARCH]))
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained"""
+        backlog_ms = sum(t.predicted_ms for t in self.queue) / self.max_running
+        return max(1, math.ceil(backlog_ms / 1000))
+
+    def _shed(self, priority: str):
+        """Raise AdmissionRejected if a new request of this priority must be turned away (under lock)"""
+        used = memory_percent() if self.memory_threshold is not None else None
+        if used is not None and used >= self.memory_threshold:
+            self.stats["rejected_memory"] += 1
+            raise AdmissionRejected(503, f"Server under memory pressure ({used:.0f}% used)", 5)
+
+        limit = self.max_queue if priority == INTERACTIVE else int(self.max_queue * self.batch_queue_share)
+        if self.running >= self.max_running and len(self.queue) >= limit:
+            self.stats["rejected_queue_full"] += 1
+            raise AdmissionRejected(429, f"Too many requests queued ({len(self.queue)})", self.retry_after())
+
+    def _enqueue(self, priority: str, kind: str, deadline: Optional[Deadline] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None) -> Ticket:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        timeout = self.max_wait_s
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining_ms() / 1000)
+
+        with self.lock:
+            self._shed(priority)
+            ticket = Ticket(priority, kind, self.predicted_ms(kind), time.time(), timeout, loop=loop,
+                            future=loop.create_future() if loop is not None else None)
+            if self.running < self.max_running and not self.queue:
+                self._start(ticket)
+            else:
+                self.queue.append(ticket)
+                self.stats["queued"] += 1
+                self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self.queue))
+        return ticket
+
+    def _start(self, ticket: Ticket):
+        """Give ticket a slot (under lock)"""
+        ticket.admitted_at = time.time()
+        self.running += 1
+        self.stats["admitted"] += 1
+        self.waits.setdefault(ticket.request_class, deque(maxlen=1000)).append(ticket.admitted_at - ticket.enqueued_at)
+        ticket.wake()
+
+    def _order(self, ticket: Ticket, now: float):
+        return PRIORITIES.index(ticket.priority), ticket.predicted_ms - self.aging_ms_per_s * (now - ticket.enqueued_at)
+
+    def _dispatch(self):
+        """Hand free slots to the best waiting tickets (under lock)"""
+        now = time.time()
+        while self.running < self.max_running and self.queue:
+            ticket = min(self.queue, key=lambda t: self._order(t, now))
+            self.queue.remove(ticket)
+            self._start(ticket)
+
+    def _give_up(self, ticket: Ticket):
+        """The wait timed out: leave the queue, unless a slot arrived in the meantime"""
+        with self.lock:
+            if ticket.admitted_at is not None:
+                return
+            self.queue.remove(ticket)
+            self.stats["timed_out"] += 1
+            retry_after = self.retry_after()
+        raise AdmissionRejected(503, f"Timed out after {ticket.timeout:.1f}s waiting for a generation slot", retry_after)
+
+    def acquire(self, priority: str = INTERACTIVE, kind: str = RESEARCH, deadline: Optional[Deadline] = None) -> Ticket:
+        """Block until the request holds a slot; raises AdmissionRejected when shed"""
+        ticket = self._enqueue(priority, kind, deadline)
+        if not ticket.event.wait(max(0.0, ticket.timeout)):
+            self._give_up(ticket)
+        return ticket
+
+    async def acquire_async(self, priority: str = INTERACTIVE, kind: str = RESEARCH,
+                            deadline: Optional[Deadline] = None) -> Ticket:
+        """acquire() for the event loop: waiting holds no thread"""
+        ticket = self._enqueue(priority, kind, deadline, loop=asyncio.get_running_loop())
+        try:
+            await asyncio.wait_for(ticket.future, max(0.0, ticket.timeout))
+        except asyncio.TimeoutError:
+            self._give_up(ticket)
+        except BaseException:
+            # Client went away while queued
+            self.release(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Free the ticket's slot (or queue place); safe to call more than once"""
+        with self.lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.admitted_at is None:
+                if ticket in self.queue:
+                    self.queue.remove(ticket)
+                return
+            self.running -= 1
+            service_ms = (time.time() - ticket.admitted_at) * 1000
+            previous = self.service_ms.get(ticket.kind)
+            self.service_ms[ticket.kind] = service_ms if previous is None else 0.9 * previous + 0.1 * service_ms
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, priority: str = INTERACTIVE, kind: str = RESEARCH, deadline: Optional[Deadline] = None):
+        ticket = self.acquire(priority, kind, deadline)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def admit_async(self, priority: str = INTERACTIVE, kind: str = RESEARCH, deadline: Optional[Deadline] = None):
+        ticket = await self.acquire_async(priority, kind, deadline)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def get_stats(self) -> Dict:
+        def percentile(samples: List[float], q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+
+        with self.lock:
+            waits = {}
+            for request_class, samples in self.waits.items():
+                ordered = sorted(samples)
+                waits[request_class] = {
+                    "samples": len(ordered),
+                    "wait_p50_ms": percentile(ordered, 0.50),
+                    "wait_p95_ms": percentile(ordered, 0.95),
+                }
+            return {
+                **self.stats,
+                "running": self.running,
+                "max_running": self.max_running,
+                "queue_depth": len(self.queue),
+                "queue_depth_by_class": {
+                    request_class: sum(1 for t in self.queue if t.request_class == request_class)
+                    for request_class in sorted({t.request_class for t in self.queue})
+                },
+                "max_queue": self.max_queue,
+                "predicted_service_ms": {kind: round(self.predicted_ms(kind), 1) for kind in (SHORT, RESEARCH)},
+                "queue_wait": waits,
+                "memory_percent": memory_percent(),
+            }
@@ -7,7 +7,7 @@ Created by: Rushi Bhavinkumar Soni (CEO/Founder)
 Nationality: Indian
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 import json
 import os
 import time
@@ -19,9 +19,24 @@ from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
 import hashlib
+import hmac
+import atexit
+from contextlib import nullcontext
 
-# Import TurboTalkAI from run_finetunned.py
-from run_finetunned import TurboTalkAI, SearchDecision
+from history_store import ConversationStore
+from admission import PRIORITIES, INTERACTIVE, RESEARCH, SHORT, AdmissionController, AdmissionRejected
+from startup import BackgroundStartup, StartupProfiler
+
+# Import TurboTalkAI from run_finetunned.py (this pulls in torch and transformers)
+startup_profiler = StartupProfiler()
+with startup_profiler.phase("import torch/transformers"):
+    from run_finetunned import TurboTalkAI, SearchDecision, DEVICE
+    import torch
+from werkzeug.serving import make_server
+from deadline import Deadline
+from hot_reload import ModelReloader
+from prefork import PreforkSupervisor, fork_supported, worker_threads
+from streaming import format_sse
 
 warnings.filterwarnings("ignore")
 
@@ -33,60 +48,324 @@ VERSION = "1.2.6"
 COMPANY = "Rango Productions"
 CREATOR = "Rushi Bhavinkumar Soni"
 AI_NAME = "TurboTalk AI"
+HOST = os.environ.get('TURBOTALK_HOST', '0.0.0.0')
+PORT = int(os.environ.get('TURBOTALK_PORT', '5000'))
+
+# TURBOTALK_WORKERS > 1 forks that many HTTP workers after the model loads; they share its weights
+WORKERS = max(1, int(os.environ.get('TURBOTALK_WORKERS', '1')))
+if WORKERS > 1 and (DEVICE == 'cuda' or not fork_supported()):
+    print("⚠️ Pre-fork workers need a CPU model and os.fork(); serving with one process")
+    WORKERS = 1
+worker_index = None
 
 # Initialize TurboTalk AI from run_finetunned.py
 turbotalk = TurboTalkAI()
-# Load the model when the app starts
-turbotalk.load_model()
+turbotalk.startup = startup_profiler
+
+def start_serving():
+    """Load the model (unless the pre-fork parent already did) and batch concurrent requests"""
+    if turbotalk.model is None and not turbotalk.load_model():
+        return False
+    with turbotalk.startup.phase("engine"):
+        turbotalk.start_engine()
+    turbotalk.startup.print_report()
+    return True
+
+# By default the model loads in the background so the port opens immediately;
+# /api/ready reports when it can serve (TURBOTALK_BACKGROUND_STARTUP=0 loads before binding)
+startup_task = BackgroundStartup(start_serving)
+if WORKERS > 1:
+    pass  # the pre-fork supervisor loads the model in __main__, before any thread exists
+elif os.environ.get('TURBOTALK_BACKGROUND_STARTUP', '1') != '0':
+    startup_task.start()
+else:
+    startup_task.run()
+
+def serve_worker(sock, index):
+    """Body of one pre-fork worker: start its own engine thread, then serve on the shared socket"""
+    global worker_index
+    worker_index = index
+    torch.set_num_threads(worker_threads(WORKERS))
+    if not startup_task.run():
+        raise RuntimeError(startup_task.error or 'engine failed to start')
+    print(f"👷 Worker {index} ({os.getpid()}) serving with {torch.get_num_threads()} torch threads")
+    make_server(HOST, PORT, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+def not_ready():
+    """503 with Retry-After while the model is still loading"""
+    response = jsonify({'error': 'Model is still loading', 'startup': startup_task.status()})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+# Bounded queue in front of generation: sheds load with 429/503 instead of letting latency grow
+admission = AdmissionController(
+    max_running=turbotalk.config['admission_max_running'],
+    max_queue=turbotalk.config['admission_max_queue'],
+    batch_queue_share=turbotalk.config['admission_batch_queue_share'],
+    max_wait_s=turbotalk.config['admission_max_wait_s'],
+    memory_percent=turbotalk.config['admission_memory_percent']
+)
+
+# Chat history per session: bounded in memory, appended to SQLite off the request path.
+# Pre-fork workers each hold their own session KV and response cache, and a session's
+# turns can land on any worker, so there history is read and written through SQLite
+# and a worker re-prefills a session from its stored turns when its own copy is stale.
+history = ConversationStore(
+    db_path=turbotalk.config['history_db_path'],
+    max_turns=turbotalk.config['history_max_turns'],
+    max_sessions=turbotalk.config['history_max_sessions'],
+    max_bytes=turbotalk.config['history_memory_mb'] * 1024 * 1024,
+    ttl_s=turbotalk.config['history_ttl_s'],
+    shared=WORKERS > 1 and bool(turbotalk.config['history_db_path'])
+)
+atexit.register(history.close)
+
+def stored_session_turns(session_id):
+    """(user, answer) pairs of a session as persisted by whichever worker served them"""
+    return [(turn['user'], TurboTalkAI.answer_text(turn['assistant'])) for turn in history.turns(session_id)]
+
+if history.shared:
+    turbotalk.stored_turns = stored_session_turns
+elif WORKERS > 1:
+    print("⚠️ No history_db_path: pre-fork workers won't see session turns served by other workers")
+
+def admission_class(params):
+    """(priority, kind) of a chat request: NO_SEARCH questions are short jobs"""
+    kind = SHORT
+    if params['research_mode']:
+        search_decision, _ = turbotalk.researcher.search_engine.should_search(params['message'])
+        kind = SHORT if search_decision == SearchDecision.NO_SEARCH else RESEARCH
+    return params['priority'], kind
+
+def is_cached(params):
+    """Whether the response cache already holds this request's answer (no queueing or research needed)"""
+    return turbotalk.cached_response(
+        params['message'], params['temperature'], params['research_mode'], params['session_id'],
+        params['sampling'], params['adapter'], record=False
+    ) is not None
+
+def rejected(error):
+    """Fast 429/503 with Retry-After for a request shed by admission control"""
+    response = jsonify({'error': error.reason, 'retry_after': error.retry_after})
+    response.status_code = error.status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def load_turbotalk(model_path):
+    """Build, load and start a serving instance for a checkpoint (used by hot reload)"""
+    config = dict(turbotalk.config)
+    if model_path != turbotalk.model_path:
+        # Int8 and ONNX artifacts on disk were built from the old checkpoint
+        config.update(quantized_model_path=None, onnx_model_path=None)
+    instance = TurboTalkAI(config, model_path=model_path)
+    if not instance.load_model():
+        return None
+    instance.start_engine()
+    return instance
+
+turbotalk_lock = threading.Lock()
+
+def install_turbotalk(instance):
+    """Swap in a new serving instance; requests already running keep the old one"""
+    global turbotalk
+    with turbotalk_lock:
+        instance.adopt_state(turbotalk)
+        previous, turbotalk = turbotalk, instance
+    return previous
+
+def hold_turbotalk():
+    """(instance, release) for a request: the serving instance, counted as in flight until release().
+    
+    Taken before any call on the instance, so a hot reload that swaps it
+    meanwhile waits for this request instead of shutting it down underneath.
+    """
+    with turbotalk_lock:
+        return turbotalk, turbotalk.hold()
+
+reloader = ModelReloader(load_turbotalk, install_turbotalk)
+ADMIN_TOKEN = os.environ.get('TURBOTALK_ADMIN_TOKEN')
+
+def is_admin():
+    """Admin endpoints need the X-Admin-Token header, or a local caller when no token is set"""
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+def turbotalk_adapters():
+    """Names of the LoRA adapters requests may select"""
+    return turbotalk.lora.names if turbotalk.lora else []
+
+def parse_deadline(data):
+    """Optional latency budget (deadline_ms) for this request, clamped to sane ranges"""
+    if data.get('deadline_ms') is None:
+        return None
+    return Deadline(max(100.0, min(120000.0, float(data['deadline_ms']))))
+
+def parse_sampling(data):
+    """Optional per-request sampling overrides, clamped to sane ranges"""
+    sampling = {}
+    if data.get('top_k') is not None:
+        sampling['top_k'] = max(0, int(data['top_k']))
+    if data.get('top_p') is not None:
+        sampling['top_p'] = max(0.05, min(1.0, float(data['top_p'])))
+    if data.get('repetition_penalty') is not None:
+        sampling['repetition_penalty'] = max(1.0, min(2.0, float(data['repetition_penalty'])))
+    if data.get('seed') is not None:
+        sampling['seed'] = int(data['seed'])
+    return sampling
+
+def parse_chat_request(data):
+    """Validated chat parameters (shared with the ASGI app); ValueError means a 400"""
+    user_message = (data.get('message') or '').strip()
+    if not user_message:
+        raise ValueError('No message provided')
+    
+    adapter = data.get('adapter') or None
+    if adapter and adapter not in turbotalk_adapters():
+        raise ValueError(f'Unknown adapter: {adapter}')
+    
+    priority = data.get('priority') or INTERACTIVE
+    if priority not in PRIORITIES:
+        raise ValueError(f'Unknown priority: {priority} (use one of {", ".join(PRIORITIES)})')
+    
+    return {
+        'message': user_message,
+        'research_mode': data.get('research_mode', True),
+        # Validate temperature
+        'temperature': max(0.1, min(1.0, float(data.get('temperature', 0.7)))),
+        'session_id': data.get('session_id'),
+        'sampling': parse_sampling(data),
+        'deadline': parse_deadline(data),
+        'adapter': adapter,
+        'priority': priority
+    }
+
+def generation_kwargs(params):
+    """Keyword arguments for generate_response/stream_response from parsed chat parameters"""
+    return {
+        'research_enabled': params['research_mode'],
+        'session_id': params['session_id'],
+        'sampling': params['sampling'],
+        'deadline': params['deadline'],
+        'adapter': params['adapter']
+    }
+
+def record_exchange(params, response):
+    """Store in the session's conversation history (stateless requests keep none)"""
+    if not params['session_id']:
+        return
+    history.append(params['session_id'], {
+        'user': params['message'],
+        'assistant': response,
+        'temperature': params['temperature'],
+        'timestamp': datetime.now().isoformat()
+    })
+
+def chat_payload(params, response, response_time):
+    """JSON body of a finished (non-streamed) chat request"""
+    deadline = params['deadline']
+    return {
+        'response': response,
+        'response_time': round(response_time, 2),
+        'temperature': params['temperature'],
+        'sampling': params['sampling'],
+        'deadline': deadline.report() if deadline else None,
+        'adapter': params['adapter'],
+        'research_mode': params['research_mode'],
+        'session_id': params['session_id'],
+        'timestamp': datetime.now().isoformat(),
+        'ai_identity': turbotalk.ai_identity
+    }
+
+def finish_stream_payload(params, payload):
+    """Record a finished stream and add the request details to its final event"""
+    record_exchange(params, payload['formatted_response'])
+    payload['research_mode'] = params['research_mode']
+    payload['session_id'] = params['session_id']
+    payload['timestamp'] = datetime.now().isoformat()
+    payload['ai_identity'] = turbotalk.ai_identity
+    return payload
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Chat API endpoint"""
+    if not startup_task.ready:
+        return not_ready()
     try:
-        data = request.get_json()
-        user_message = data.get('message', '').strip()
-        research_mode = data.get('research_mode', True)
-        temperature = data.get('temperature', 0.7)
-        
-        if not user_message:
-            return jsonify({'error': 'No message provided'}), 400
-        
-        # Validate temperature
-        temperature = max(0.1, min(1.0, float(temperature)))
-        
-        # Set research mode
-        turbotalk.research_enabled = research_mode
+        try:
+            params = parse_chat_request(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Generate response using run_finetunned.py's TurboTalkAI
+        # (research mode is per request so concurrent users don't clobber each other)
         start_time = time.time()
-        response = turbotalk.generate_response(user_message, temperature)
+        instance, release = hold_turbotalk()
+        try:
+            # A cached answer costs no generation, so it skips the admission queue
+            slot = nullcontext() if is_cached(params) else admission.admit(*admission_class(params), deadline=params['deadline'])
+            with slot:
+                response = instance.generate_response(params['message'], params['temperature'], **generation_kwargs(params))
+        except AdmissionRejected as e:
+            return rejected(e)
+        finally:
+            release()
         end_time = time.time()
         
-        # Store in conversation history
-        turbotalk.conversation_history.append({
-            'user': user_message,
-            'assistant': response,
-            'temperature': temperature,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        return jsonify({
-            'response': response,
-            'response_time': round(end_time - start_time, 2),
-            'temperature': temperature,
-            'research_mode': research_mode,
-            'timestamp': datetime.now().isoformat(),
-            'ai_identity': turbotalk.ai_identity
-        })
+        record_exchange(params, response)
+        return jsonify(chat_payload(params, response, end_time - start_time))
         
     except Exception as e:
         print(f"Chat error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/status')
-def status():
-    """API status endpoint"""
-    return jsonify({
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming chat API endpoint (server-sent events)"""
+    if not startup_task.ready:
+        return not_ready()
+    try:
+        params = parse_chat_request(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Held from here, not from the first chunk: the body may start after a hot reload
+    instance, release = hold_turbotalk()
+    # Wait for a slot before answering, so a shed request still gets its 429/503 status
+    try:
+        ticket = None if is_cached(params) else admission.acquire(*admission_class(params), deadline=params['deadline'])
+    except AdmissionRejected as e:
+        release()
+        return rejected(e)
+    
+    def close():
+        if ticket is not None:
+            admission.release(ticket)
+        release()
+    
+    def event_stream():
+        try:
+            events = instance.stream_response(params['message'], params['temperature'], **generation_kwargs(params))
+            for event, payload in events:
+                if event == 'done':
+                    payload = finish_stream_payload(params, payload)
+                yield format_sse(event, payload)
+        finally:
+            close()
+    
+    response = Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Also covers a client that disconnects before the body starts
+    response.call_on_close(close)
+    return response
+
+def status_payload():
+    """Body of /api/status (shared with the ASGI app)"""
+    return {
         'status': 'online',
         'ai_name': AI_NAME,
         'version': VERSION,
@@ -98,11 +377,90 @@ def status():
             'Multiple Search Engines',
             'Wikipedia Integration',
             'Quality Source Filtering',
-            'Metadata Display'
+            'Metadata Display',
+            'Continuous Batching',
+            'Token Streaming',
+            'Session KV Cache'
         ],
+        'backend': 'onnx' if turbotalk.onnx_generator else 'torch',
+        'engine': turbotalk.engine.get_stats() if turbotalk.engine else None,
+        'latency': turbotalk.get_latency_stats(),
+        'sessions': turbotalk.session_cache.get_stats(),
+        'prefix_cache': turbotalk.prefix_cache.get_stats(),
+        'speculative': turbotalk.speculative.get_stats() if turbotalk.speculative else None,
+        'prompt_lookup': turbotalk.prompt_lookup.get_stats() if turbotalk.prompt_lookup else None,
+        'compiled_generation': turbotalk.compiled.get_stats() if turbotalk.compiled else None,
+        'stopping': turbotalk.get_stop_stats(),
+        'cascade': turbotalk.router.get_stats() if turbotalk.router else None,
+        'lora': turbotalk.lora.get_stats() if turbotalk.lora else None,
+        'model_path': turbotalk.model_path,
+        'startup': {**startup_task.status(), **turbotalk.startup.report()},
+        'reload': reloader.status(),
+        'admission': admission.get_stats(),
+        'response_cache': turbotalk.response_cache.get_stats() if turbotalk.response_cache else None,
+        'research_cache': turbotalk.researcher.cache.get_stats() if turbotalk.researcher.cache else None,
+        'coalescing': {
+            'research': turbotalk.researcher.inflight.get_stats(),
+            'generation': turbotalk.generation_flight.get_stats()
+        },
+        'history': history.get_stats(),
+        'workers': {'count': WORKERS, 'index': worker_index, 'pid': os.getpid()},
         'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/api/status')
+def status():
+    """API status endpoint"""
+    return jsonify(status_payload())
+
+@app.route('/api/history/<session_id>')
+def session_history(session_id):
+    """Recent turns of one session and the memory they hold"""
+    turns = history.turns(session_id)
+    if not turns:
+        return jsonify({'error': 'Unknown session'}), 404
+    return jsonify({
+        'session_id': session_id,
+        'turns': turns,
+        'memory_bytes': history.session_nbytes(session_id)
     })
 
+@app.route('/api/health')
+def health():
+    """Liveness: the process is up and answering HTTP"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/api/ready')
+def ready():
+    """Readiness: 200 once the model is loaded, 503 until then"""
+    body = {**startup_task.status(), 'startup_timing': turbotalk.startup.report()}
+    return jsonify(body), 200 if startup_task.ready else 503
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    """Hot model reload: POST {"model_path": ...} starts one, GET reports its progress"""
+    if not is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.method == 'GET':
+        return jsonify(reloader.status())
+    
+    if not startup_task.ready:
+        return not_ready()
+    
+    if WORKERS > 1:
+        # Each worker holds its own engine; swapping one would leave the others on the old weights
+        return jsonify({'error': 'Hot reload is single-process; restart the pre-fork supervisor instead'}), 409
+    
+    data = request.get_json(silent=True) or {}
+    model_path = data.get('model_path') or turbotalk.model_path
+    if not os.path.isdir(model_path):
+        return jsonify({'error': f'Model directory not found: {model_path}'}), 400
+    
+    if not reloader.start(model_path):
+        return jsonify({'error': 'A reload is already in progress', **reloader.status()}), 409
+    return jsonify(reloader.status()), 202
+
 @app.route('/')
 def index():
     """Main page"""
@@ -132,4 +490,9 @@ if __name__ == '__main__':
     print("🔥 Features: Enhanced Search + Clean Output + Metadata Display")
     print("=" * 50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if WORKERS > 1:
+        # Load once here so every forked worker shares the same physical weights
+        if not turbotalk.load_model():
+            raise SystemExit("❌ Model failed to load")
+        raise SystemExit(PreforkSupervisor(serve_worker, WORKERS, host=HOST, port=PORT).run())
+    app.run(debug=True, host=HOST, port=PORT)
\ No newline at end of file
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI ASGI Application
+Asyncio front end for the chat API: research on the event loop, model compute on an executor
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+The Flask app in app.py stays available as the fallback (python app.py).
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.routing import Route
+
+# Request parsing, payloads and the model instance are shared with the Flask app
+import app as wsgi
+from admission import AdmissionRejected
+from async_research import AsyncResearcher
+from streaming import format_sse
+
+# Threads that run generation; a request waiting on research or in the accept queue holds none
+COMPUTE_THREADS = int(os.environ.get('TURBOTALK_COMPUTE_THREADS', '32'))
+compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix='turbotalk-compute')
+# Uses the served instance's researcher (its research cache and in-flight searches), looked up per request
+researcher = AsyncResearcher(lambda: wsgi.turbotalk.researcher)
+
+
+async def run_compute(fn, *args, **kwargs):
+    """Run blocking model work on the compute executor without blocking the event loop"""
+    return await asyncio.wrap_future(compute_executor.submit(fn, *args, **kwargs))
+
+
+def rejected(error):
+    """Fast 429/503 with Retry-After for a request shed by admission control"""
+    return JSONResponse(
+        {'error': error.reason, 'retry_after': error.retry_after},
+        status_code=error.status,
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def not_ready():
+    """503 with Retry-After while the model is still loading"""
+    return JSONResponse(
+        {'error': 'Model is still loading', 'startup': wsgi.startup_task.status()},
+        status_code=503,
+        headers={'Retry-After': '5'}
+    )
+
+
+async def read_chat_request(request):
+    """Parsed chat parameters, or the 400 response explaining why there are none"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    try:
+        params = wsgi.parse_chat_request(data if isinstance(data, dict) else {})
+    except ValueError as e:
+        return None, JSONResponse({'error': str(e)}, status_code=400)
+    # A cached answer needs neither research nor a generation slot
+    params['cached'] = await asyncio.to_thread(wsgi.is_cached, params)
+    return params, None
+
+
+async def research(params, turbotalk):
+    """Research for a request on the event loop, sized to its deadline.
+
+    None for a request expected to hit the response cache: should the entry
+    expire before generation, generate_response then researches for itself
+    instead of answering from no sources.
+    """
+    if params['cached']:
+        return None
+    return await researcher.run_research(
+        turbotalk, params['message'], params['research_mode'], params['deadline']
+    )
+
+
+async def chat(request):
+    """Chat API endpoint"""
+    if not wsgi.startup_task.ready:
+        return not_ready()
+    params, error = await read_chat_request(request)
+    if error is not None:
+        return error
+
+    # A hot reload waits for this request rather than retiring its instance underneath it
+    turbotalk, release = wsgi.hold_turbotalk()
+    try:
+        start_time = time.time()
+        gathered = await research(params, turbotalk)
+        # Research holds no slot; only model compute goes through admission control
+        slot = nullcontext() if params['cached'] else wsgi.admission.admit_async(
+            *wsgi.admission_class(params), deadline=params['deadline']
+        )
+        async with slot:
+            response = await run_compute(
+                turbotalk.generate_response, params['message'], params['temperature'],
+                research=gathered, **wsgi.generation_kwargs(params)
+            )
+        wsgi.record_exchange(params, response)
+        return JSONResponse(wsgi.chat_payload(params, response, time.time() - start_time))
+    except AdmissionRejected as e:
+        return rejected(e)
+    except Exception as e:
+        print(f"Chat error: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    finally:
+        release()
+
+
+async def chat_stream(request):
+    """Streaming chat API endpoint (server-sent events)"""
+    if not wsgi.startup_task.ready:
+        return not_ready()
+    params, error = await read_chat_request(request)
+    if error is not None:
+        return error
+
+    # Held until the stream closes, so a hot reload can't retire the instance under it
+    turbotalk, release = wsgi.hold_turbotalk()
+    # Research and the wait for a slot come before the headers, so a shed request still gets 429/503
+    try:
+        gathered = await research(params, turbotalk)
+        ticket = None if params['cached'] else await wsgi.admission.acquire_async(
+            *wsgi.admission_class(params), deadline=params['deadline']
+        )
+    except AdmissionRejected as e:
+        release()
+        return rejected(e)
+    except BaseException:
+        release()
+        raise
+
+    async def event_stream():
+        events = turbotalk.stream_response(
+            params['message'], params['temperature'], research=gathered, **wsgi.generation_kwargs(params)
+        )
+        pending = None
+        try:
+            while True:
+                # One executor hop per event; the thread blocks on the next token, the loop does not
+                pending = compute_executor.submit(next, events, None)
+                item = await asyncio.wrap_future(pending)
+                if item is None:
+                    break
+                event, payload = item
+                if event == 'done':
+                    payload = wsgi.finish_stream_payload(params, payload)
+                yield format_sse(event, payload)
+        finally:
+            # Client went away: close the generator (freeing its batch slot) once its current step returns
+            compute_executor.submit(close_stream, events, pending, ticket, release)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        background=BackgroundTask(release_stream, ticket, release)
+    )
+
+
+def release_stream(ticket, release):
+    """Give back a stream's admission slot and its hold on the serving instance (both idempotent)"""
+    if ticket is not None:
+        wsgi.admission.release(ticket)
+    release()
+
+
+def close_stream(events, pending, ticket, release):
+    if pending is not None:
+        try:
+            pending.result()
+        except Exception:
+            pass
+    events.close()
+    release_stream(ticket, release)
+
+
+async def status(request):
+    """API status endpoint"""
+    body = wsgi.status_payload()
+    body['server'] = {'type': 'asgi', 'compute_threads': COMPUTE_THREADS}
+    return JSONResponse(body)
+
+
+async def health(request):
+    """Liveness: the process is up and answering HTTP"""
+    return JSONResponse({'status': 'alive'})
+
+
+async def ready(request):
+    """Readiness: 200 once the model is loaded, 503 until then"""
+    body = {**wsgi.startup_task.status(), 'startup_timing': wsgi.turbotalk.startup.report()}
+    return JSONResponse(body, status_code=200 if wsgi.startup_task.ready else 503)
+
+
+@asynccontextmanager
+async def lifespan(application):
+    # app.py leaves loading to its pre-fork supervisor when TURBOTALK_WORKERS > 1; uvicorn has none
+    if wsgi.startup_task.state == 'starting':
+        wsgi.startup_task.start()
+    yield
+    await researcher.close()
+    compute_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/status', status),
+        Route('/api/health', health),
+        Route('/api/ready', ready),
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=wsgi.HOST, port=wsgi.PORT)
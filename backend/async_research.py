@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Async Research
+Wikipedia and web research on the asyncio event loop, for the ASGI app
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import httpx
+except ImportError:  # Without httpx, research runs the blocking researcher on a thread
+    httpx = None
+
+from deadline import Deadline
+from response_cache import normalize_prompt
+from run_finetunned import EnhancedResearcher, SearchDecision, SourceInfo
+
+WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
+
+
+class AsyncResearcher:
+    """Non-blocking twin of EnhancedResearcher.research.
+
+    Searches are httpx requests awaited on the event loop, so a waiting
+    research phase holds no thread; relevance scoring, HTML parsing and
+    source selection are EnhancedResearcher's own (parsing runs on a thread,
+    it is CPU work). Wikipedia is queried through the MediaWiki API: one
+    search call plus one batched extracts call instead of one per title.
+    """
+
+    def __init__(self, researcher: Union[EnhancedResearcher, Callable[[], EnhancedResearcher], None] = None):
+        # A callable is asked for the researcher on every use (the served instance's changes on hot reload)
+        self._researcher = researcher or EnhancedResearcher()
+        self._client = None
+
+    @property
+    def researcher(self) -> EnhancedResearcher:
+        return self._researcher() if callable(self._researcher) else self._researcher
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.researcher.USER_AGENT},
+                follow_redirects=True,
+                timeout=8.0
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def run_research(self, turbotalk, prompt: str, research_enabled: Optional[bool] = None,
+                           deadline: Optional[Deadline] = None) -> Tuple[List[SourceInfo], SearchDecision]:
+        """TurboTalkAI.run_research with the searches awaited instead of blocking"""
+        budget = turbotalk.research_budget(research_enabled, deadline)
+        if budget is None:
+            return [], SearchDecision.NO_SEARCH
+
+        max_sources, timeout = budget
+        start = time.time()
+        sources, search_decision = await self.research(prompt, max_sources=max_sources, timeout=timeout)
+        return turbotalk.trim_research(sources, max_sources, time.time() - start, timeout, deadline), search_decision
+
+    async def research(self, query: str, max_sources: int = 3,
+                       timeout: float = 15) -> Tuple[List[SourceInfo], SearchDecision]:
+        """Research a query, joining an identical search already in flight (async or threaded)"""
+        if httpx is None:
+            return await asyncio.to_thread(self.researcher.research, query, max_sources, timeout)
+
+        cached = await asyncio.to_thread(self.researcher.cached_sources, query, max_sources)
+        if cached is not None:
+            return cached
+
+        key = (normalize_prompt(query), max_sources)
+        try:
+            (sources, search_decision), shared = await self.researcher.inflight.do_async(
+                key, lambda: self.search_sources(query, max_sources, timeout), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"⏱️ Shared research still running after {timeout:.1f}s, answering without sources")
+            return [], self.researcher.search_engine.should_search(query)[0]
+        if shared:
+            print("🔗 Joined identical research already in flight")
+        return list(sources), search_decision
+
+    async def search_sources(self, query: str, max_sources: int = 3,
+                             timeout: float = 15) -> Tuple[List[SourceInfo], SearchDecision]:
+        """EnhancedResearcher.search_sources with the searches awaited concurrently"""
+        search_decision, reason = self.researcher.search_engine.should_search(query)
+        print(f"🤔 Search Decision: {search_decision.value} ({reason})")
+        if search_decision == SearchDecision.NO_SEARCH:
+            return [], search_decision
+
+        tasks = []
+        if search_decision in [SearchDecision.WIKI_ONLY, SearchDecision.BOTH]:
+            tasks.append(asyncio.create_task(self.search_wikipedia(query, max_sources)))
+        if search_decision in [SearchDecision.WEB_ONLY, SearchDecision.BOTH]:
+            tasks.append(asyncio.create_task(self.search_web(query, max_sources)))
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        sources = []
+        for task in done:
+            if not task.exception():
+                sources.extend(task.result())
+        if pending:
+            print(f"⏱️ Research timed out after {timeout:.1f}s, using {len(sources)} sources")
+
+        # Sort all sources by relevance
+        sources.sort(key=lambda x: x.relevance_score, reverse=True)
+        sources = sources[:5]
+        if not pending:
+            # Disk write off the loop; the caller has its sources already
+            asyncio.get_running_loop().run_in_executor(
+                None, self.researcher.cache_sources, query, max_sources, search_decision, sources
+            )
+        return sources, search_decision
+
+    async def search_wikipedia(self, query: str, max_sources: int = 3) -> List[SourceInfo]:
+        try:
+            response = await self.client.get(WIKIPEDIA_API, params={
+                "action": "query", "list": "search", "srsearch": query,
+                "srlimit": max_sources * 2, "format": "json"
+            })
+            titles = [hit["title"] for hit in response.json().get("query", {}).get("search", [])]
+            if not titles:
+                return []
+
+            response = await self.client.get(WIKIPEDIA_API, params={
+                "action": "query", "prop": "extracts", "exintro": 1, "explaintext": 1, "exsentences": 4,
+                "redirects": 1, "titles": "|".join(titles), "format": "json"
+            })
+            candidates: List[Dict] = []
+            for page in response.json().get("query", {}).get("pages", {}).values():
+                summary = page.get("extract", "")
+                if summary and len(summary) > 100:
+                    candidates.append({
+                        "title": page["title"],
+                        "content": summary.replace("\n", " ").strip(),
+                        "relevance": self.researcher.calculate_relevance_score(summary, query)
+                    })
+            return self.researcher.wikipedia_sources(candidates, max_sources)
+        except Exception as e:
+            print(f"✗ Wikipedia error: {str(e)[:30]}")
+            return []
+
+    async def search_web(self, query: str, max_sources: int = 3) -> List[SourceInfo]:
+        all_candidates: List[Dict] = []
+        for search_query in self.researcher.web_search_queries(query):
+            try:
+                response = await self.client.get(
+                    "https://www.google.com/search", params={"q": search_query, "num": 10}
+                )
+                if response.status_code == 200:
+                    all_candidates.extend(await asyncio.to_thread(
+                        self.researcher.extract_web_candidates, response.content, query, search_query
+                    ))
+                await asyncio.sleep(1)  # Rate limiting
+            except Exception:
+                continue
+        return self.researcher.web_sources(all_candidates, max_sources)
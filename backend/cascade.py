@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Model Cascade
+Routes small talk to a small fast model and everything else to the full checkpoint
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+SMALL_TIER = "small"
+LARGE_TIER = "large"
+
+
+class CascadeRouter:
+    """Picks the model tier for each query and tracks per-tier latency.
+
+    A query goes to the small tier when the search classifier's decision is
+    one of small_decisions (by default only "no_search": greetings, thanks,
+    small talk) and it has at most max_words words. Anything that needs
+    research goes to the large tier.
+    """
+
+    def __init__(self, max_words: int = 6, small_decisions: Sequence[str] = ("no_search",), history: int = 1000):
+        self.max_words = max_words
+        self.small_decisions = set(small_decisions)
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, deque] = {tier: deque(maxlen=history) for tier in (SMALL_TIER, LARGE_TIER)}
+        self.stats = {tier: {"requests": 0, "tokens": 0, "time": 0.0} for tier in (SMALL_TIER, LARGE_TIER)}
+
+    def route(self, query: str, search_decision: str) -> Tuple[str, str]:
+        """Return (tier, reason) for a query and its search classification"""
+        words = len(query.split())
+        if search_decision not in self.small_decisions:
+            return LARGE_TIER, f"search decision {search_decision}"
+        if words > self.max_words:
+            return LARGE_TIER, f"{words} words > {self.max_words}"
+        return SMALL_TIER, f"search decision {search_decision}, {words} words"
+
+    def record(self, tier: str, latency: float, tokens: int):
+        with self.lock:
+            self.latencies[tier].append(latency)
+            self.stats[tier]["requests"] += 1
+            self.stats[tier]["tokens"] += tokens
+            self.stats[tier]["time"] += latency
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            tiers = {}
+            for tier, stats in self.stats.items():
+                samples: List[float] = sorted(self.latencies[tier])
+                tiers[tier] = {
+                    "requests": stats["requests"],
+                    "tokens": stats["tokens"],
+                    "mean_ms": round(stats["time"] * 1000 / stats["requests"], 1) if stats["requests"] else None,
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 1) if samples else None,
+                    "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 1) if samples else None,
+                }
+            total = sum(stats["requests"] for stats in self.stats.values())
+        return {
+            "tiers": tiers,
+            "small_share": round(self.stats[SMALL_TIER]["requests"] / total, 3) if total else None,
+            "max_words": self.max_words,
+            "small_decisions": sorted(self.small_decisions),
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Request Coalescing
+Single-flight execution: concurrent identical calls share one in-flight result
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Runs one call per key at a time and fans its result out to every concurrent caller.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait for the same Future instead of repeating it.
+    Results are not kept afterwards (that is the response cache's job).
+    Thread callers use do(), event-loop callers do_async(); both share the
+    in-flight map, and a leader's exception reaches its waiters too.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[Hashable, Future] = {}
+        self.waiters: Dict[Hashable, int] = {}
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "waiter_timeouts": 0, "max_waiters": 0}
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The key's in-flight Future and whether this caller leads it"""
+        with self.lock:
+            self.stats["calls"] += 1
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                self.waiters[key] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], self.waiters[key])
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()   # a waiter giving up can't cancel it for the others
+            self.inflight[key] = future
+            self.waiters[key] = 0
+            self.stats["executions"] += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        with self.lock:
+            self.inflight.pop(key, None)
+            self.waiters.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _timed_out(self):
+        with self.lock:
+            self.stats["waiter_timeouts"] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """(result, shared): shared is True when another caller's run produced it.
+
+        A waiter raises concurrent.futures.TimeoutError after timeout seconds;
+        the leader is unaffected.
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result)
+            return result, False
+        try:
+            return future.result(timeout), True
+        except FuturesTimeoutError:
+            self._timed_out()
+            raise
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                       timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """do() for the event loop: fn returns an awaitable, waiting holds no thread"""
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = await fn()
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result)
+            return result, False
+        try:
+            # Shielded so a waiter that times out or is cancelled leaves the shared future alone
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout), True
+        except asyncio.TimeoutError:
+            self._timed_out()
+            raise
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            calls = self.stats["calls"]
+            return {
+                **self.stats,
+                "in_flight": len(self.inflight),
+                "coalescing_ratio": round(self.stats["coalesced"] / calls, 3) if calls else None,
+            }
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Compiled Generation
+model.generate over a static KV cache with a torch.compile'd forward and prompt shape buckets
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import copy
+import threading
+import time
+import torch
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+
+class StopAfterLength(StoppingCriteria):
+    """Stop at a total sequence length below max_length without shrinking the static cache"""
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor, **kwargs) -> bool:
+        return input_ids.shape[-1] >= self.length
+
+
+class CompiledGenerator:
+    """Static-cache generation whose forward pass runs as a compiled graph.
+
+    Prompts are left-padded up to the next bucket length, and the static cache
+    is always sized bucket + max_new_tokens, so every request reuses one of a
+    few graph shapes. Graphs are compiled during warmup; if compilation or a
+    later call fails, the generator disables itself and callers use eager.
+    """
+
+    def __init__(self, model, tokenizer, buckets: Sequence[int] = (128, 256, 512, 1024),
+                 max_new_tokens: int = 250, device: str = "cpu", mode: str = "reduce-overhead"):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.mode = mode
+        max_positions = getattr(model.config, "n_positions", None) or getattr(model.config, "max_position_embeddings", None)
+        self.buckets = sorted(b for b in buckets if not max_positions or b + max_new_tokens <= max_positions)
+        self.max_new_tokens = max_new_tokens
+
+        self.compiled_model = None
+        self.enabled = False
+        self.disabled_reason: Optional[str] = None
+        self.warmup_report: Dict = {}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "fallbacks": 0, "tokens_generated": 0, "decode_time": 0.0, "padding_tokens": 0}
+
+    def _build(self):
+        """Shallow copy of the model whose forward is compiled; the original stays eager"""
+        torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, 2 * len(self.buckets) + 2)
+        compiled_model = copy.copy(self.model)
+        compiled_model.forward = torch.compile(self.model.forward, mode=self.mode, dynamic=False)
+        return compiled_model
+
+    def bucket_for(self, length: int) -> Optional[int]:
+        return next((bucket for bucket in self.buckets if bucket >= length), None)
+
+    def accepts(self, length: int) -> bool:
+        return self.enabled and self.bucket_for(length) is not None
+
+    def _pad(self, input_ids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Left-pad a [1, T] prompt up to its bucket"""
+        length = input_ids.shape[1]
+        padding = self.bucket_for(length) - length
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        padded = torch.cat([input_ids.new_full((1, padding), pad_id), input_ids], dim=1)
+        attention_mask = torch.cat([input_ids.new_zeros(1, padding), input_ids.new_ones(1, length)], dim=1)
+        return padded, attention_mask
+
+    def _generate(self, model, input_ids: torch.Tensor, generation_kwargs: Dict, streamer=None,
+                  static: bool = True, num_tokens: Optional[int] = None, stopping_criteria=None):
+        padded, attention_mask = self._pad(input_ids)
+        stopping_criteria = StoppingCriteriaList(list(stopping_criteria or []))
+        if num_tokens:
+            stopping_criteria.append(StopAfterLength(padded.shape[1] + num_tokens))
+        with torch.no_grad():
+            outputs = model.generate(
+                padded,
+                attention_mask=attention_mask,
+                # Fixed total length keeps the static cache (and its graph) the same per bucket
+                max_length=padded.shape[1] + self.max_new_tokens,
+                cache_implementation="static" if static else None,
+                stopping_criteria=stopping_criteria,
+                streamer=streamer,
+                return_dict_in_generate=True,
+                **generation_kwargs
+            )
+        return outputs.sequences[0][padded.shape[1]:].tolist(), padded.shape[1] - input_ids.shape[1]
+
+    def warmup(self, generation_kwargs: Dict, num_tokens: int = 32) -> bool:
+        """Compile every bucket's graphs and measure per-token latency against eager"""
+        if not self.buckets:
+            self.disabled_reason = "no bucket fits the model's context window"
+            return False
+
+        greedy = {**generation_kwargs, "do_sample": False, "min_new_tokens": num_tokens}
+        greedy.pop("temperature", None)
+        greedy.pop("top_p", None)
+        greedy.pop("top_k", None)
+        start = time.time()
+        try:
+            self.compiled_model = self._build()
+            for bucket in self.buckets:
+                dummy = torch.full((1, bucket), self.tokenizer.eos_token_id, dtype=torch.long, device=self.device)
+                # Two passes: the first traces, the second captures the steady-state graph
+                self._generate(self.compiled_model, dummy, greedy, num_tokens=num_tokens)
+                self._generate(self.compiled_model, dummy, greedy, num_tokens=num_tokens)
+
+            probe = torch.full((1, self.buckets[0]), self.tokenizer.eos_token_id, dtype=torch.long, device=self.device)
+            eager_ms = self._time_per_token(self.model, probe, greedy, num_tokens, static=False)
+            compiled_ms = self._time_per_token(self.compiled_model, probe, greedy, num_tokens, static=True)
+        except Exception as e:
+            self.disable(f"warmup failed: {e}")
+            return False
+
+        self.warmup_report = {
+            "buckets": list(self.buckets),
+            "warmup_seconds": round(time.time() - start, 2),
+            "eager_ms_per_token": round(eager_ms, 2),
+            "compiled_ms_per_token": round(compiled_ms, 2),
+            "per_token_speedup": round(eager_ms / compiled_ms, 2) if compiled_ms else None,
+        }
+        # Compiled serving also turns off the batching engine, so it has to pay for itself
+        if compiled_ms >= eager_ms:
+            self.disable(f"compiled decode not faster than eager ({compiled_ms:.2f} vs {eager_ms:.2f} ms/token)")
+            return False
+        self.enabled = True
+        return True
+
+    def _time_per_token(self, model, probe: torch.Tensor, generation_kwargs: Dict, num_tokens: int, static: bool,
+                        repeats: int = 3) -> float:
+        """Best steady-state ms/token of a few runs"""
+        # Discarded pass at this shape: coming from another bucket can recapture graphs, which isn't decode cost
+        self._generate(model, probe, generation_kwargs, static=static, num_tokens=num_tokens)
+        best = None
+        for _ in range(repeats):
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            start = time.time()
+            new_ids, _ = self._generate(model, probe, generation_kwargs, static=static, num_tokens=num_tokens)
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            ms = (time.time() - start) * 1000 / max(1, len(new_ids))
+            best = ms if best is None else min(best, ms)
+        return best
+
+    def disable(self, reason: str):
+        self.enabled = False
+        self.disabled_reason = reason
+        self.compiled_model = None
+        print(f"⚠️ Compiled generation disabled, using eager: {reason}")
+
+    def generate(self, input_ids: torch.Tensor, generation_kwargs: Dict, streamer=None,
+                 stopping_criteria=None, max_new_tokens: Optional[int] = None) -> Optional[List[int]]:
+        """Generate new token ids, or None when the caller should fall back to eager"""
+        if not self.accepts(input_ids.shape[1]):
+            return None
+
+        # CUDA graphs replay into shared static buffers: one request at a time
+        with self.lock:
+            start = time.time()
+            try:
+                new_ids, padding = self._generate(
+                    self.compiled_model, input_ids, generation_kwargs, streamer=streamer, stopping_criteria=stopping_criteria,
+                    # A shorter budget stops early rather than resizing the static cache
+                    num_tokens=max_new_tokens if max_new_tokens and max_new_tokens < self.max_new_tokens else None
+                )
+            except Exception as e:
+                self.stats["fallbacks"] += 1
+                self.disable(f"generation failed: {e}")
+                return None
+            self.stats["requests"] += 1
+            self.stats["tokens_generated"] += len(new_ids)
+            self.stats["decode_time"] += time.time() - start
+            self.stats["padding_tokens"] += padding
+        return new_ids
+
+    def get_stats(self) -> Dict:
+        tokens = self.stats["tokens_generated"]
+        return {
+            **self.stats,
+            **self.warmup_report,
+            "enabled": self.enabled,
+            "disabled_reason": self.disabled_reason,
+            "ms_per_token": round(self.stats["decode_time"] * 1000 / tokens, 2) if tokens else None,
+        }
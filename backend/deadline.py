@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Request Deadlines
+Per-request latency budgets shared by research and generation
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import time
+from typing import Dict
+
+
+class Deadline:
+    """Latency budget for one request.
+
+    Created when the request arrives; each stage asks how much time is left,
+    shrinks its work to fit and records what it cut, so the response can say
+    which stages were trimmed.
+    """
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.start = time.time()
+        self.end = self.start + budget_ms / 1000
+        self.trimmed: Dict[str, str] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.time() - self.start) * 1000
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.end - time.time()) * 1000)
+
+    def at(self, share: float) -> float:
+        """Wall-clock time once share of what is left now has passed"""
+        return time.time() + self.remaining_ms() * share / 1000
+
+    def trim(self, stage: str, detail: str):
+        self.trimmed[stage] = detail
+
+    def report(self) -> Dict:
+        elapsed = self.elapsed_ms()
+        return {
+            "deadline_ms": self.budget_ms,
+            "elapsed_ms": round(elapsed, 1),
+            "met": elapsed <= self.budget_ms,
+            "trimmed": dict(self.trimmed),
+        }
+
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Conversation History Store
+Per-session chat history under a memory budget, persisted append-only to SQLite off the request path
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, id);
+"""
+
+
+def record_nbytes(record: Dict) -> int:
+    """Approximate memory held by one history record"""
+    return sys.getsizeof(record) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in record.items())
+
+
+@dataclass
+class SessionHistory:
+    """Recent turns of one session kept in memory"""
+    turns: Deque[Tuple[Dict, int]] = field(default_factory=deque)     # (record, nbytes)
+    nbytes: int = 0
+    last_used: float = field(default_factory=time.time)
+
+
+class ConversationStore:
+    """Chat history keyed by session_id, bounded in memory and persisted on disk.
+
+    Each session keeps its last max_turns turns in memory. Sessions idle
+    longer than ttl_s expire, and the least recently used are evicted while
+    there are more than max_sessions or they hold more than max_bytes. With a
+    db_path every turn is also queued for a background thread that appends
+    it to SQLite (WAL mode, batched commits), so persistence never blocks a
+    request; an evicted session is read back from disk on its next lookup.
+
+    shared=True is for several processes (pre-fork workers) on one db_path:
+    consecutive turns of a session can land on different workers, so SQLite
+    is the only view they agree on. append then writes through on the
+    calling thread and turns() always reads from disk; nothing is kept in
+    memory.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_turns: int = 50, max_sessions: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl_s: Optional[float] = 24 * 3600, queue_size: int = 10000,
+                 shared: bool = False):
+        if shared and not db_path:
+            raise ValueError("A shared conversation store needs a db_path")
+        self.db_path = db_path
+        self.shared = shared
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.queue_size = queue_size
+
+        self.sessions: "OrderedDict[str, SessionHistory]" = OrderedDict()
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self.stats = {"turns": 0, "trimmed_turns": 0, "expired_sessions": 0, "evicted_sessions": 0,
+                      "loaded_from_disk": 0, "persisted": 0, "dropped_writes": 0, "write_errors": 0}
+
+    def append(self, session_id: str, record: Dict):
+        """Add one turn; returns at once, the disk write happens in the background (unless shared)"""
+        if self.shared:
+            self._write_through(session_id, record)
+            return
+        nbytes = record_nbytes(record)
+        with self.lock:
+            known = session_id in self.sessions
+        if not known:
+            # An evicted session continues from its stored turns, not from empty
+            self._restore(session_id, self._load(session_id))
+        with self.lock:
+            history = self.sessions.get(session_id)
+            if history is None:
+                history = self.sessions[session_id] = SessionHistory()
+            history.turns.append((record, nbytes))
+            history.nbytes += nbytes
+            self.used_bytes += nbytes
+            while len(history.turns) > self.max_turns:
+                _, dropped = history.turns.popleft()
+                history.nbytes -= dropped
+                self.used_bytes -= dropped
+                self.stats["trimmed_turns"] += 1
+            history.last_used = time.time()
+            self.sessions.move_to_end(session_id)
+            self.stats["turns"] += 1
+            self._evict(keep=session_id)
+
+        if self.db_path:
+            self._persist(session_id, record)
+
+    def turns(self, session_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Recent turns of a session, oldest first (read back from disk if it was evicted)"""
+        if self.shared:
+            records = self._load(session_id)
+            return records[-limit:] if limit else records
+        with self.lock:
+            history = self.sessions.get(session_id)
+            if history is not None:
+                history.last_used = time.time()
+                self.sessions.move_to_end(session_id)
+                records = [record for record, _ in history.turns]
+                return records[-limit:] if limit else records
+
+        records = self._load(session_id)
+        self._restore(session_id, records)
+        return records[-limit:] if limit else records
+
+    def _restore(self, session_id: str, records: List[Dict]):
+        """Bring a session read back from disk into memory, unless it got there meanwhile"""
+        if not records:
+            return
+        with self.lock:
+            if session_id in self.sessions:
+                return
+            history = SessionHistory()
+            for record in records:
+                nbytes = record_nbytes(record)
+                history.turns.append((record, nbytes))
+                history.nbytes += nbytes
+            self.sessions[session_id] = history
+            self.used_bytes += history.nbytes
+            self.stats["loaded_from_disk"] += 1
+            self._evict(keep=session_id)
+
+    def session_nbytes(self, session_id: str) -> int:
+        with self.lock:
+            history = self.sessions.get(session_id)
+            return history.nbytes if history is not None else 0
+
+    def _evict(self, keep: Optional[str] = None):
+        """Expire idle sessions, then drop the least recently used over budget (under lock)"""
+        now = time.time()
+        while self.sessions:
+            session_id, history = next(iter(self.sessions.items()))
+            if session_id == keep:
+                break
+            expired = self.ttl_s is not None and now - history.last_used > self.ttl_s
+            if not (expired or len(self.sessions) > self.max_sessions or self.used_bytes > self.max_bytes):
+                break
+            self.sessions.popitem(last=False)
+            self.used_bytes -= history.nbytes
+            self.stats["expired_sessions" if expired else "evicted_sessions"] += 1
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _persist(self, session_id: str, record: Dict):
+        # Started lazily, and again in a forked worker: threads don't survive fork
+        if self._writer_pid != os.getpid():
+            with self.lock:
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.queue_size)
+                    self._writer = threading.Thread(target=self._write_loop, args=(self._queue,),
+                                                    name="turbotalk-history-writer", daemon=True)
+                    self._writer.start()
+                    self._writer_pid = os.getpid()
+        try:
+            self._queue.put_nowait((session_id, time.time(), json.dumps(record, default=str)))
+        except queue.Full:
+            # The disk can't keep up: lose this write rather than stall the request
+            with self.lock:
+                self.stats["dropped_writes"] += 1
+
+    def _write_through(self, session_id: str, record: Dict):
+        """Commit one turn before returning, so the worker serving the next turn reads it"""
+        with self.lock:
+            self.stats["turns"] += 1
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("INSERT INTO turns (session_id, created_at, record) VALUES (?, ?, ?)",
+                                 (session_id, time.time(), json.dumps(record, default=str)))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            with self.lock:
+                self.stats["write_errors"] += 1
+            print(f"⚠️ History write failed: {e}")
+            return
+        with self.lock:
+            self.stats["persisted"] += 1
+
+    def _write_loop(self, pending: queue.Queue):
+        conn = self._connect()
+        while True:
+            batch = [pending.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO turns (session_id, created_at, record) VALUES (?, ?, ?)", rows)
+                    with self.lock:
+                        self.stats["persisted"] += len(rows)
+                except sqlite3.Error as e:
+                    with self.lock:
+                        self.stats["write_errors"] += len(rows)
+                    print(f"⚠️ History write failed: {e}")
+            if stop:
+                conn.close()
+                return
+
+    def _load(self, session_id: str) -> List[Dict]:
+        if not self.db_path or not os.path.exists(self.db_path):
+            return []
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT record FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (session_id, self.max_turns)
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ History read failed: {e}")
+            return []
+        return [json.loads(record) for (record,) in reversed(rows)]
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued writes and stop the writer thread"""
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self._queue.put(None)
+            self._writer.join(timeout)
+            self._writer = self._writer_pid = None
+
+    def get_stats(self, top: int = 10) -> Dict:
+        with self.lock:
+            largest = sorted(self.sessions.items(), key=lambda item: item[1].nbytes, reverse=True)[:top]
+            sessions = len(self.sessions)
+            return {
+                **self.stats,
+                "sessions": sessions,
+                "memory_used_mb": round(self.used_bytes / (1024 * 1024), 3),
+                "memory_budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "avg_session_kb": round(self.used_bytes / 1024 / sessions, 2) if sessions else None,
+                "largest_sessions_kb": {
+                    # Truncated: session ids act as bearer tokens for a conversation
+                    session_id[:8]: {"turns": len(history.turns), "kb": round(history.nbytes / 1024, 2)}
+                    for session_id, history in largest
+                },
+                "pending_writes": self._queue.qsize() if self._queue is not None else 0,
+                "db_path": self.db_path,
+                "shared": self.shared,
+            }
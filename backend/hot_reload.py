@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Hot Reload
+Load a new checkpoint in the background and swap it in without dropping requests
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import gc
+import threading
+import time
+import torch
+from typing import Callable, Dict, Optional
+
+
+def process_rss_mb() -> Optional[float]:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class MemoryWatermark:
+    """Samples process RSS (and CUDA allocations) in the background to catch the peak"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_rss_mb = process_rss_mb()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        if self.peak_rss_mb is not None:
+            self._thread = threading.Thread(target=self._sample, name="turbotalk-memory-watermark", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, process_rss_mb())
+
+    def report(self) -> Dict:
+        return {
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            "peak_cuda_mb": round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1) if torch.cuda.is_available() else None,
+        }
+
+
+class ModelReloader:
+    """Replaces the serving model without downtime.
+
+    load(model_path) builds, loads and starts a new serving instance in a
+    background thread (returning None on failure). After warming it up,
+    install(new) swaps it in and returns the old instance; requests already
+    running keep the old one, which is shut down once in_flight() reaches
+    zero (or drain_timeout passes) so its weights can be freed.
+    """
+
+    def __init__(self, load: Callable[[str], Optional[object]], install: Callable[[object], object],
+                 drain_timeout: float = 300):
+        self.load = load
+        self.install = install
+        self.drain_timeout = drain_timeout
+        self.lock = threading.Lock()
+        self.state = "idle"
+        self.model_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.report: Dict = {}
+        self.reloads = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, model_path: str) -> bool:
+        """Begin reloading from model_path; False if a reload is already running"""
+        with self.lock:
+            if self.running:
+                return False
+            self.state, self.model_path, self.error, self.report = "loading", model_path, None, {}
+            self._thread = threading.Thread(target=self._run, args=(model_path,), name="turbotalk-reload", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, model_path: str):
+        report = {"model_path": model_path, "rss_before_mb": _round(process_rss_mb())}
+        start = time.time()
+        new, installed = None, False
+        try:
+            with MemoryWatermark() as watermark:
+                new = self.load(model_path)
+                if new is None:
+                    raise RuntimeError(f"Could not load model from {model_path}")
+                report["load_seconds"] = round(time.time() - start, 2)
+
+                self.state = "warming"
+                report["warmup_ms"] = round(new.warmup(), 1)
+
+                self.state = "draining"
+                swapped_at = time.time()
+                old = self.install(new)
+                installed = True
+                report["in_flight_at_swap"] = old.in_flight() if old is not None else 0
+
+                # Requests that started on the old model finish there
+                while old is not None and old.in_flight() and time.time() - swapped_at < self.drain_timeout:
+                    time.sleep(0.1)
+                report["drain_seconds"] = round(time.time() - swapped_at, 2)
+                if old is not None:
+                    report["abandoned_requests"] = old.in_flight()
+                    old.shutdown()
+                    del old
+            report.update(watermark.report())
+
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            report["rss_after_mb"] = _round(process_rss_mb())
+            report["total_seconds"] = round(time.time() - start, 2)
+            self.state = "idle"
+            self.reloads += 1
+            print(f"♻️ Model reloaded from {model_path} in {report['total_seconds']}s")
+        except Exception as e:
+            self.state, self.error = "failed", str(e)
+            if new is not None and not installed:
+                new.shutdown()
+            report["total_seconds"] = round(time.time() - start, 2)
+            print(f"❌ Model reload failed: {e}")
+        finally:
+            self.report = report
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "model_path": self.model_path,
+            "error": self.error,
+            "reloads": self.reloads,
+            "report": dict(self.report),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
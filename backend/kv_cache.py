@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI KV-Cache Utilities
+Helpers for slicing, padding and batching past-key-values during serving
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import torch
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # Older transformers only understand legacy tuples
+    DynamicCache = None
+
+# Legacy layout: one (key, value) pair per layer, each [batch, heads, seq_len, head_dim]
+LegacyCache = Tuple[Tuple[torch.Tensor, torch.Tensor], ...]
+
+
+def to_legacy_cache(past_key_values) -> Optional[LegacyCache]:
+    """Convert whatever the model returned into the legacy tuple layout"""
+    if past_key_values is None:
+        return None
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    if hasattr(past_key_values, "layers"):
+        # transformers 5.x caches hold per-layer objects and dropped to_legacy_cache
+        return tuple((layer.keys, layer.values) for layer in past_key_values.layers)
+    return tuple((layer[0], layer[1]) for layer in past_key_values)
+
+
+def from_legacy_cache(legacy: Optional[LegacyCache]):
+    """Wrap a legacy tuple cache in the cache class the installed transformers expects"""
+    if legacy is None:
+        return None
+    if DynamicCache is None:
+        return legacy
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(legacy)
+    # transformers 5.x rejects tuples and has no from_legacy_cache: fill the cache layer by layer
+    cache = DynamicCache()
+    for layer_idx, (key, value) in enumerate(legacy):
+        cache.update(key, value, layer_idx)
+    return cache
+
+
+def cache_seq_len(legacy: Optional[LegacyCache]) -> int:
+    """Number of positions held in a cache"""
+    if not legacy:
+        return 0
+    return legacy[0][0].shape[2]
+
+
+def cache_nbytes(legacy: Optional[LegacyCache]) -> int:
+    """Memory footprint of a cache in bytes"""
+    if not legacy:
+        return 0
+    return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in legacy)
+
+
+def slice_cache_row(legacy: LegacyCache, row: int, start: int = 0, end: Optional[int] = None) -> LegacyCache:
+    """Take one batch row (optionally dropping left padding) as a view"""
+    return tuple(
+        (k[row:row + 1, :, start:end, :], v[row:row + 1, :, start:end, :])
+        for k, v in legacy
+    )
+
+
+def clone_cache(legacy: Optional[LegacyCache]) -> Optional[LegacyCache]:
+    """Detach a cache from any larger batch tensor it is a view of"""
+    if legacy is None:
+        return None
+    return tuple((k.clone(), v.clone()) for k, v in legacy)
+
+
+def pad_and_stack_caches(caches: List[LegacyCache], max_len: int) -> LegacyCache:
+    """Left-pad single-row caches to max_len and stack them into one batch"""
+    stacked = []
+    for layer in range(len(caches[0])):
+        keys, values = [], []
+        for cache in caches:
+            k, v = cache[layer]
+            pad = max_len - k.shape[2]
+            if pad > 0:
+                k = torch.cat([k.new_zeros(k.shape[0], k.shape[1], pad, k.shape[3]), k], dim=2)
+                v = torch.cat([v.new_zeros(v.shape[0], v.shape[1], pad, v.shape[3]), v], dim=2)
+            keys.append(k)
+            values.append(v)
+        stacked.append((torch.cat(keys, dim=0), torch.cat(values, dim=0)))
+    return tuple(stacked)
+
+
+@dataclass
+class SessionState:
+    """KV state and recent turns of one conversation"""
+    token_ids: List[int] = field(default_factory=list)       # ids covered by past_key_values
+    past_key_values: Optional[LegacyCache] = None
+    pending_ids: List[int] = field(default_factory=list)     # generated but not yet fed back
+    turns: List[Tuple[str, str]] = field(default_factory=list)
+    adapter: Optional[str] = None                           # LoRA adapter the KV was computed with
+    last_used: float = field(default_factory=time.time)
+
+    @property
+    def nbytes(self) -> int:
+        return cache_nbytes(self.past_key_values)
+
+
+class SessionKVStore:
+    """Per-session past-key-values kept between turns under a memory budget.
+
+    When the budget is exceeded the least recently used sessions lose their KV
+    tensors but keep their recent turns, so they can be rebuilt by re-prefill.
+    """
+
+    def __init__(self, max_bytes: int, max_sessions: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "kv_evictions": 0, "session_evictions": 0}
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None or state.past_key_values is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+            if state is not None:
+                self.sessions.move_to_end(session_id)
+                state.last_used = time.time()
+            return state
+
+    def peek(self, session_id: str) -> Optional[SessionState]:
+        """Look up a session without touching LRU order or hit statistics"""
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def put(self, session_id: str, state: SessionState):
+        with self.lock:
+            state.last_used = time.time()
+            self.sessions[session_id] = state
+            self.sessions.move_to_end(session_id)
+            self._evict()
+
+    def drop(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def memory_used(self) -> int:
+        return sum(state.nbytes for state in self.sessions.values())
+
+    def snapshot_turns(self) -> "OrderedDict[str, List[Tuple[str, str]]]":
+        """Recent turns of every session in LRU order, without their KV"""
+        with self.lock:
+            return OrderedDict((session_id, list(state.turns)) for session_id, state in self.sessions.items())
+
+    def _evict(self):
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.stats["session_evictions"] += 1
+
+        used = self.memory_used()
+        for state in self.sessions.values():
+            if used <= self.max_bytes:
+                break
+            if state.past_key_values is not None:
+                used -= state.nbytes
+                state.past_key_values = None
+                state.token_ids = []
+                state.pending_ids = []
+                self.stats["kv_evictions"] += 1
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                **self.stats,
+                "sessions": len(self.sessions),
+                "sessions_with_kv": sum(1 for s in self.sessions.values() if s.past_key_values is not None),
+                "memory_used_mb": round(self.memory_used() / (1024 * 1024), 2),
+                "memory_budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
+
+
+class PrefixKVCache:
+    """KV state of the constant system-prompt prefix, prefilled once.
+
+    Requests whose token ids start with the cached prefix reuse the same
+    (read-only) tensors, so forking the prefix is free. The cache is keyed by
+    the prefix text and rebuilt whenever that text changes.
+    """
+
+    def __init__(self):
+        self.key: Optional[str] = None
+        self.token_ids: List[int] = []
+        self.past_key_values: Optional[LegacyCache] = None
+        self.lock = threading.Lock()
+        self.stats = {"builds": 0, "hits": 0, "misses": 0, "tokens_saved": 0}
+
+    def build(self, model, tokenizer, prefix_text: str, device: str = "cpu"):
+        """Prefill prefix_text and keep its KV state"""
+        token_ids = tokenizer.encode(prefix_text)
+        with torch.no_grad():
+            outputs = model(input_ids=torch.tensor([token_ids], device=device), use_cache=True)
+
+        with self.lock:
+            self.key = prefix_text
+            self.token_ids = token_ids
+            self.past_key_values = to_legacy_cache(outputs.past_key_values)
+            self.stats["builds"] += 1
+
+    def is_current(self, prefix_text: str) -> bool:
+        return self.past_key_values is not None and self.key == prefix_text
+
+    def match(self, input_ids: List[int]) -> Optional[LegacyCache]:
+        """Return the shared prefix cache if input_ids extend the cached prefix"""
+        with self.lock:
+            prefix_len = len(self.token_ids)
+            if (self.past_key_values is not None and len(input_ids) > prefix_len
+                    and input_ids[:prefix_len] == self.token_ids):
+                self.stats["hits"] += 1
+                self.stats["tokens_saved"] += prefix_len
+                return self.past_key_values
+            self.stats["misses"] += 1
+            return None
+
+    def invalidate(self):
+        with self.lock:
+            self.key = None
+            self.token_ids = []
+            self.past_key_values = None
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "prefix_tokens": len(self.token_ids)}
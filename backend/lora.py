@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Multi-LoRA Serving
+One shared base model with many LoRA adapters, selected per request and batched together
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import torch
+import torch.nn as nn
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from transformers.pytorch_utils import Conv1D
+except ImportError:  # Older transformers keep it in modeling_utils
+    from transformers.modeling_utils import Conv1D
+
+ADAPTER_CONFIG_NAME = "adapter_config.json"
+ADAPTER_WEIGHTS_NAMES = ("adapter_model.safetensors", "adapter_model.bin")
+# PEFT key layout: base_model.model.<module>.lora_A[.<adapter name>].weight
+_LORA_KEY = re.compile(r"^(?:base_model\.model\.)?(.+)\.lora_([AB])(?:\.[^.]+)?\.weight$")
+
+
+def is_adapter_dir(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, ADAPTER_CONFIG_NAME))
+
+
+def _is_linear(module: nn.Module) -> bool:
+    return isinstance(module, (nn.Linear, Conv1D, torch.ao.nn.quantized.dynamic.Linear))
+
+
+def _matches(name: str, target_modules) -> bool:
+    """PEFT's target rule: a regex string must match the full name, list entries match its tail"""
+    if isinstance(target_modules, str):
+        return re.fullmatch(target_modules, name) is not None
+    return any(name == target or name.endswith("." + target) for target in target_modules)
+
+
+@dataclass
+class LoraAdapter:
+    """Low-rank A/B pairs of one adapter, keyed by base-model module name"""
+    name: str
+    scale: float
+    weights: Dict[str, Tuple[torch.Tensor, torch.Tensor]] = field(repr=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.numel() * a.element_size() + b.numel() * b.element_size() for a, b in self.weights.values())
+
+
+def load_adapter(name: str, path: str, device: str = "cpu", dtype: torch.dtype = torch.float32) -> LoraAdapter:
+    """Read a PEFT adapter directory (as written by finetune.py's trainer.save_model)"""
+    with open(os.path.join(path, ADAPTER_CONFIG_NAME)) as f:
+        config = json.load(f)
+
+    weights_path = next((os.path.join(path, n) for n in ADAPTER_WEIGHTS_NAMES if os.path.exists(os.path.join(path, n))), None)
+    if weights_path is None:
+        raise FileNotFoundError(f"No adapter weights in {path}")
+    if weights_path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+        state_dict = load_file(weights_path)
+    else:
+        state_dict = torch.load(weights_path, map_location="cpu", weights_only=True)
+
+    pairs: Dict[str, Dict[str, torch.Tensor]] = {}
+    for key, tensor in state_dict.items():
+        match = _LORA_KEY.match(key)
+        if match:
+            pairs.setdefault(match.group(1), {})[match.group(2)] = tensor.to(device=device, dtype=dtype)
+
+    weights = {module: (pair["A"], pair["B"]) for module, pair in pairs.items() if "A" in pair and "B" in pair}
+    if not weights:
+        raise ValueError(f"Adapter {name} at {path} holds no LoRA weights")
+    return LoraAdapter(name=name, scale=config.get("lora_alpha", config["r"]) / config["r"], weights=weights)
+
+
+class MultiLoraLinear(nn.Module):
+    """A base projection plus the LoRA delta of whichever adapters the current batch uses.
+
+    Rows are grouped by adapter, so a batch mixing adapters (and rows with
+    none) still runs one base GEMM plus one small low-rank product per adapter.
+    """
+
+    def __init__(self, base: nn.Module, name: str, manager: "LoraManager"):
+        super().__init__()
+        self.base = base
+        self.name = name
+        self.manager = manager
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        out = self.base(x)
+        for adapter, rows in self.manager.active():
+            pair = adapter.weights.get(self.name)
+            if pair is None:
+                continue
+            lora_a, lora_b = pair
+            if rows is None:
+                out = out + (x @ lora_a.t() @ lora_b.t()) * adapter.scale
+            else:
+                delta = (x.index_select(0, rows) @ lora_a.t() @ lora_b.t()) * adapter.scale
+                out = out.index_add(0, rows, delta.to(out.dtype))
+        return out
+
+
+class LoraManager:
+    """Registered adapters over one base model, with weights cached under an LRU budget.
+
+    Registering an adapter wraps the base modules it targets (weights stay
+    shared); its A/B matrices are loaded on first use and evicted least
+    recently used once the cache exceeds max_bytes. activate() applies an
+    adapter per batch row to forward passes run by the calling thread.
+    """
+
+    def __init__(self, model: nn.Module, max_bytes: int = 256 * 1024 * 1024, device: str = "cpu"):
+        self.model = model
+        self.max_bytes = max_bytes
+        self.device = device
+        self.dtype = next(model.parameters()).dtype
+        self.paths: Dict[str, str] = {}
+        self.cache: "OrderedDict[str, LoraAdapter]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0, "load_time": 0.0}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.paths)
+
+    def register(self, name: str, path: str):
+        """Make an adapter selectable and wrap the base modules it targets"""
+        if not is_adapter_dir(path):
+            raise FileNotFoundError(f"No {ADAPTER_CONFIG_NAME} in {path}")
+        with open(os.path.join(path, ADAPTER_CONFIG_NAME)) as f:
+            target_modules = json.load(f).get("target_modules") or []
+
+        modules = list(self.model.named_modules())
+        already = {n for n, m in modules if isinstance(m, MultiLoraLinear)}
+        wrapped = 0
+        for module_name, module in modules:
+            if module_name.rpartition(".")[0] in already:
+                continue  # the base projection inside a wrapper
+            if _is_linear(module) and _matches(module_name, target_modules):
+                parent_name, _, child_name = module_name.rpartition(".")
+                parent = self.model.get_submodule(parent_name) if parent_name else self.model
+                setattr(parent, child_name, MultiLoraLinear(module, module_name, self))
+                wrapped += 1
+            elif isinstance(module, MultiLoraLinear) and _matches(module_name, target_modules):
+                wrapped += 1
+        if not wrapped:
+            raise ValueError(f"Adapter {name} targets no module of the base model")
+        self.paths[name] = path
+
+    def get(self, name: str, protect: Sequence[str] = ()) -> LoraAdapter:
+        """Adapter weights, loading them (and evicting others) on a cache miss"""
+        with self.lock:
+            adapter = self.cache.get(name)
+            if adapter is not None:
+                self.cache.move_to_end(name)
+                self.stats["hits"] += 1
+                return adapter
+
+            if name not in self.paths:
+                raise KeyError(f"Unknown LoRA adapter: {name}")
+            start = time.time()
+            adapter = load_adapter(name, self.paths[name], device=self.device, dtype=self.dtype)
+            self.stats["loads"] += 1
+            self.stats["load_time"] += time.time() - start
+            self.cache[name] = adapter
+
+            # Never evict the adapter just loaded or one the caller's batch still needs
+            keep = set(protect) | {name}
+            for other in list(self.cache):
+                if self.cached_bytes() <= self.max_bytes:
+                    break
+                if other not in keep:
+                    del self.cache[other]
+                    self.stats["evictions"] += 1
+            return adapter
+
+    def cached_bytes(self) -> int:
+        return sum(adapter.nbytes for adapter in self.cache.values())
+
+    @contextmanager
+    def activate(self, adapters: Sequence[Optional[str]]):
+        """Apply adapters[i] to batch row i in this thread's forward passes (None: base model)"""
+        groups: Dict[str, List[int]] = {}
+        for row, name in enumerate(adapters):
+            if name:
+                groups.setdefault(name, []).append(row)
+
+        active = []
+        for name, rows in groups.items():
+            adapter = self.get(name, protect=list(groups))
+            index = None if len(rows) == len(adapters) else torch.tensor(rows, device=self.device)
+            active.append((adapter, index))
+
+        self._local.active = active
+        try:
+            yield
+        finally:
+            self._local.active = []
+
+    def active(self) -> List[Tuple[LoraAdapter, Optional[torch.Tensor]]]:
+        return getattr(self._local, "active", [])
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                **self.stats,
+                "load_time": round(self.stats["load_time"], 3),
+                "adapters": self.names,
+                "cached": list(self.cache),
+                "cached_mb": round(self.cached_bytes() / (1024 * 1024), 1),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            }
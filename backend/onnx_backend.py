@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI ONNX Runtime Backend
+Exports a checkpoint to an ONNX decoder with KV-cache inputs/outputs and serves it on CPU
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import inspect
+import os
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from typing import Callable, Dict, List, Optional, Tuple
+
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+from transformers.modeling_outputs import CausalLMOutputWithPast
+
+from kv_cache import LegacyCache, cache_seq_len, from_legacy_cache, slice_cache_row, to_legacy_cache
+from sampling import SamplingParams, warp_batch
+
+try:
+    import onnxruntime as ort
+except ImportError:  # Only needed when the ONNX backend is selected
+    ort = None
+
+CHECKPOINT_PATH = r"D:\ttm\model\3bmodel\t\M\TTM\turbotalk_v1.2.6_backup_20250608_172624"
+ONNX_OUTPUT_PATH = r"D:\ttm\model\3bmodel\t\M\TTM\turbotalk_onnx"
+ONNX_MODEL_NAME = "decoder_with_past.onnx"
+
+COMPARISON_PROMPTS = [
+    "Hello, how are you?",
+    "What is artificial intelligence?",
+    "Explain quantum computing in simple terms:",
+]
+
+
+def _model_dims(config) -> Tuple[int, int, int]:
+    num_layers = getattr(config, "n_layer", None) or config.num_hidden_layers
+    num_heads = getattr(config, "n_head", None) or config.num_attention_heads
+    hidden_size = getattr(config, "n_embd", None) or config.hidden_size
+    return num_layers, num_heads, hidden_size // num_heads
+
+
+class _DecoderWithPast(nn.Module):
+    """Flat-tensor wrapper so the KV cache can be graph inputs and outputs"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.num_layers = _model_dims(model.config)[0]
+
+    def forward(self, input_ids, attention_mask, position_ids, *past):
+        legacy = tuple((past[2 * i], past[2 * i + 1]) for i in range(self.num_layers))
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=from_legacy_cache(legacy),
+            use_cache=True,
+        )
+        present = to_legacy_cache(outputs.past_key_values)
+        return (outputs.logits,) + tuple(tensor for layer in present for tensor in layer)
+
+
+def is_onnx_export(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, ONNX_MODEL_NAME))
+
+
+def export_onnx(model, output_dir: str, opset: int = 17):
+    """Export one decoder graph that handles prefill (empty past) and decode steps"""
+    model = model.float().eval()
+    num_layers, num_heads, head_dim = _model_dims(model.config)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Dummy shapes only need to be non-trivial; every axis below is dynamic
+    batch, seq, past_len = 1, 2, 3
+    input_ids = torch.ones(batch, seq, dtype=torch.long)
+    attention_mask = torch.ones(batch, past_len + seq, dtype=torch.long)
+    position_ids = torch.arange(past_len, past_len + seq).unsqueeze(0)
+    past = [torch.zeros(batch, num_heads, past_len, head_dim) for _ in range(2 * num_layers)]
+
+    past_names = [f"past_{kind}_{i}" for i in range(num_layers) for kind in ("key", "value")]
+    present_names = [f"present_{kind}_{i}" for i in range(num_layers) for kind in ("key", "value")]
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "seq"},
+        "attention_mask": {0: "batch", 1: "total_seq"},
+        "position_ids": {0: "batch", 1: "seq"},
+        "logits": {0: "batch", 1: "seq"},
+        **{name: {0: "batch", 2: "past_seq"} for name in past_names},
+        **{name: {0: "batch", 2: "total_seq"} for name in present_names},
+    }
+    # Newer torch defaults to the dynamo exporter, which rejects dynamic_axes; older torch has no switch
+    exporter = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _DecoderWithPast(model),
+            (input_ids, attention_mask, position_ids, *past),
+            os.path.join(output_dir, ONNX_MODEL_NAME),
+            input_names=["input_ids", "attention_mask", "position_ids"] + past_names,
+            output_names=["logits"] + present_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **exporter
+        )
+    model.config.save_pretrained(output_dir)
+
+
+def export_checkpoint(checkpoint_path: str, output_dir: str, **from_pretrained_kwargs):
+    """Load a fine-tuned checkpoint in float32 and export it"""
+    model = AutoModelForCausalLM.from_pretrained(checkpoint_path, torch_dtype=torch.float32, **from_pretrained_kwargs)
+    export_onnx(model, output_dir)
+
+
+class OnnxCausalLM:
+    """ONNX Runtime decoder with the slice of the HF causal-LM call interface the serving code uses.
+
+    Accepts and returns legacy KV tuples of torch tensors, so the batching
+    engine, prefix cache and session cache work on it unchanged.
+    """
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        if ort is None:
+            raise ImportError("onnxruntime is required for the ONNX backend (pip install onnxruntime)")
+        self.config = AutoConfig.from_pretrained(path)
+        self.num_layers, self.num_heads, self.head_dim = _model_dims(self.config)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            os.path.join(path, ONNX_MODEL_NAME), options, providers=["CPUExecutionProvider"]
+        )
+
+    def __call__(self, *args, **kwargs) -> CausalLMOutputWithPast:
+        return self.forward(*args, **kwargs)
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None,
+                position_ids: Optional[torch.Tensor] = None, past_key_values=None,
+                use_cache: bool = True, **kwargs) -> CausalLMOutputWithPast:
+        past = to_legacy_cache(past_key_values)
+        batch, seq = input_ids.shape
+        past_len = cache_seq_len(past)
+        if attention_mask is None:
+            attention_mask = torch.ones(batch, past_len + seq, dtype=torch.long)
+        if position_ids is None:
+            position_ids = torch.arange(past_len, past_len + seq).unsqueeze(0).expand(batch, -1)
+
+        feeds = {
+            "input_ids": input_ids.cpu().numpy().astype(np.int64),
+            "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+            "position_ids": position_ids.cpu().numpy().astype(np.int64),
+        }
+        empty = np.zeros((batch, self.num_heads, 0, self.head_dim), dtype=np.float32)
+        for i in range(self.num_layers):
+            key, value = past[i] if past else (None, None)
+            feeds[f"past_key_{i}"] = np.ascontiguousarray(key.float().cpu().numpy()) if key is not None else empty
+            feeds[f"past_value_{i}"] = np.ascontiguousarray(value.float().cpu().numpy()) if value is not None else empty
+
+        outputs = self.session.run(None, feeds)
+        present = tuple(
+            (torch.from_numpy(outputs[1 + 2 * i]), torch.from_numpy(outputs[2 + 2 * i]))
+            for i in range(self.num_layers)
+        )
+        return CausalLMOutputWithPast(logits=torch.from_numpy(outputs[0]), past_key_values=present)
+
+
+class OnnxGenerator:
+    """Sampling loop over an OnnxCausalLM for the single-stream path (model.generate's role)"""
+
+    def __init__(self, model: OnnxCausalLM, tokenizer, top_k: int = 50, top_p: float = 0.9,
+                 repetition_penalty: float = 1.1):
+        self.model = model
+        self.eos_token_id = tokenizer.eos_token_id
+        self.top_k = top_k
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+
+    def generate(self, input_ids: List[int], temperature: float = 0.7, max_new_tokens: int = 250,
+                 past_key_values: Optional[LegacyCache] = None,
+                 on_token: Optional[Callable[[int], bool]] = None,
+                 sampling: Optional[SamplingParams] = None) -> Tuple[List[int], LegacyCache]:
+        """Same contract as SpeculativeDecoder.generate: new ids plus a cache for input + new[:-1]"""
+        sampling = sampling or SamplingParams(temperature, self.top_k, self.top_p, self.repetition_penalty)
+        generator = sampling.make_generator()
+        cached_len = min(cache_seq_len(past_key_values), len(input_ids) - 1)
+        past = slice_cache_row(past_key_values, 0, 0, cached_len) if cached_len else None
+        feed = input_ids[cached_len:]
+
+        generated: List[int] = []
+        while True:
+            outputs = self.model(input_ids=torch.tensor([feed]), past_key_values=past)
+            past = outputs.past_key_values
+            context = input_ids + generated
+            probs = warp_batch(outputs.logits[0, -1:], [context], [sampling])[0]
+            token = int(torch.multinomial(probs, 1, generator=generator).item())
+            generated.append(token)
+            keep_going = on_token(token) if on_token is not None else True
+            if token == self.eos_token_id or len(generated) >= max_new_tokens or keep_going is False:
+                return generated, past
+            feed = [token]
+
+
+# ----------------------------------------------------------------------
+# Parity and latency comparison
+# ----------------------------------------------------------------------
+
+def check_parity(torch_model, onnx_model: OnnxCausalLM, tokenizer, prompts: List[str], num_tokens: int = 20) -> Dict:
+    """Max logit difference over prefill + cached decode, and greedy token agreement"""
+    max_diff, matched, total = 0.0, 0, 0
+    for prompt in prompts:
+        input_ids = tokenizer(prompt, return_tensors="pt").input_ids
+        torch_past = onnx_past = None
+        torch_ids = onnx_ids = input_ids
+        for _ in range(num_tokens):
+            with torch.no_grad():
+                torch_out = torch_model(input_ids=torch_ids, past_key_values=from_legacy_cache(torch_past), use_cache=True)
+            onnx_out = onnx_model(input_ids=onnx_ids, past_key_values=onnx_past)
+            max_diff = max(max_diff, (torch_out.logits[0, -1].float() - onnx_out.logits[0, -1]).abs().max().item())
+
+            torch_token = int(torch_out.logits[0, -1].argmax())
+            onnx_token = int(onnx_out.logits[0, -1].argmax())
+            matched += torch_token == onnx_token
+            total += 1
+
+            torch_past = to_legacy_cache(torch_out.past_key_values)
+            onnx_past = onnx_out.past_key_values
+            # Both continue from the PyTorch token so one early mismatch doesn't cascade
+            torch_ids = onnx_ids = torch.tensor([[torch_token]])
+    return {"max_logit_diff": round(max_diff, 6), "greedy_token_match": round(matched / total, 4) if total else None}
+
+
+def _time_decode(model, tokenizer, prompts: List[str], num_tokens: int) -> Dict:
+    prefill_time, decode_time, decoded = 0.0, 0.0, 0
+    for prompt in prompts:
+        input_ids = tokenizer(prompt, return_tensors="pt").input_ids
+        with torch.no_grad():
+            start = time.time()
+            outputs = model(input_ids=input_ids, use_cache=True)
+            prefill_time += time.time() - start
+
+            start = time.time()
+            for _ in range(num_tokens):
+                token = outputs.logits[:, -1:].argmax(dim=-1)
+                outputs = model(input_ids=token, past_key_values=outputs.past_key_values, use_cache=True)
+            decode_time += time.time() - start
+            decoded += num_tokens
+    return {
+        "prefill_ms": round(prefill_time * 1000 / len(prompts), 2),
+        "ms_per_token": round(decode_time * 1000 / decoded, 2),
+        "tokens_per_second": round(decoded / decode_time, 2) if decode_time else None,
+    }
+
+
+def compare_backends(torch_model, onnx_model: OnnxCausalLM, tokenizer, prompts: List[str], num_tokens: int = 32) -> Dict:
+    """Side-by-side greedy prefill/decode latency of the PyTorch and ONNX Runtime paths"""
+    report = {
+        "pytorch": _time_decode(torch_model, tokenizer, prompts, num_tokens),
+        "onnxruntime": _time_decode(onnx_model, tokenizer, prompts, num_tokens),
+    }
+    if report["pytorch"]["ms_per_token"] and report["onnxruntime"]["ms_per_token"]:
+        report["decode_speedup"] = round(report["pytorch"]["ms_per_token"] / report["onnxruntime"]["ms_per_token"], 2)
+    return report
+
+
+def main():
+    """Export the fine-tuned checkpoint, then check parity and compare latency"""
+    print("🎯 TurboTalk AI - ONNX Export")
+    tokenizer = AutoTokenizer.from_pretrained(CHECKPOINT_PATH, local_files_only=True)
+    torch_model = AutoModelForCausalLM.from_pretrained(CHECKPOINT_PATH, local_files_only=True, torch_dtype=torch.float32)
+    torch_model.eval()
+
+    if not is_onnx_export(ONNX_OUTPUT_PATH):
+        print(f"📦 Exporting ONNX decoder to: {ONNX_OUTPUT_PATH}")
+        export_onnx(torch_model, ONNX_OUTPUT_PATH)
+    onnx_model = OnnxCausalLM(ONNX_OUTPUT_PATH)
+
+    parity = check_parity(torch_model, onnx_model, tokenizer, COMPARISON_PROMPTS)
+    print(f"🔍 Parity: max logit diff {parity['max_logit_diff']}, greedy token match {parity['greedy_token_match']:.1%}")
+
+    report = compare_backends(torch_model, onnx_model, tokenizer, COMPARISON_PROMPTS)
+    print(f"\n{'Backend':<12} {'Prefill ms':>11} {'ms/token':>9} {'tok/s':>8}")
+    for name in ("pytorch", "onnxruntime"):
+        row = report[name]
+        print(f"{name:<12} {row['prefill_ms']:>11} {row['ms_per_token']:>9} {row['tokens_per_second']:>8}")
+    if "decode_speedup" in report:
+        print(f"\n⚡ ONNX Runtime decode speedup: {report['decode_speedup']}x")
+
+
+if __name__ == "__main__":
+    main()
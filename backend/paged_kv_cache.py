@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Paged KV-Cache
+Block-based past-key-value storage with copy-on-write prefix sharing
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import torch
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+
+from kv_cache import LegacyCache
+
+
+class KVCacheFullError(RuntimeError):
+    """Raised when no free block is left in the pool"""
+
+
+class PagedKVCache:
+    """Fixed-size KV blocks handed out on demand from one preallocated pool.
+
+    Every sequence owns a block table instead of a contiguous tensor, so
+    memory is only ever wasted in the last, partially filled block of each
+    sequence. Sequences forked from a common prefix share its blocks; a
+    shared block is copied only when one of them writes into it.
+
+    The pool's max_bytes are reserved when it is created, and attention runs
+    on a contiguous copy gathered per step, so this bounds KV memory and
+    enables prefix sharing and preemption; it does not use less memory than
+    contiguous KV.
+    """
+
+    def __init__(self, num_layers: int, num_heads: int, head_dim: int, max_bytes: int,
+                 block_size: int = 16, dtype: torch.dtype = torch.float32, device: str = "cpu"):
+        self.num_layers = num_layers
+        self.num_heads = num_heads
+        self.head_dim = head_dim
+        self.block_size = block_size
+        self.dtype = dtype
+        self.device = device
+
+        element_size = torch.tensor([], dtype=dtype).element_size()
+        self.block_bytes = 2 * num_layers * num_heads * block_size * head_dim * element_size
+        self.num_blocks = max(1, max_bytes // self.block_bytes)
+
+        # [layer, block, head, slot, head_dim]; untouched pages stay uncommitted
+        pool_shape = (num_layers, self.num_blocks, num_heads, block_size, head_dim)
+        self.key_pool = torch.zeros(pool_shape, dtype=dtype, device=device)
+        self.value_pool = torch.zeros(pool_shape, dtype=dtype, device=device)
+
+        self.free_blocks = deque(range(self.num_blocks))
+        self.ref_counts = [0] * self.num_blocks
+        self.block_tables: Dict[str, List[int]] = {}
+        self.seq_lens: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self.stats = {"blocks_allocated": 0, "cow_copies": 0, "forks": 0, "peak_used_blocks": 0}
+
+    @classmethod
+    def from_model(cls, model, max_bytes: int, block_size: int = 16, device: str = "cpu") -> "PagedKVCache":
+        """Size the pool from a causal LM's config"""
+        config = model.config
+        num_layers = getattr(config, "n_layer", None) or config.num_hidden_layers
+        attention_heads = getattr(config, "n_head", None) or config.num_attention_heads
+        # GQA/MQA models cache fewer KV heads than they attend with
+        num_heads = getattr(config, "num_key_value_heads", None) or attention_heads
+        hidden_size = getattr(config, "n_embd", None) or config.hidden_size
+        head_dim = getattr(config, "head_dim", None) or hidden_size // attention_heads
+        dtype = next(model.parameters()).dtype
+        return cls(num_layers, num_heads, head_dim, max_bytes,
+                   block_size=block_size, dtype=dtype, device=device)
+
+    # ------------------------------------------------------------------
+    # Sequence lifecycle
+    # ------------------------------------------------------------------
+
+    def allocate(self, seq_id: str):
+        with self.lock:
+            self.block_tables[seq_id] = []
+            self.seq_lens[seq_id] = 0
+
+    def fork(self, src_seq_id: str, dst_seq_id: str):
+        """Start dst as a copy-on-write view of src's blocks"""
+        with self.lock:
+            table = list(self.block_tables[src_seq_id])
+            for block in table:
+                self.ref_counts[block] += 1
+            self.block_tables[dst_seq_id] = table
+            self.seq_lens[dst_seq_id] = self.seq_lens[src_seq_id]
+            self.stats["forks"] += 1
+
+    def free(self, seq_id: str):
+        with self.lock:
+            for block in self.block_tables.pop(seq_id, []):
+                self.ref_counts[block] -= 1
+                if self.ref_counts[block] == 0:
+                    self.free_blocks.append(block)
+            self.seq_lens.pop(seq_id, None)
+
+    def has_sequence(self, seq_id: str) -> bool:
+        return seq_id in self.block_tables
+
+    def seq_len(self, seq_id: str) -> int:
+        return self.seq_lens[seq_id]
+
+    def blocks_needed(self, num_tokens: int) -> int:
+        return -(-num_tokens // self.block_size)
+
+    def can_allocate(self, num_blocks: int) -> bool:
+        return len(self.free_blocks) >= num_blocks
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _allocate_block(self) -> int:
+        if not self.free_blocks:
+            raise KVCacheFullError("Paged KV cache is out of blocks")
+        block = self.free_blocks.popleft()
+        self.ref_counts[block] = 1
+        self.stats["blocks_allocated"] += 1
+        used = self.num_blocks - len(self.free_blocks)
+        self.stats["peak_used_blocks"] = max(self.stats["peak_used_blocks"], used)
+        return block
+
+    def reserve_slot(self, seq_id: str) -> Tuple[int, int]:
+        """Make the next position of seq_id writable; returns (block, offset)"""
+        with self.lock:
+            table = self.block_tables[seq_id]
+            index, offset = divmod(self.seq_lens[seq_id], self.block_size)
+            if index == len(table):
+                table.append(self._allocate_block())
+            elif self.ref_counts[table[index]] > 1:
+                # Copy-on-write: the partially filled block is shared with a fork
+                shared = table[index]
+                block = self._allocate_block()
+                self.key_pool[:, block].copy_(self.key_pool[:, shared])
+                self.value_pool[:, block].copy_(self.value_pool[:, shared])
+                self.ref_counts[shared] -= 1
+                table[index] = block
+                self.stats["cow_copies"] += 1
+            return table[index], offset
+
+    def append(self, seq_id: str, legacy: LegacyCache, start: int = 0):
+        """Copy positions [start:] of a single-row legacy cache into seq_id's blocks"""
+        keys = torch.stack([k[0] for k, _ in legacy])      # [layer, head, seq, head_dim]
+        values = torch.stack([v[0] for _, v in legacy])
+        total = keys.shape[2]
+        position = start
+        with self.lock:
+            while position < total:
+                block, offset = self.reserve_slot(seq_id)
+                take = min(self.block_size - offset, total - position)
+                self.key_pool[:, block, :, offset:offset + take] = keys[:, :, position:position + take]
+                self.value_pool[:, block, :, offset:offset + take] = values[:, :, position:position + take]
+                self.seq_lens[seq_id] += take
+                position += take
+
+    def append_token_batch(self, seq_ids: List[str], slots: List[Tuple[int, int]], legacy: LegacyCache):
+        """Write the newest position of every batch row into its reserved slot"""
+        blocks = torch.tensor([block for block, _ in slots], device=self.device)
+        offsets = torch.tensor([offset for _, offset in slots], device=self.device)
+        with self.lock:
+            for layer, (k, v) in enumerate(legacy):
+                self.key_pool[layer, blocks, :, offsets] = k[:, :, -1]
+                self.value_pool[layer, blocks, :, offsets] = v[:, :, -1]
+            for seq_id in seq_ids:
+                self.seq_lens[seq_id] += 1
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def gather(self, seq_ids: List[str]) -> Tuple[LegacyCache, List[int]]:
+        """Assemble a left-padded batch cache for a forward pass (a copy, made every decode step)"""
+        with self.lock:
+            lengths = [self.seq_lens[seq_id] for seq_id in seq_ids]
+            tables = [list(self.block_tables[seq_id]) for seq_id in seq_ids]
+            max_len = max(lengths)
+            shape = (self.num_layers, len(seq_ids), self.num_heads, max_len, self.head_dim)
+            keys = self.key_pool.new_zeros(shape)
+            values = self.value_pool.new_zeros(shape)
+
+            for row, (table, length) in enumerate(zip(tables, lengths)):
+                if length == 0:
+                    continue
+                index = torch.tensor(table, device=self.device)
+                k = self.key_pool[:, index].permute(0, 2, 1, 3, 4).reshape(
+                    self.num_layers, self.num_heads, -1, self.head_dim)[:, :, :length]
+                v = self.value_pool[:, index].permute(0, 2, 1, 3, 4).reshape(
+                    self.num_layers, self.num_heads, -1, self.head_dim)[:, :, :length]
+                keys[:, row, :, max_len - length:] = k
+                values[:, row, :, max_len - length:] = v
+
+        legacy = tuple((keys[layer], values[layer]) for layer in range(self.num_layers))
+        return legacy, lengths
+
+    def to_legacy(self, seq_id: str) -> LegacyCache:
+        """Contiguous copy of one sequence (e.g. to park a session's KV)"""
+        legacy, _ = self.gather([seq_id])
+        return legacy
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            used_blocks = self.num_blocks - len(self.free_blocks)
+            stored_tokens = sum(self.seq_lens.values())
+            logical_blocks = sum(len(table) for table in self.block_tables.values())
+            return {
+                **self.stats,
+                "block_size": self.block_size,
+                "total_blocks": self.num_blocks,
+                "used_blocks": used_blocks,
+                "free_blocks": len(self.free_blocks),
+                "shared_blocks": sum(1 for count in self.ref_counts if count > 1),
+                "sequences": len(self.block_tables),
+                "utilization": round(used_blocks / self.num_blocks, 4),
+                # Share of allocated slots holding real tokens (internal fragmentation)
+                "slot_occupancy": round(stored_tokens / (logical_blocks * self.block_size), 4) if logical_blocks else 0.0,
+                "sharing_savings_blocks": logical_blocks - used_blocks,
+                "memory_used_mb": round(used_blocks * self.block_bytes / (1024 * 1024), 2),
+                "memory_budget_mb": round(self.num_blocks * self.block_bytes / (1024 * 1024), 2),
+            }
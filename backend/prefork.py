@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Pre-fork Workers
+N HTTP worker processes forked after the model loads, sharing its weights copy-on-write
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+from hot_reload import process_rss_mb
+
+
+def fork_supported() -> bool:
+    return hasattr(os, "fork")
+
+
+def bind_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    """Listening socket created once in the supervisor and inherited by every worker"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkSupervisor:
+    """Forks workers that all accept() on one shared socket and restarts any that die.
+
+    Everything loaded before run() (the model above all) is inherited by the
+    workers copy-on-write: tensor storage is never written after loading, so
+    the pages stay shared and N workers cost one copy of the weights plus
+    their own KV caches. gc.freeze() before forking keeps the collector from
+    touching (and so copying) the pages of long-lived objects.
+
+    serve(sock, index) runs in each worker and should block until shutdown;
+    the process exits when it returns. Threads do not survive fork, so
+    anything that runs a background thread (the batching engine) must be
+    started inside serve.
+
+    Workers share nothing after the fork: each keeps its own session KV and
+    response cache, and the kernel hands each connection to whichever worker
+    accepts first. State that must follow a session across workers (chat
+    history) has to live outside the processes, in SQLite.
+    """
+
+    def __init__(self, serve: Callable[[socket.socket, int], None], workers: int, host: str = "0.0.0.0",
+                 port: int = 5000, shutdown_timeout: float = 30.0, max_backoff: float = 30.0):
+        self.serve = serve
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        self.shutdown_timeout = shutdown_timeout
+        self.max_backoff = max_backoff
+
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}       # pid -> worker index
+        self.spawned_at: Dict[int, float] = {}   # worker index -> last fork time
+        self.backoff: Dict[int, float] = {}      # worker index -> delay before its next restart
+        self.restarts = 0
+        self.stopping = False
+
+    def run(self) -> int:
+        """Bind, fork the workers and supervise them until SIGINT/SIGTERM"""
+        self.sock = bind_socket(self.host, self.port)
+        gc.collect()
+        gc.freeze()
+        rss = process_rss_mb()
+        print(f"👷 Pre-fork supervisor {os.getpid()}: {self.workers} workers on {self.host}:{self.port}"
+              + (f", parent RSS {rss:.0f} MB" if rss is not None else ""))
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        # Poll rather than block in os.wait(): a blocking wait is retried after the signal handler runs
+        while not self.stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.5)
+                continue
+            self._reap(pid, status)
+
+        self._shutdown_children()
+        self.sock.close()
+        return 0
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.serve(self.sock, index)
+            except BaseException as e:
+                print(f"❌ Worker {index} ({os.getpid()}) crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        self.spawned_at[index] = time.time()
+
+    def _reap(self, pid: int, status: int):
+        index = self.children.pop(pid, None)
+        if index is None or self.stopping:
+            return
+        print(f"⚠️ Worker {index} ({pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+        # A worker that dies right after starting is crash-looping: back off exponentially
+        if time.time() - self.spawned_at.get(index, 0.0) < 10.0:
+            self.backoff[index] = min(self.max_backoff, max(1.0, self.backoff.get(index, 0.5) * 2))
+            time.sleep(self.backoff[index])
+        else:
+            self.backoff.pop(index, None)
+        if not self.stopping:
+            self.restarts += 1
+            self._spawn(index)
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    def _shutdown_children(self):
+        """SIGTERM every worker, then SIGKILL whatever is still alive after shutdown_timeout"""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+        deadline = time.time() + self.shutdown_timeout
+        while self.children and time.time() < deadline:
+            for pid in list(self.children):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    self.children.pop(pid, None)
+            time.sleep(0.1)
+
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+        print(f"👋 Pre-fork supervisor stopped ({self.restarts} worker restarts)")
+
+
+def worker_threads(workers: int) -> int:
+    """Intra-op torch threads per worker so N workers together use every core once"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Int8 Quantization
+Int8 Linear weights with per-channel scales for CPU inference
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import math
+import os
+import time
+import torch
+import torch.nn as nn
+from typing import Dict, List, Optional
+
+from transformers import AutoConfig, AutoModelForCausalLM
+
+from hot_reload import process_rss_mb
+
+try:
+    from transformers.pytorch_utils import Conv1D
+except ImportError:  # Older transformers keep it in modeling_utils
+    from transformers.modeling_utils import Conv1D
+
+QUANTIZED_WEIGHTS_NAME = "int8_weights.pt"
+DynamicQuantizedLinear = torch.ao.nn.quantized.dynamic.Linear
+
+
+def conv1d_to_linear(model: nn.Module) -> nn.Module:
+    """Swap GPT-2 style Conv1D projections for equivalent nn.Linear layers.
+
+    Conv1D stores its weight as [in, out]; the int8 kernels only know nn.Linear.
+    """
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = nn.Linear(in_features, out_features, bias=child.bias is not None)
+                linear.weight = nn.Parameter(child.weight.detach().t().contiguous())
+                if child.bias is not None:
+                    linear.bias = nn.Parameter(child.bias.detach())
+                setattr(parent, name, linear)
+    return model
+
+
+def quantize_int8(model: nn.Module, skip_modules=("lm_head",)) -> nn.Module:
+    """Store every Linear weight as int8 with one scale per output channel.
+
+    Activations stay float and are quantized on the fly inside the int8 GEMM.
+    The LM head is skipped by default: it is tied to the token embedding, so
+    quantizing it would add a second copy instead of saving memory.
+    """
+    conv1d_to_linear(model)
+    qconfig = torch.ao.quantization.per_channel_dynamic_qconfig
+    qconfig_spec = {
+        name: qconfig for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and name not in skip_modules
+    }
+    torch.ao.quantization.quantize_dynamic(model, qconfig_spec, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def int8_state_dict(model: nn.Module) -> Dict[str, torch.Tensor]:
+    """Plain tensors only, so the artifact loads with weights_only=True.
+
+    Each int8 Linear is stored as its raw int8 weight, per-channel scales and
+    zero points (channel axis 0) and float bias; every other parameter and
+    buffer (non-persistent ones included) as is.
+    """
+    state, quantized = {}, []
+    for name, module in model.named_modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            weight, bias = module._weight_bias()
+            state[f"{name}.weight_int8"] = weight.int_repr()
+            state[f"{name}.weight_scale"] = weight.q_per_channel_scales()
+            state[f"{name}.weight_zero_point"] = weight.q_per_channel_zero_points()
+            if bias is not None:
+                state[f"{name}.bias"] = bias.detach()
+            quantized.append(name + ".")
+    for key, tensor in [*model.named_parameters(remove_duplicate=False), *model.named_buffers()]:
+        if not key.startswith(tuple(quantized)):
+            state[key] = tensor.detach()
+    return state
+
+
+def save_quantized(model: nn.Module, path: str):
+    """Write a quantized model as config.json plus its int8 weights"""
+    os.makedirs(path, exist_ok=True)
+    model.config.save_pretrained(path)
+    torch.save(int8_state_dict(model), os.path.join(path, QUANTIZED_WEIGHTS_NAME))
+
+
+def is_quantized_artifact(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, QUANTIZED_WEIGHTS_NAME))
+
+
+def load_quantized(path: str, skip_modules=("lm_head",)) -> nn.Module:
+    """Rebuild the int8 module layout from config and load the saved weights into it.
+
+    The model is built on the meta device and only the int8 Linears and the
+    remaining float weights are ever allocated, so loading never holds the
+    fp32 model.
+    """
+    config = AutoConfig.from_pretrained(path)
+    with torch.device("meta"):
+        model = AutoModelForCausalLM.from_config(config)
+        conv1d_to_linear(model)
+    for name, module in list(model.named_modules()):
+        if isinstance(module, nn.Linear) and name not in skip_modules:
+            parent, _, child = name.rpartition(".")
+            int8_linear = DynamicQuantizedLinear(module.in_features, module.out_features,
+                                                 bias_=module.bias is not None, dtype=torch.qint8)
+            setattr(model.get_submodule(parent), child, int8_linear)
+    model.to_empty(device="cpu")
+
+    state_dict = torch.load(os.path.join(path, QUANTIZED_WEIGHTS_NAME), map_location="cpu",
+                            weights_only=True, mmap=True)
+    for name, module in model.named_modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            weight = torch._make_per_channel_quantized_tensor(
+                state_dict.pop(f"{name}.weight_int8"),
+                state_dict.pop(f"{name}.weight_scale"),
+                state_dict.pop(f"{name}.weight_zero_point"),
+                0
+            )
+            module.set_weight_bias(weight, state_dict.pop(f"{name}.bias", None))
+    targets = dict([*model.named_parameters(remove_duplicate=False), *model.named_buffers()])
+    missing, unexpected = sorted(targets.keys() - state_dict.keys()), sorted(state_dict.keys() - targets.keys())
+    if missing or unexpected:
+        raise ValueError(f"Int8 artifact at {path} does not match its config "
+                         f"(missing: {missing[:5]}, unexpected: {unexpected[:5]})")
+    with torch.no_grad():
+        for key, tensor in state_dict.items():
+            targets[key].copy_(tensor)
+    model.tie_weights()
+    model.eval()
+    return model
+
+
+def load_int8_model(model_path: str, quantized_path: Optional[str] = None, **from_pretrained_kwargs) -> nn.Module:
+    """Load the saved artifact if present, else quantize at load time (and save it when asked)"""
+    if is_quantized_artifact(quantized_path):
+        print(f"📦 Loading int8 model from: {quantized_path}")
+        return load_quantized(quantized_path)
+
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32, **from_pretrained_kwargs)
+    model.eval()
+    quantize_int8(model)
+    if quantized_path:
+        save_quantized(model, quantized_path)
+        print(f"💾 Saved int8 model to: {quantized_path}")
+    return model
+
+
+# ----------------------------------------------------------------------
+# Benchmark helpers
+# ----------------------------------------------------------------------
+
+def weights_size_mb(model: nn.Module) -> float:
+    """Bytes held by the model's weights, counting packed int8 Linear weights"""
+    tensors = {t.data_ptr(): t for t in model.state_dict().values() if isinstance(t, torch.Tensor)}
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._weight_bias()
+            tensors[weight.data_ptr()] = weight
+            if bias is not None:
+                tensors[bias.data_ptr()] = bias
+    return sum(t.numel() * t.element_size() for t in tensors.values()) / (1024 * 1024)
+
+
+def perplexity(model, tokenizer, texts: List[str], device: str = "cpu") -> float:
+    """Token-weighted perplexity of the model over texts"""
+    total_loss, total_tokens = 0.0, 0
+    for text in texts:
+        input_ids = tokenizer(text, return_tensors="pt").input_ids.to(device)
+        if input_ids.shape[1] < 2:
+            continue
+        with torch.no_grad():
+            loss = model(input_ids=input_ids, labels=input_ids).loss
+        total_loss += loss.item() * (input_ids.shape[1] - 1)
+        total_tokens += input_ids.shape[1] - 1
+    return math.exp(total_loss / total_tokens) if total_tokens else float("nan")
+
+
+def decode_throughput(model, tokenizer, prompts: List[str], max_new_tokens: int = 64, device: str = "cpu") -> float:
+    """Greedy tokens/sec with a fixed number of new tokens per prompt"""
+    generated, elapsed = 0, 0.0
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt").to(device)
+        start = time.time()
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id
+            )
+        elapsed += time.time() - start
+        generated += outputs.shape[1] - inputs.input_ids.shape[1]
+    return generated / elapsed if elapsed else 0.0
+
+
+def benchmark_model(model, tokenizer, prompts: List[str], eval_texts: List[str],
+                    max_new_tokens: int = 64, device: str = "cpu") -> Dict:
+    """Throughput, memory and quality of one loaded model"""
+    stats = {
+        "tokens_per_second": round(decode_throughput(model, tokenizer, prompts, max_new_tokens, device), 2),
+        "perplexity": round(perplexity(model, tokenizer, eval_texts, device), 3),
+        "weights_mb": round(weights_size_mb(model), 1),
+    }
+    rss = process_rss_mb()
+    stats["rss_mb"] = round(rss, 1) if rss is not None else None
+    return stats
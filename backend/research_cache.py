@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Research Cache
+Search results reused across requests: an in-memory LRU over a compressed SQLite store shared by worker processes
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    sources BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS research_by_expiry ON research (expires_at);
+"""
+
+
+@dataclass
+class CachedResearch:
+    """Sources found for one query, as plain dicts"""
+    sources: List[Dict]
+    expires_at: float
+
+
+class ResearchCache:
+    """Research sources keyed on normalized query, search decision and source count.
+
+    Queries about current events ("latest", "today", ...) expire after
+    current_ttl_s, evergreen ones after ttl_s. The newest max_entries results
+    stay in memory; with a db_path every result is also written to SQLite
+    (WAL mode, zlib-compressed JSON), which outlives restarts and is read by
+    every worker process, so a query one worker researched is a disk hit for
+    the others. Expired rows are swept every sweep_every stores, and the ones
+    expiring soonest are dropped beyond max_disk_entries.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 1024, ttl_s: float = 7 * 24 * 3600,
+                 current_ttl_s: float = 900.0, max_disk_entries: int = 100000, sweep_every: int = 100):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.current_ttl_s = current_ttl_s
+        self.max_disk_entries = max_disk_entries
+        self.sweep_every = sweep_every
+
+        self.entries: "OrderedDict[str, CachedResearch]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._schema_ready = False
+        self.stats = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "stores": 0, "expired": 0,
+                      "evicted": 0, "disk_errors": 0, "bytes_written": 0, "bytes_uncompressed": 0}
+
+    @staticmethod
+    def key(text: str, decision: str, max_sources: int) -> str:
+        return json.dumps([text, decision, max_sources])
+
+    def get(self, text: str, decision: str, max_sources: int) -> Optional[List[Dict]]:
+        """Cached sources for a normalized query, or None"""
+        key = self.key(text, decision, max_sources)
+        now = time.time()
+        with self.lock:
+            self.stats["lookups"] += 1
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry.sources
+                del self.entries[key]
+                self.stats["expired"] += 1
+
+        entry = self._load(key, now)
+        if entry is None:
+            return None
+        with self.lock:
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry.sources
+
+    def put(self, text: str, decision: str, max_sources: int, sources: List[Dict], current: bool = False):
+        """Cache sources found for a query; current queries get the short TTL"""
+        key = self.key(text, decision, max_sources)
+        entry = CachedResearch(sources, time.time() + (self.current_ttl_s if current else self.ttl_s))
+        with self.lock:
+            self._remember(key, entry)
+            self.stats["stores"] += 1
+            sweep = self.stats["stores"] % self.sweep_every == 0
+        if self.db_path:
+            self._store(key, entry, sweep)
+
+    def _remember(self, key: str, entry: CachedResearch):
+        """Add to the memory tier, evicting the least recently used (under lock)"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call: safe across threads and forked workers
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _load(self, key: str, now: float) -> Optional[CachedResearch]:
+        if not self.db_path or not os.path.exists(self.db_path):
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT expires_at, sources FROM research WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+            return CachedResearch(json.loads(zlib.decompress(row[1])), row[0])
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            self.stats["disk_errors"] += 1
+            print(f"⚠️ Research cache read failed: {e}")
+            return None
+
+    def _store(self, key: str, entry: CachedResearch, sweep: bool):
+        raw = json.dumps(entry.sources).encode("utf-8")
+        blob = zlib.compress(raw, 6)
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO research (key, expires_at, sources) VALUES (?, ?, ?)",
+                                 (key, entry.expires_at, blob))
+                    if sweep:
+                        self._sweep(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.stats["disk_errors"] += 1
+            print(f"⚠️ Research cache write failed: {e}")
+            return
+        with self.lock:
+            self.stats["bytes_written"] += len(blob)
+            self.stats["bytes_uncompressed"] += len(raw)
+
+    def _sweep(self, conn: sqlite3.Connection):
+        """Delete expired rows, then the ones expiring soonest beyond max_disk_entries"""
+        conn.execute("DELETE FROM research WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM research WHERE key IN "
+            "(SELECT key FROM research ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def disk_entries(self) -> Optional[int]:
+        if not self.db_path or not os.path.exists(self.db_path):
+            return None
+        try:
+            conn = self._connect()
+            try:
+                return conn.execute("SELECT COUNT(*) FROM research").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.stats["lookups"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            stats = {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "compression_ratio": round(self.stats["bytes_uncompressed"] / self.stats["bytes_written"], 2)
+                if self.stats["bytes_written"] else None,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "current_ttl_s": self.current_ttl_s,
+                "db_path": self.db_path,
+            }
+        stats["disk_entries"] = self.disk_entries()
+        return stats
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Response Cache
+Finished answers reused for repeated questions: exact normalized-prompt hits plus an optional semantic tier
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import torch
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Only needed for the semantic tier
+    SentenceTransformer = None
+
+EXACT_HIT = "exact"
+SEMANTIC_HIT = "semantic"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question"""
+    return re.sub(r"\s+", " ", prompt.lower()).strip().rstrip("?!. ")
+
+
+def build_embedder(model_name: str, device: str = "cpu") -> Optional[Callable[[str], torch.Tensor]]:
+    """Sentence embedding function (unit-length vectors) for the semantic tier, or None"""
+    if SentenceTransformer is None:
+        print("⚠️ Semantic response cache needs sentence-transformers (pip install sentence-transformers); using exact hits only")
+        return None
+    encoder = SentenceTransformer(model_name, device=device)
+
+    def embed(text: str) -> torch.Tensor:
+        return encoder.encode(text, normalize_embeddings=True, convert_to_tensor=True).float().cpu()
+
+    return embed
+
+
+@dataclass
+class CachedResponse:
+    """One finished answer and what producing it cost"""
+    text: str                       # normalized prompt
+    partition: Hashable             # everything besides the prompt that shaped the answer
+    value: Dict
+    nbytes: int
+    cost_s: float
+    embedding: Optional[torch.Tensor] = None
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class ResponseCache:
+    """Finished responses keyed on normalized prompt within a partition.
+
+    The partition holds the request settings that change the answer
+    (research mode, temperature bucket, sampling, adapter), so a hit never
+    crosses them. Lookups try the exact normalized prompt first; with an
+    embed function, a miss then falls back to the most similar cached prompt
+    in the same partition if its cosine similarity reaches
+    similarity_threshold. Entries expire after ttl_s (research answers go
+    stale) and the least recently used are evicted beyond max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_s: Optional[float] = 3600.0,
+                 embed: Optional[Callable[[str], torch.Tensor]] = None, similarity_threshold: float = 0.92):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+
+        self.entries: "OrderedDict[Tuple[str, Hashable], CachedResponse]" = OrderedDict()
+        self.embeddings: "OrderedDict[str, torch.Tensor]" = OrderedDict()   # recent query embeddings, reused by put
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "stores": 0,
+                      "expired": 0, "evicted": 0, "latency_saved_s": 0.0}
+
+    def _embedding(self, text: str) -> Optional[torch.Tensor]:
+        if self.embed is None:
+            return None
+        with self.lock:
+            cached = self.embeddings.get(text)
+        if cached is None:
+            cached = self.embed(text)
+            with self.lock:
+                self.embeddings[text] = cached
+                while len(self.embeddings) > 256:
+                    self.embeddings.popitem(last=False)
+        return cached
+
+    def get(self, prompt: str, partition: Hashable, record: bool = True) -> Optional[Tuple[CachedResponse, str]]:
+        """(entry, EXACT_HIT or SEMANTIC_HIT) for a prompt, or None; record=False peeks without stats"""
+        text = normalize_prompt(prompt)
+        with self.lock:
+            if record:
+                self.stats["lookups"] += 1
+            entry = self.entries.get((text, partition))
+            if entry is not None and self._is_expired(entry):
+                self._remove(entry)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                return self._hit(entry, EXACT_HIT, record)
+            candidates = [
+                e for e in self.entries.values()
+                if e.partition == partition and e.embedding is not None and not self._is_expired(e)
+            ]
+
+        if not candidates:
+            return None
+        query = self._embedding(text)
+        if query is None:
+            return None
+        similarities = torch.stack([e.embedding for e in candidates]) @ query
+        best = int(torch.argmax(similarities))
+        if float(similarities[best]) < self.similarity_threshold:
+            return None
+        with self.lock:
+            entry = candidates[best]
+            if self.entries.get((entry.text, entry.partition)) is not entry:
+                return None  # evicted meanwhile
+            return self._hit(entry, SEMANTIC_HIT, record)
+
+    def _hit(self, entry: CachedResponse, kind: str, record: bool) -> Tuple[CachedResponse, str]:
+        """Count a hit (under lock)"""
+        if record:
+            entry.hits += 1
+            self.entries.move_to_end((entry.text, entry.partition))
+            self.stats["exact_hits" if kind == EXACT_HIT else "semantic_hits"] += 1
+            self.stats["latency_saved_s"] += entry.cost_s
+        return entry, kind
+
+    def put(self, prompt: str, partition: Hashable, value: Dict, cost_s: float):
+        """Cache a finished response that took cost_s seconds to produce"""
+        text = normalize_prompt(prompt)
+        embedding = self._embedding(text)
+        nbytes = len(json.dumps(value, default=str)) + len(text) + (
+            embedding.numel() * embedding.element_size() if embedding is not None else 0
+        )
+        if nbytes > self.max_bytes:
+            return
+
+        entry = CachedResponse(text, partition, value, nbytes, cost_s, embedding)
+        with self.lock:
+            self._expire()
+            previous = self.entries.get((text, partition))
+            if previous is not None:
+                self._remove(previous)
+            self.entries[(text, partition)] = entry
+            self.used_bytes += nbytes
+            self.stats["stores"] += 1
+            while self.used_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.used_bytes -= evicted.nbytes
+                self.stats["evicted"] += 1
+
+    def _is_expired(self, entry: CachedResponse) -> bool:
+        return self.ttl_s is not None and time.time() - entry.created_at > self.ttl_s
+
+    def _remove(self, entry: CachedResponse):
+        """Drop one entry (under lock)"""
+        del self.entries[(entry.text, entry.partition)]
+        self.used_bytes -= entry.nbytes
+
+    def _expire(self):
+        """Drop every entry older than ttl_s (under lock; run on store, lookups skip stale entries)"""
+        for entry in [entry for entry in self.entries.values() if self._is_expired(entry)]:
+            self._remove(entry)
+            self.stats["expired"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.stats["lookups"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {
+                **self.stats,
+                "latency_saved_s": round(self.stats["latency_saved_s"], 2),
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "exact_hit_rate": round(self.stats["exact_hits"] / lookups, 3) if lookups else None,
+                "semantic_hit_rate": round(self.stats["semantic_hits"] / lookups, 3) if lookups else None,
+                "semantic": self.embed is not None,
+                "similarity_threshold": self.similarity_threshold if self.embed is not None else None,
+                "entries": len(self.entries),
+                "memory_used_mb": round(self.used_bytes / (1024 * 1024), 2),
+                "memory_budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
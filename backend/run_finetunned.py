@@ -8,31 +8,129 @@ Nationality: Indian
 """
 
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, GPT2LMHeadModel, GPT2Tokenizer
+from transformers import AutoTokenizer, AutoModelForCausalLM, GPT2LMHeadModel, GPT2Tokenizer, StoppingCriteriaList
 import json
 import os
 from datetime import datetime
 import time
 import random
-import wikipedia
+import importlib.util
 import warnings
 import re
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import quote
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+from dataclasses import asdict, dataclass
 from enum import Enum
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+from contextlib import contextmanager, nullcontext
+from collections import deque
+from deadline import Deadline
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+
+from cascade import LARGE_TIER, SMALL_TIER, CascadeRouter
+from compiled_generation import CompiledGenerator
+from lora import LoraManager
+from kv_cache import PrefixKVCache, SessionKVStore, SessionState, from_legacy_cache, slice_cache_row, to_legacy_cache
+from onnx_backend import OnnxCausalLM, OnnxGenerator, export_checkpoint, is_onnx_export
+from paged_kv_cache import PagedKVCache
+from sampling import SamplingParams, seeded_global_rng
+from quantization import load_int8_model
+from research_cache import ResearchCache
+from response_cache import ResponseCache, build_embedder, normalize_prompt
+from coalescing import SingleFlight
+from serving_engine import ContinuousBatchingEngine, GenerationRequest
+from startup import StartupProfiler
+from speculative import DraftModelProposer, PromptLookupProposer, SpeculativeDecoder, build_shallow_draft
+from stopping import DEFAULT_STOP_SEQUENCES, CancelledCriteria, StopChecker, StopCheckerCriteria
+from streaming import IncrementalDetokenizer, TokenQueueStreamer
 
 warnings.filterwarnings("ignore")
-wikipedia.set_lang("en")
 
 MODEL_PATH = r"D:\ttm\model\3bmodel\t\M\TTM\turbotalk_v1.2.6_backup_20250608_172624"
 TEMPLATES_PATH = "templates.json"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
+# Inference configuration (override per instance via TurboTalkAI(config={...}))
+INFERENCE_CONFIG = {
+    "max_prompt_tokens": 1000,
+    "max_new_tokens": 250,
+    "top_p": 0.9,
+    "top_k": 50,
+    "repetition_penalty": 1.1,
+    "max_batch_size": 8,
+    "prefill_chunk_size": 256,      # 0 prefills each prompt in one pass
+    "kv_cache": "contiguous",       # "contiguous" or "paged"
+    "paged_kv_mb": 1024,            # block pool, reserved when the engine starts
+    "kv_block_size": 16,
+    "session_cache_mb": 512,
+    "prefix_cache": True,
+    "session_history_turns": 5,
+    "backend": "torch",             # "onnx": ONNX Runtime decoder (CPU only)
+    "onnx_model_path": None,        # exported on first load if missing; default "<model path>_onnx"
+    "onnx_threads": None,
+    "quantization": None,           # "int8": int8 Linear weights (CPU only)
+    "quantized_model_path": None,   # int8 artifact dir; written on first load if missing
+    # torch.compile'd static-cache generation (single-stream mode, replaces the batching engine)
+    "compile": False,
+    "compile_buckets": [128, 256, 512, 768],
+    "compile_mode": "reduce-overhead",
+    # Speculative decoding (single-stream mode, replaces the batching engine)
+    "speculative": False,
+    "draft_model_path": None,       # required: a small model sharing the tokenizer (early-exit drafts rarely get accepted)
+    "speculative_min_acceptance": 0.5,  # probe acceptance below this keeps speculative decoding off
+    "num_draft_tokens": 4,
+    # Prompt-lookup decoding: research answers draft tokens by copying from their sources
+    "prompt_lookup": True,
+    "prompt_lookup_tokens": 10,
+    "prompt_lookup_ngram": 3,
+    # Checked token by token so generation ends instead of running into a hallucinated next turn
+    "stop_sequences": DEFAULT_STOP_SEQUENCES,
+    "max_sentences": None,          # e.g. 3: stop after three complete sentences
+    # Per-request deadlines (deadline_ms): research and generation shrink to fit the budget
+    "deadline_research_share": 0.4,     # research gets at most this share of what is left
+    "deadline_min_research_ms": 500,    # less research time than this: skip research
+    "deadline_full_research_ms": 8000,  # tighter deadlines keep only the best source
+    "deadline_sentence_share": 0.75,    # past this share of the generation budget, stop at the next sentence end
+    "deadline_min_new_tokens": 16,
+    # Model cascade: small talk goes to a small fast model, research queries to the full one
+    "cascade": False,
+    "small_model_path": None,       # None: early-exit copy of the main model's first small_model_layers blocks
+    "small_model_layers": 6,
+    "cascade_max_words": 6,         # longer queries always use the full model
+    "cascade_small_decisions": ["no_search"],   # search decisions eligible for the small model
+    # Multi-LoRA serving: one base model, adapters chosen per request (PyTorch backend only)
+    "lora_adapters": {},            # adapter name -> PEFT adapter dir, e.g. finetune.py round checkpoints
+    "lora_cache_mb": 256,           # adapter weights kept in memory, least recently used evicted
+    "mmap_weights": True,           # memory-map safetensors weights, no random init or extra copy (needs accelerate)
+    # Admission control in front of /api/chat: bounded queue, priority classes, load shedding
+    "admission_max_running": 16,    # requests generating at once; the rest queue
+    "admission_max_queue": 64,      # queued requests before new ones get 429 (interactive limit)
+    "admission_batch_queue_share": 0.5,  # share of the queue batch-priority requests may fill
+    "admission_max_wait_s": 30.0,   # longest wait for a slot before 503
+    "admission_memory_percent": 90.0, # system memory use (psutil) at which requests get 503; None disables
+    # Chat history per session_id: bounded in memory, appended to SQLite in the background
+    "history_db_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversation_history.db"),  # None keeps it in memory only
+    "history_max_turns": 50,        # turns kept in memory per session
+    "history_max_sessions": 10000,
+    "history_memory_mb": 64,        # least recently used sessions evicted beyond this
+    "history_ttl_s": 24 * 3600,     # sessions idle this long expire from memory
+    # Response cache for repeated stateless questions (requests without a session_id)
+    "response_cache": True,
+    "response_cache_mb": 64,        # least recently used answers evicted beyond this
+    "response_cache_ttl_s": 3600,   # answers expire, so research results don't go stale
+    "response_cache_semantic": False,  # also reuse answers to near-duplicate questions (needs sentence-transformers)
+    "response_cache_embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
+    "response_cache_similarity": 0.92,  # cosine similarity a near-duplicate must reach
+    # Research cache: search results reused across requests, restarts and worker processes
+    "research_cache": True,
+    "research_cache_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "research_cache.db"),  # None keeps it in memory only
+    "research_cache_entries": 1024, # results kept in memory, least recently used evicted
+    "research_cache_ttl_s": 7 * 24 * 3600,   # evergreen queries
+    "research_cache_current_ttl_s": 900,     # queries about current events ("latest", "today", ...)
+    "research_cache_disk_entries": 100000
+}
+
 class SearchDecision(Enum):
     NO_SEARCH = "no_search"
     WIKI_ONLY = "wiki_only"
@@ -118,16 +216,44 @@ class EnhancedSearchEngine:
             return SearchDecision.WIKI_ONLY, "General information search"
         
         return SearchDecision.NO_SEARCH, "Simple query"
+    
+    def is_current(self, query: str) -> bool:
+        """Whether a query asks about current events, whose answers go stale quickly"""
+        words = set(normalize_prompt(query).split())
+        return any(word in words for word in self.search_triggers["current"] + ["update"])
+
+_wikipedia = None
+
+def lazy_wikipedia():
+    """Import wikipedia the first time research runs rather than at startup"""
+    global _wikipedia
+    if _wikipedia is None:
+        import wikipedia
+        wikipedia.set_lang("en")
+        _wikipedia = wikipedia
+    return _wikipedia
 
 class EnhancedResearcher:
     """Enhanced researcher with better content quality"""
     
-    def __init__(self):
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    # Searches in flight, shared by every researcher (the sync and async apps, old and new instances on reload)
+    inflight = SingleFlight()
+    
+    def __init__(self, cache: Optional[ResearchCache] = None):
         self.search_engine = EnhancedSearchEngine()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.cache = cache
+        self._session = None
+    
+    @property
+    def session(self):
+        """HTTP session for web search; requests is imported on first use"""
+        if self._session is None:
+            import requests
+            session = requests.Session()
+            session.headers.update({'User-Agent': self.USER_AGENT})
+            self._session = session
+        return self._session
     
     def calculate_relevance_score(self, content: str, query: str) -> float:
         """Calculate content relevance to query"""
@@ -151,6 +277,7 @@ class EnhancedResearcher:
         sources = []
         try:
             print(f"📖 Searching Wikipedia for best sources...", end=" ")
+            wikipedia = lazy_wikipedia()
             search_results = wikipedia.search(query, results=max_sources * 2)  # Get more to filter
             
             candidates = []
@@ -167,95 +294,113 @@ class EnhancedResearcher:
                 except:
                     continue
             
-            # Sort by relevance and take best ones
-            candidates.sort(key=lambda x: x['relevance'], reverse=True)
-            
-            for candidate in candidates[:max_sources]:
-                sources.append(SourceInfo(
-                    source_type="wikipedia",
-                    title=candidate['title'],
-                    content=candidate['content'],
-                    url=f"https://en.wikipedia.org/wiki/{candidate['title'].replace(' ', '_')}",
-                    reliability_score=0.9,
-                    relevance_score=candidate['relevance']
-                ))
-            
+            sources = self.wikipedia_sources(candidates, max_sources)
             print(f"✓ Found {len(sources)} high-quality sources")
             return sources
         except Exception as e:
             print(f"✗ Error: {str(e)[:30]}")
             return []
     
+    def wikipedia_sources(self, candidates: List[Dict], max_sources: int) -> List[SourceInfo]:
+        """Most relevant Wikipedia summaries ({'title', 'content', 'relevance'} dicts) as sources"""
+        # Sort by relevance and take best ones
+        candidates = sorted(candidates, key=lambda x: x['relevance'], reverse=True)
+        return [
+            SourceInfo(
+                source_type="wikipedia",
+                title=candidate['title'],
+                content=candidate['content'],
+                url=f"https://en.wikipedia.org/wiki/{candidate['title'].replace(' ', '_')}",
+                reliability_score=0.9,
+                relevance_score=candidate['relevance']
+            )
+            for candidate in candidates[:max_sources]
+        ]
+    
+    def web_search_queries(self, query: str) -> List[str]:
+        """Search engine queries tried for one question"""
+        # Multiple search strategies
+        search_queries = [
+            query,
+            f"{query} 2024 2025",
+            f"{query} latest research",
+            f"{query} official report"
+        ]
+        return search_queries[:2]  # Limit to avoid rate limiting
+    
+    def extract_web_candidates(self, html: bytes, query: str, search_query: str) -> List[Dict]:
+        """Relevant text snippets from one search results page"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        candidates = []
+        
+        # Enhanced content extraction
+        content_selectors = [
+            'div[data-content-feature="1"]',
+            'div.BNeawe.aCOpRe',
+            'div.BNeawe.s3v9rd',
+            'span.aCOpRe',
+            'div.VwiC3b'
+        ]
+        
+        for selector in content_selectors:
+            elements = soup.select(selector)
+            for element in elements:
+                text = element.get_text().strip()
+                if 150 < len(text) < 500 and not any(skip in text.lower() for skip in ['cookie', 'privacy', 'sign in']):
+                    relevance = self.calculate_relevance_score(text, query)
+                    if relevance > 0.2:  # Only keep relevant content
+                        candidates.append({
+                            'content': text,
+                            'relevance': relevance,
+                            'query': search_query
+                        })
+        return candidates
+    
+    def web_sources(self, all_candidates: List[Dict], max_sources: int) -> List[SourceInfo]:
+        """Deduplicated, most relevant web snippets as sources"""
+        # Sort by relevance and remove duplicates
+        seen_content = set()
+        unique_candidates = []
+        
+        for candidate in sorted(all_candidates, key=lambda x: x['relevance'], reverse=True):
+            content_hash = hash(candidate['content'][:100])
+            if content_hash not in seen_content:
+                seen_content.add(content_hash)
+                unique_candidates.append(candidate)
+        
+        # Take best candidates
+        return [
+            SourceInfo(
+                source_type="web",
+                title=f"Web Source ({candidate['query']})",
+                content=candidate['content'],
+                reliability_score=0.75,
+                relevance_score=candidate['relevance']
+            )
+            for candidate in unique_candidates[:max_sources]
+        ]
+    
     def search_web_enhanced(self, query: str, max_sources: int = 3) -> List[SourceInfo]:
         """Enhanced web search with better content extraction"""
         sources = []
         try:
             print(f"🌐 Searching web for latest information...", end=" ")
-            
-            # Multiple search strategies
-            search_queries = [
-                query,
-                f"{query} 2024 2025",
-                f"{query} latest research",
-                f"{query} official report"
-            ]
-            
             all_candidates = []
             
-            for search_query in search_queries[:2]:  # Limit to avoid rate limiting
+            for search_query in self.web_search_queries(query):
                 try:
                     search_url = f"https://www.google.com/search?q={quote(search_query)}&num=10"
                     response = self.session.get(search_url, timeout=8)
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Enhanced content extraction
-                        content_selectors = [
-                            'div[data-content-feature="1"]',
-                            'div.BNeawe.aCOpRe',
-                            'div.BNeawe.s3v9rd',
-                            'span.aCOpRe',
-                            'div.VwiC3b'
-                        ]
-                        
-                        for selector in content_selectors:
-                            elements = soup.select(selector)
-                            for element in elements:
-                                text = element.get_text().strip()
-                                if 150 < len(text) < 500 and not any(skip in text.lower() for skip in ['cookie', 'privacy', 'sign in']):
-                                    relevance = self.calculate_relevance_score(text, query)
-                                    if relevance > 0.2:  # Only keep relevant content
-                                        all_candidates.append({
-                                            'content': text,
-                                            'relevance': relevance,
-                                            'query': search_query
-                                        })
+                        all_candidates.extend(self.extract_web_candidates(response.content, query, search_query))
                     
                     time.sleep(1)  # Rate limiting
                 except:
                     continue
             
-            # Sort by relevance and remove duplicates
-            seen_content = set()
-            unique_candidates = []
-            
-            for candidate in sorted(all_candidates, key=lambda x: x['relevance'], reverse=True):
-                content_hash = hash(candidate['content'][:100])
-                if content_hash not in seen_content:
-                    seen_content.add(content_hash)
-                    unique_candidates.append(candidate)
-            
-            # Take best candidates
-            for candidate in unique_candidates[:max_sources]:
-                sources.append(SourceInfo(
-                    source_type="web",
-                    title=f"Web Source ({candidate['query']})",
-                    content=candidate['content'],
-                    reliability_score=0.75,
-                    relevance_score=candidate['relevance']
-                ))
-            
+            sources = self.web_sources(all_candidates, max_sources)
             print(f"✓ Found {len(sources)} relevant sources")
             return sources
             
@@ -263,8 +408,34 @@ class EnhancedResearcher:
             print(f"✗ Error: {str(e)[:30]}")
             return []
     
-    def research(self, query: str) -> Tuple[List[SourceInfo], SearchDecision]:
-        """Enhanced research with parallel processing"""
+    def research(self, query: str, max_sources: int = 3, timeout: float = 15) -> Tuple[List[SourceInfo], SearchDecision]:
+        """Research a query, from the research cache or joining an identical search already in flight.
+        
+        Concurrent requests for the same normalized query share one search
+        run; a waiter gives up after its own timeout with no sources.
+        """
+        cached = self.cached_sources(query, max_sources)
+        if cached is not None:
+            return cached
+        
+        key = (normalize_prompt(query), max_sources)
+        try:
+            (sources, search_decision), shared = self.inflight.do(
+                key, lambda: self.search_sources(query, max_sources, timeout), timeout=timeout
+            )
+        except FuturesTimeoutError:
+            print(f"⏱️ Shared research still running after {timeout:.1f}s, answering without sources")
+            return [], self.search_engine.should_search(query)[0]
+        if shared:
+            print("🔗 Joined identical research already in flight")
+        return list(sources), search_decision
+    
+    def search_sources(self, query: str, max_sources: int = 3, timeout: float = 15) -> Tuple[List[SourceInfo], SearchDecision]:
+        """Enhanced research with parallel processing.
+        
+        Searches still running after timeout seconds are abandoned and the
+        sources gathered so far are used.
+        """
         search_decision, reason = self.search_engine.should_search(query)
         print(f"🤔 Search Decision: {search_decision.value} ({reason})")
         
@@ -274,36 +445,98 @@ class EnhancedResearcher:
             return sources, search_decision
         
         # Use parallel processing for faster research
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            futures = []
-            
-            if search_decision in [SearchDecision.WIKI_ONLY, SearchDecision.BOTH]:
-                futures.append(executor.submit(self.search_wikipedia, query, 3))
-            
-            if search_decision in [SearchDecision.WEB_ONLY, SearchDecision.BOTH]:
-                futures.append(executor.submit(self.search_web_enhanced, query, 3))
-            
-            for future in as_completed(futures):
+        executor = ThreadPoolExecutor(max_workers=2)
+        futures = []
+        
+        if search_decision in [SearchDecision.WIKI_ONLY, SearchDecision.BOTH]:
+            futures.append(executor.submit(self.search_wikipedia, query, max_sources))
+        
+        if search_decision in [SearchDecision.WEB_ONLY, SearchDecision.BOTH]:
+            futures.append(executor.submit(self.search_web_enhanced, query, max_sources))
+        
+        complete = True
+        try:
+            for future in as_completed(futures, timeout=timeout):
                 try:
-                    result = future.result(timeout=15)
-                    sources.extend(result)
+                    sources.extend(future.result())
                 except:
                     continue
+        except FuturesTimeoutError:
+            complete = False
+            print(f"⏱️ Research timed out after {timeout:.1f}s, using {len(sources)} sources")
+        finally:
+            # Don't wait for abandoned searches
+            executor.shutdown(wait=False)
         
         # Sort all sources by relevance
         sources.sort(key=lambda x: x.relevance_score, reverse=True)
-        
-        return sources[:5], search_decision  # Limit to top 5 sources
+        sources = sources[:5]  # Limit to top 5 sources
+        if complete:
+            self.cache_sources(query, max_sources, search_decision, sources)
+        return sources, search_decision
+    
+    def cached_sources(self, query: str, max_sources: int) -> Optional[Tuple[List[SourceInfo], SearchDecision]]:
+        """(sources, search decision) from the research cache, or None"""
+        if self.cache is None:
+            return None
+        search_decision, _ = self.search_engine.should_search(query)
+        if search_decision == SearchDecision.NO_SEARCH:
+            return None
+        sources = self.cache.get(normalize_prompt(query), search_decision.value, max_sources)
+        if sources is None:
+            return None
+        print(f"💾 Research cache hit: {len(sources)} sources")
+        return [SourceInfo(**source) for source in sources], search_decision
+    
+    def cache_sources(self, query: str, max_sources: int, search_decision: SearchDecision, sources: List[SourceInfo]):
+        """Keep the result of a search that ran to completion (empty ones are likely failures, so aren't kept)"""
+        if self.cache is None or not sources:
+            return
+        self.cache.put(normalize_prompt(query), search_decision.value, max_sources,
+                       [asdict(source) for source in sources], current=self.search_engine.is_current(query))
 
 class TurboTalkAI:
     """Enhanced TurboTalk AI with clean output"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict] = None, model_path: Optional[str] = None):
+        self.config = {**INFERENCE_CONFIG, **(config or {})}
+        self.model_path = model_path or MODEL_PATH
+        self.startup = StartupProfiler()
         self.model = None
         self.tokenizer = None
-        self.researcher = EnhancedResearcher()
+        self.engine = None
+        self.speculative = None
+        self.prompt_lookup = None
+        self.compiled = None
+        self.onnx_generator = None
+        self.small_model = None
+        self.small_engine = None
+        self.router = None
+        self.lora = None
+        self.session_cache = SessionKVStore(max_bytes=self.config["session_cache_mb"] * 1024 * 1024)
+        # Persisted (user, answer) turns of a session; set when other processes may serve its turns
+        self.stored_turns: Optional[Callable[[str], List[Tuple[str, str]]]] = None
+        self.prefix_cache = PrefixKVCache()
+        self.response_cache = ResponseCache(
+            max_bytes=self.config["response_cache_mb"] * 1024 * 1024,
+            ttl_s=self.config["response_cache_ttl_s"],
+            similarity_threshold=self.config["response_cache_similarity"]
+        ) if self.config["response_cache"] else None
+        self.researcher = EnhancedResearcher(cache=ResearchCache(
+            db_path=self.config["research_cache_path"],
+            max_entries=self.config["research_cache_entries"],
+            ttl_s=self.config["research_cache_ttl_s"],
+            current_ttl_s=self.config["research_cache_current_ttl_s"],
+            max_disk_entries=self.config["research_cache_disk_entries"]
+        ) if self.config["research_cache"] else None)
+        self.generation_flight = SingleFlight()     # identical stateless generations in flight
         self.conversation_history = []
         self.thinking_history = []
+        self.ttft_history = deque(maxlen=1000)
+        self.active_requests = 0
+        self.active_lock = threading.Lock()
+        self.stop_stats = {"requests": 0, "stopped_early": 0, "tokens_saved": 0}
+        self.decode_ms_per_token = {}       # per model tier moving average, sizes max_new_tokens under a deadline
         self.research_enabled = True
         self.advanced_thinking = True
         
@@ -321,38 +554,82 @@ class TurboTalkAI:
         print("🚀 Loading Enhanced TurboTalk AI...")
         print(f"📱 Device: {DEVICE}")
         
-        if not os.path.exists(MODEL_PATH):
-            print(f"❌ Model path not found: {MODEL_PATH}")
+        if not os.path.exists(self.model_path):
+            print(f"❌ Model path not found: {self.model_path}")
             return False
         
         try:
             # Load tokenizer
             print("📝 Loading tokenizer...")
-            try:
-                self.tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH, local_files_only=True)
-            except:
-                self.tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
-            
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
+            with self.startup.phase("tokenizer"):
+                try:
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, local_files_only=True)
+                except:
+                    self.tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
+                
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
             
             # Load model
             print("🧠 Loading model...")
-            try:
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    MODEL_PATH, 
-                    local_files_only=True, 
-                    torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32
-                )
-            except:
-                self.model = GPT2LMHeadModel.from_pretrained(
-                    MODEL_PATH, 
-                    local_files_only=True, 
-                    torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32
+            if self.config["backend"] == "onnx" and DEVICE == "cuda":
+                print("⚠️ The ONNX backend is CPU-only; loading the PyTorch model")
+            if self.config["quantization"] == "int8" and DEVICE == "cuda":
+                print("⚠️ Int8 quantization is CPU-only; loading float16 weights")
+            if self.config["backend"] == "onnx" and DEVICE == "cpu":
+                with self.startup.phase("onnx model"):
+                    self.model = self.load_onnx_model()
+            elif self.config["quantization"] == "int8" and DEVICE == "cpu":
+                with self.startup.phase("int8 model"):
+                    self.model = load_int8_model(self.model_path, self.config["quantized_model_path"], local_files_only=True)
+                print("🗜️ Int8 quantized weights loaded")
+            else:
+                load_kwargs = self.weight_loading_kwargs()
+                with self.startup.phase("weights"):
+                    try:
+                        self.model = AutoModelForCausalLM.from_pretrained(self.model_path, **load_kwargs)
+                    except:
+                        self.model = GPT2LMHeadModel.from_pretrained(self.model_path, **load_kwargs)
+                
+                with self.startup.phase("to device"):
+                    if "device_map" not in load_kwargs:
+                        self.model.to(DEVICE)
+                    self.model.eval()
+            
+            with self.startup.phase("adapters and drafts"):
+                if self.config["lora_adapters"]:
+                    self.load_lora_adapters()
+                
+                if self.config["speculative"]:
+                    self.load_draft_model()
+                
+                if self.config["cascade"]:
+                    self.load_small_model()
+            
+            if self.config["prompt_lookup"]:
+                self.prompt_lookup = SpeculativeDecoder(
+                    self.model,
+                    PromptLookupProposer(self.config["prompt_lookup_ngram"], self.config["prompt_lookup_tokens"]),
+                    self.tokenizer,
+                    num_draft_tokens=self.config["prompt_lookup_tokens"],
+                    device=DEVICE,
+                    top_k=self.config["top_k"],
+                    top_p=self.config["top_p"],
+                    repetition_penalty=self.config["repetition_penalty"]
                 )
             
-            self.model.to(DEVICE)
-            self.model.eval()
+            if self.config["compile"] and self.onnx_generator is None:
+                with self.startup.phase("compile warmup"):
+                    self.enable_compiled_generation()
+            
+            if self.response_cache is not None and self.config["response_cache_semantic"]:
+                with self.startup.phase("response cache embedder"):
+                    self.response_cache.embed = build_embedder(self.config["response_cache_embedding_model"])
+            
+            if self.config["prefix_cache"]:
+                with self.startup.phase("prefix cache"):
+                    self.prefix_cache.build(self.model, self.tokenizer, self.system_prefix_text(), device=DEVICE)
+                print(f"⚡ System prompt prefix cached ({len(self.prefix_cache.token_ids)} tokens)")
             
             print("✅ Enhanced TurboTalk AI loaded successfully!")
             return True
@@ -361,69 +638,954 @@ class TurboTalkAI:
             print(f"❌ Loading failed: {e}")
             return False
     
-    def generate_response(self, prompt: str, temperature: float = 0.7) -> str:
-        """Generate enhanced response with clean output"""
+    def weight_loading_kwargs(self) -> Dict:
+        """from_pretrained arguments; with mmap_weights, tensors come straight from the mapped file"""
+        kwargs = {
+            "local_files_only": True,
+            "torch_dtype": torch.float16 if DEVICE == "cuda" else torch.float32,
+        }
+        if not self.config["mmap_weights"]:
+            return kwargs
+        if importlib.util.find_spec("accelerate") is None:
+            print("⚠️ mmap_weights needs accelerate; loading weights the default way")
+            return kwargs
+        
+        # Skip random init (weights land on the meta device first) and the extra .to(DEVICE) copy
+        kwargs["low_cpu_mem_usage"] = True
+        if any(os.path.exists(os.path.join(self.model_path, name))
+               for name in ("model.safetensors", "model.safetensors.index.json")):
+            kwargs["use_safetensors"] = True
+        if DEVICE == "cuda":
+            kwargs["device_map"] = DEVICE
+        return kwargs
+    
+    def load_onnx_model(self) -> OnnxCausalLM:
+        """Open the ONNX Runtime decoder, exporting the checkpoint first if needed"""
+        onnx_path = self.config["onnx_model_path"] or f"{self.model_path}_onnx"
+        if not is_onnx_export(onnx_path):
+            print(f"📦 Exporting ONNX decoder to: {onnx_path}")
+            export_checkpoint(self.model_path, onnx_path, local_files_only=True)
+        
+        model = OnnxCausalLM(onnx_path, num_threads=self.config["onnx_threads"])
+        self.onnx_generator = OnnxGenerator(
+            model,
+            self.tokenizer,
+            top_k=self.config["top_k"],
+            top_p=self.config["top_p"],
+            repetition_penalty=self.config["repetition_penalty"]
+        )
+        print("⚡ ONNX Runtime backend loaded")
+        return model
+    
+    def load_lora_adapters(self) -> bool:
+        """Register the configured LoRA adapters on the shared base model"""
+        if self.onnx_generator is not None:
+            print("⚠️ LoRA adapters need the PyTorch backend; serving the base model only")
+            return False
+        
+        self.lora = LoraManager(self.model, max_bytes=self.config["lora_cache_mb"] * 1024 * 1024, device=DEVICE)
+        for name, path in self.config["lora_adapters"].items():
+            try:
+                self.lora.register(name, path)
+                print(f"🧩 LoRA adapter registered: {name} ({path})")
+            except Exception as e:
+                print(f"❌ LoRA adapter {name} failed to register: {e}")
+        if not self.lora.names:
+            self.lora = None
+            return False
+        return True
+    
+    def load_draft_model(self) -> bool:
+        """Enable speculative decoding with a small draft model, if its drafts get accepted often enough.
+        
+        Speculative decoding replaces the batching engine and every rejected
+        draft costs an extra forward pass, so it stays off without a trained
+        draft model or when a probe generation's acceptance is too low.
+        """
+        if not self.config["draft_model_path"]:
+            print("⚠️ Speculative decoding needs draft_model_path; serving without it (prompt lookup still drafts from sources)")
+            return False
         try:
-            # Research phase
-            sources = []
-            search_decision = SearchDecision.NO_SEARCH
+            print(f"📝 Loading draft model from: {self.config['draft_model_path']}")
+            draft_model = AutoModelForCausalLM.from_pretrained(
+                self.config["draft_model_path"],
+                local_files_only=True,
+                torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32
+            )
+            draft_model.to(DEVICE)
+            draft_model.eval()
             
-            if self.research_enabled:
-                sources, search_decision = self.researcher.research(prompt)
+            if draft_model.config.vocab_size != self.model.config.vocab_size:
+                print("❌ Draft model vocabulary does not match the main model")
+                return False
             
-            # Build enhanced prompt with research
-            system_parts = [
-                f"You are {self.ai_identity['name']} v{self.ai_identity['version']}, an advanced AI assistant.",
-                "Provide clear, accurate, and comprehensive responses."
-            ]
+            decoder = SpeculativeDecoder(
+                self.model,
+                DraftModelProposer(draft_model, device=DEVICE),
+                self.tokenizer,
+                num_draft_tokens=self.config["num_draft_tokens"],
+                device=DEVICE,
+                top_k=self.config["top_k"],
+                top_p=self.config["top_p"],
+                repetition_penalty=self.config["repetition_penalty"]
+            )
+            probe_ids = self.tokenizer.encode("User: Tell me about the history of the printing press.\nTurboTalk AI:")
+            report = decoder.probe(probe_ids)
+            acceptance = report["acceptance_rate"] or 0.0
+            print(f"🎯 Draft acceptance on a probe generation: {acceptance:.0%} "
+                  f"({report['tokens_per_verify_pass']} tokens per verify pass)")
+            if acceptance < self.config["speculative_min_acceptance"]:
+                print(f"⚠️ Acceptance below {self.config['speculative_min_acceptance']:.0%}: "
+                      "speculative decoding stays off, the batching engine serves instead")
+                return False
             
-            if sources:
-                system_parts.append("Use the following research information to enhance your response:")
-                for i, source in enumerate(sources[:3], 1):
-                    system_parts.append(f"Source {i} [{source.source_type}]: {source.content}")
-            
-            system_parts.append("Provide a well-structured, informative response.")
-            
-            system_prompt = " ".join(system_parts)
-            full_prompt = f"{system_prompt}\n\nUser: {prompt}\nTurboTalk AI:"
-            
-            # Generate response
-            inputs = self.tokenizer.encode(full_prompt, return_tensors="pt", max_length=1000, truncation=True)
-            inputs = inputs.to(DEVICE)
-            
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    max_length=inputs.shape[1] + 250,
-                    temperature=temperature,
-                    top_p=0.9,
-                    top_k=50,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    repetition_penalty=1.1
+            self.speculative = decoder
+            print(f"🎯 Speculative decoding enabled ({self.config['num_draft_tokens']} draft tokens per pass)")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Draft model loading failed: {e}")
+            self.speculative = None
+            return False
+    
+    def load_small_model(self) -> bool:
+        """Enable the model cascade with a small model for small talk"""
+        try:
+            if self.config["small_model_path"]:
+                print(f"📝 Loading small model from: {self.config['small_model_path']}")
+                small_model = AutoModelForCausalLM.from_pretrained(
+                    self.config["small_model_path"],
+                    local_files_only=True,
+                    torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32
                 )
+                small_model.to(DEVICE)
+                small_model.eval()
+                
+                if small_model.config.vocab_size != self.model.config.vocab_size:
+                    print("❌ Small model vocabulary does not match the main model")
+                    return False
+            else:
+                small_model = build_shallow_draft(self.model, self.config["small_model_layers"])
             
-            # Extract and clean response
-            full_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            self.small_model = small_model
+            self.router = CascadeRouter(self.config["cascade_max_words"], self.config["cascade_small_decisions"])
+            print(f"🔀 Model cascade enabled (small talk up to {self.config['cascade_max_words']} words → small model)")
+            return True
             
-            if "TurboTalk AI:" in full_response:
-                response = full_response.split("TurboTalk AI:")[-1].strip()
+        except Exception as e:
+            print(f"❌ Small model loading failed: {e}")
+            self.small_model = None
+            self.router = None
+            return False
+    
+    def enable_compiled_generation(self) -> bool:
+        """Compile the static-cache generate path and warm up every prompt bucket"""
+        print("🔧 Compiling generation graphs (warming up prompt buckets)...")
+        self.compiled = CompiledGenerator(
+            self.model,
+            self.tokenizer,
+            buckets=self.config["compile_buckets"],
+            max_new_tokens=self.config["max_new_tokens"],
+            device=DEVICE,
+            mode=self.config["compile_mode"]
+        )
+        if not self.compiled.warmup(self.generation_kwargs(0.7)):
+            return False
+        
+        report = self.compiled.warmup_report
+        print(f"🔧 Compiled generation ready in {report['warmup_seconds']}s: "
+              f"{report['eager_ms_per_token']} → {report['compiled_ms_per_token']} ms/token "
+              f"({report['per_token_speedup']}x)")
+        return True
+    
+    def start_engine(self) -> bool:
+        """Serve generation through the continuous batching engine"""
+        if self.model is None:
+            print("❌ Cannot start engine before the model is loaded")
+            return False
+        
+        if self.speculative is not None:
+            print("🎯 Speculative decoding is on: serving single-stream without the batching engine")
+            return False
+        
+        if self.compiled is not None and self.compiled.enabled:
+            print("🔧 Compiled generation is on: serving single-stream without the batching engine")
+            return False
+        
+        if self.engine is None:
+            paged_cache = None
+            if self.config["kv_cache"] == "paged" and self.onnx_generator is not None:
+                print("⚠️ Paged KV needs the PyTorch backend; using contiguous KV with ONNX")
+            elif self.config["kv_cache"] == "paged":
+                paged_cache = PagedKVCache.from_model(
+                    self.model,
+                    max_bytes=self.config["paged_kv_mb"] * 1024 * 1024,
+                    block_size=self.config["kv_block_size"],
+                    device=DEVICE
+                )
+                print(f"🧱 Paged KV cache: {paged_cache.num_blocks} blocks of {paged_cache.block_size} tokens")
+                if self.config["prompt_lookup"]:
+                    print("⚠️ Prompt lookup needs contiguous KV; batched requests decode without it in paged mode")
+            
+            self.engine = ContinuousBatchingEngine(
+                self.model,
+                self.tokenizer,
+                device=DEVICE,
+                max_batch_size=self.config["max_batch_size"],
+                top_p=self.config["top_p"],
+                top_k=self.config["top_k"],
+                repetition_penalty=self.config["repetition_penalty"],
+                paged_cache=paged_cache,
+                prefill_chunk_size=self.config["prefill_chunk_size"],
+                prompt_lookup_tokens=self.config["prompt_lookup_tokens"],
+                prompt_lookup_ngram=self.config["prompt_lookup_ngram"],
+                lora=self.lora
+            )
+            self.register_prefix_with_engine()
+            self.engine.start()
+        
+        if self.small_model is not None and self.small_engine is None:
+            self.small_engine = ContinuousBatchingEngine(
+                self.small_model,
+                self.tokenizer,
+                device=DEVICE,
+                max_batch_size=self.config["max_batch_size"],
+                top_p=self.config["top_p"],
+                top_k=self.config["top_k"],
+                repetition_penalty=self.config["repetition_penalty"],
+                prefill_chunk_size=self.config["prefill_chunk_size"]
+            )
+            self.small_engine.start()
+        return True
+    
+    def warmup(self, prompt: str = "Hello", max_new_tokens: int = 8) -> float:
+        """Run one short generation end to end; returns its latency in ms"""
+        start = time.time()
+        inputs, _, _ = self.prepare_prompt(prompt, research_enabled=False)
+        self.submit_generation(inputs, 0.7, max_new_tokens=max_new_tokens).result(timeout=120)
+        return (time.time() - start) * 1000
+    
+    def in_flight(self) -> int:
+        """Requests still being served by this instance"""
+        engines = [e for e in (self.engine, self.small_engine) if e is not None]
+        return max(self.active_requests, sum(e.in_flight() for e in engines))
+    
+    def adopt_state(self, previous: "TurboTalkAI"):
+        """Carry conversation state over from the instance this one replaces.
+        
+        Session turns move across but their KV does not: it belongs to the
+        old weights, so each session re-prefills on its next turn.
+        """
+        self.conversation_history = previous.conversation_history
+        self.thinking_history = previous.thinking_history
+        self.ai_identity = previous.ai_identity
+        self.research_enabled = previous.research_enabled
+        self.advanced_thinking = previous.advanced_thinking
+        self.stored_turns = previous.stored_turns
+        for session_id, turns in previous.session_cache.snapshot_turns().items():
+            self.session_cache.put(session_id, SessionState(turns=turns))
+    
+    def shutdown(self):
+        """Stop background engines and drop every reference to the weights"""
+        for engine in (self.engine, self.small_engine):
+            if engine is not None:
+                engine.stop()
+        self.engine = self.small_engine = None
+        self.speculative = self.prompt_lookup = self.compiled = self.onnx_generator = None
+        self.small_model = self.router = self.lora = None
+        self.prefix_cache = PrefixKVCache()
+        self.session_cache = SessionKVStore(max_bytes=self.config["session_cache_mb"] * 1024 * 1024)
+        self.model = None
+    
+    def register_prefix_with_engine(self):
+        """Let paged engine requests share the system prefix's KV blocks"""
+        if self.engine is not None and self.prefix_cache.past_key_values is not None:
+            self.engine.register_prefix("system", self.prefix_cache.token_ids, self.prefix_cache.past_key_values)
+    
+    def sampling_params(self, temperature: float, overrides: Optional[Dict] = None) -> SamplingParams:
+        """Per-request sampling settings: config defaults plus any top_k/top_p/repetition_penalty/seed overrides"""
+        params = {
+            "top_k": self.config["top_k"],
+            "top_p": self.config["top_p"],
+            "repetition_penalty": self.config["repetition_penalty"],
+            **{key: value for key, value in (overrides or {}).items() if value is not None}
+        }
+        return SamplingParams(temperature=temperature, **params)
+    
+    def generation_kwargs(self, temperature: float, sampling: Optional[SamplingParams] = None) -> Dict:
+        """Sampling settings shared by every model.generate call"""
+        sampling = sampling or self.sampling_params(temperature)
+        return {
+            "temperature": sampling.temperature,
+            "top_p": sampling.top_p,
+            "top_k": sampling.top_k,
+            "do_sample": True,
+            "pad_token_id": self.tokenizer.eos_token_id,
+            "eos_token_id": self.tokenizer.eos_token_id,
+            "repetition_penalty": sampling.repetition_penalty
+        }
+    
+    def max_context_tokens(self) -> int:
+        """Longest token sequence the loaded model can attend over"""
+        config = self.model.config
+        return (getattr(config, "n_positions", None)
+                or getattr(config, "max_position_embeddings", None)
+                or self.config["max_prompt_tokens"] + self.config["max_new_tokens"])
+    
+    def submit_generation(self, inputs: torch.Tensor, temperature: float, past_key_values=None,
+                          stream: bool = False, keep_cache: bool = False, prompt_lookup: bool = False,
+                          sampling: Optional[Dict] = None, deadline: Optional[Deadline] = None,
+                          tier: str = LARGE_TIER, adapter: Optional[str] = None,
+                          max_new_tokens: Optional[int] = None) -> GenerationRequest:
+        """Start generating for an encoded prompt and return the request handle.
+        
+        prompt_lookup drafts tokens from the prompt itself; worth it when the
+        prompt carries research sources the answer is likely to quote.
+        sampling overrides top_k/top_p/repetition_penalty/seed for this request;
+        model.generate honours the seed by seeding torch's global RNG under a lock.
+        deadline caps max_new_tokens to what the remaining budget affords and
+        ends the answer at a sentence boundary as the budget runs out.
+        tier SMALL_TIER generates with the cascade's small model instead.
+        adapter selects a registered LoRA adapter on top of the base model.
+        max_new_tokens overrides the configured limit (warmup uses a short one).
+        """
+        if adapter is not None:
+            if self.lora is None or adapter not in self.lora.paths:
+                raise ValueError(f"Unknown LoRA adapter: {adapter}")
+            self.lora.get(adapter)  # load now rather than inside the engine's forward pass
+        params = self.sampling_params(temperature, sampling)
+        small = tier == SMALL_TIER and self.small_model is not None
+        if small:
+            # KV from the full model (session or prefix) is useless to the small one
+            past_key_values, keep_cache, prompt_lookup = None, False, False
+        model = self.small_model if small else self.model
+        engine = self.small_engine if small else self.engine
+        
+        max_new_tokens = max_new_tokens or self.config["max_new_tokens"]
+        soft_deadline = hard_deadline = None
+        if deadline is not None:
+            max_new_tokens = min(max_new_tokens, self.deadline_token_budget(deadline, tier))
+            soft_deadline, hard_deadline = deadline.at(self.config["deadline_sentence_share"]), deadline.end
+        prompt_lookup = prompt_lookup and self.config["prompt_lookup"]
+        # Static-cache graphs start from an empty cache, so they skip prefix and session reuse
+        use_compiled = (engine is None and self.speculative is None and not prompt_lookup and not small
+                        and not keep_cache and past_key_values is None and adapter is None
+                        and self.compiled is not None and self.compiled.accepts(inputs.shape[1]))
+        # The cached system prefix is base-model KV, so adapter requests prefill it themselves
+        if past_key_values is None and not use_compiled and not small and adapter is None:
+            past_key_values = self.lookup_prefix_cache(inputs[0].tolist())
+        
+        stopper = StopChecker(
+            self.tokenizer, self.config["stop_sequences"], self.config["max_sentences"],
+            soft_deadline=soft_deadline, hard_deadline=hard_deadline
+        )
+        
+        if engine is not None:
+            return engine.submit(
+                inputs[0].tolist(),
+                sampling=params,
+                max_new_tokens=max_new_tokens,
+                stream=stream,
+                past_key_values=past_key_values,
+                keep_cache=keep_cache,
+                prompt_lookup=prompt_lookup,
+                stopper=stopper,
+                adapter=adapter
+            )
+        
+        # No engine: run model.generate directly, filling in the same handle
+        request = GenerationRequest(
+            input_ids=inputs[0].tolist(),
+            sampling=params,
+            max_new_tokens=max_new_tokens,
+            token_queue=queue.Queue() if stream else None,
+            keep_cache=keep_cache,
+            stopper=stopper,
+            adapter=adapter
+        )
+        
+        def on_token(token_id: int) -> bool:
+            if request.token_queue is not None:
+                request.token_queue.put(token_id)
+            if stopper.add(token_id):
+                request.finish_reason = "stop"
+                return False
+            return not request.cancelled
+        
+        # A configured draft model wins; otherwise grounded answers copy from their sources.
+        # The ONNX backend has no model.generate, so it samples through its own loop.
+        decoder = None if small else self.speculative or (self.prompt_lookup if prompt_lookup else None) or self.onnx_generator
+        
+        # Applied in the generating thread, so concurrent requests keep their own adapters
+        adapter_context = self.lora.activate([adapter]) if adapter is not None else nullcontext()
+        
+        def run_generate():
+            request.started_at = time.time()
+            try:
+                with adapter_context:
+                    if decoder is not None:
+                        request.generated_ids, cache = decoder.generate(
+                            request.input_ids,
+                            temperature=temperature,
+                            max_new_tokens=max_new_tokens,
+                            past_key_values=past_key_values,
+                            on_token=on_token,
+                            sampling=params
+                        )
+                        if keep_cache:
+                            request.past_key_values = cache
+                        return
+                
+                    stopping_criteria = [StopCheckerCriteria(stopper), CancelledCriteria(request)]
+                    if use_compiled:
+                        with seeded_global_rng(params.seed):
+                            new_ids = self.compiled.generate(
+                                inputs,
+                                self.generation_kwargs(temperature, params),
+                                streamer=TokenQueueStreamer(request.token_queue) if stream else None,
+                                stopping_criteria=stopping_criteria,
+                                max_new_tokens=max_new_tokens
+                            )
+                        if new_ids is not None:
+                            request.generated_ids = new_ids
+                            return
+                
+                    with torch.no_grad(), seeded_global_rng(params.seed):
+                        outputs = model.generate(
+                            inputs,
+                            max_length=inputs.shape[1] + max_new_tokens,
+                            past_key_values=from_legacy_cache(past_key_values),
+                            streamer=TokenQueueStreamer(request.token_queue) if stream else None,
+                            stopping_criteria=StoppingCriteriaList(stopping_criteria),
+                            return_dict_in_generate=True,
+                            **self.generation_kwargs(temperature, params)
+                        )
+                    request.generated_ids = outputs.sequences[0][inputs.shape[1]:].tolist()
+                    if keep_cache:
+                        request.past_key_values = to_legacy_cache(outputs.past_key_values)
+            except Exception as e:
+                request.error = str(e)
+            finally:
+                if stopper.stopped:
+                    request.finish_reason = "stop"
+                elif request.cancelled:
+                    request.finish_reason = "cancelled"
+                request.finished_at = time.time()
+                if request.token_queue is not None:
+                    request.token_queue.put(None)
+                request.done.set()
+        
+        if stream:
+            threading.Thread(target=run_generate, daemon=True).start()
+        else:
+            run_generate()
+        return request
+    
+    def deadline_token_budget(self, deadline: Deadline, tier: str = LARGE_TIER) -> int:
+        """Largest max_new_tokens the remaining budget pays for at the tier's measured decode rate"""
+        max_new_tokens = self.config["max_new_tokens"]
+        ms_per_token = self.decode_ms_per_token.get(tier)
+        if ms_per_token:
+            affordable = int(deadline.remaining_ms() / ms_per_token)
+            if affordable < max_new_tokens:
+                max_new_tokens = max(self.config["deadline_min_new_tokens"], affordable)
+                deadline.trim("generation", f"max_new_tokens {self.config['max_new_tokens']} -> {max_new_tokens}")
+        return max_new_tokens
+    
+    def record_decode_rate(self, request: GenerationRequest, tier: str = LARGE_TIER):
+        """Fold a finished request's per-token decode time into its tier's moving average"""
+        start = request.first_token_at or request.started_at
+        steps = len(request.generated_ids) - (1 if request.first_token_at else 0)
+        if request.finished_at is None or start is None or steps <= 0:
+            return
+        ms_per_token = (request.finished_at - start) * 1000 / steps
+        previous = self.decode_ms_per_token.get(tier)
+        self.decode_ms_per_token[tier] = ms_per_token if previous is None else 0.9 * previous + 0.1 * ms_per_token
+    
+    def generate_tokens(self, inputs: torch.Tensor, temperature: float) -> List[int]:
+        """Generate new token ids for an encoded prompt"""
+        request = self.submit_generation(inputs, temperature)
+        request.result()
+        return self.response_tokens(request)
+    
+    def research_budget(self, research_enabled: Optional[bool] = None,
+                        deadline: Optional[Deadline] = None) -> Optional[Tuple[int, float]]:
+        """(max_sources, timeout in seconds) for a request's research, or None to skip it"""
+        if research_enabled is None:
+            research_enabled = self.research_enabled
+        
+        if not research_enabled:
+            return None
+        if deadline is None:
+            return 3, 15.0
+        
+        # Leave most of the budget for generation: fewer sources, abandoned slow searches
+        budget_ms = deadline.remaining_ms() * self.config["deadline_research_share"]
+        if budget_ms < self.config["deadline_min_research_ms"]:
+            deadline.trim("research", f"skipped ({budget_ms:.0f} ms available)")
+            return None
+        
+        max_sources = 3 if deadline.budget_ms >= self.config["deadline_full_research_ms"] else 1
+        return max_sources, budget_ms / 1000
+    
+    def trim_research(self, sources: List[SourceInfo], max_sources: int, elapsed: float, timeout: float,
+                      deadline: Optional[Deadline] = None) -> List[SourceInfo]:
+        """Cap the sources to the budget and record on the deadline what research gave up"""
+        if deadline is None:
+            return sources
+        trimmed = []
+        if max_sources < 3:
+            sources = sources[:max_sources]
+            trimmed.append(f"limited to {max_sources} source")
+        if elapsed >= timeout:
+            trimmed.append(f"cut off after {timeout * 1000:.0f} ms")
+        if trimmed:
+            deadline.trim("research", ", ".join(trimmed))
+        return sources
+    
+    def run_research(self, prompt: str, research_enabled: Optional[bool] = None,
+                     deadline: Optional[Deadline] = None) -> Tuple[List[SourceInfo], SearchDecision]:
+        """Research phase shared by every prompt builder"""
+        budget = self.research_budget(research_enabled, deadline)
+        if budget is None:
+            return [], SearchDecision.NO_SEARCH
+        
+        max_sources, timeout = budget
+        start = time.time()
+        sources, search_decision = self.researcher.research(prompt, max_sources=max_sources, timeout=timeout)
+        return self.trim_research(sources, max_sources, time.time() - start, timeout, deadline), search_decision
+    
+    def system_prefix_text(self) -> str:
+        """Constant opening of every prompt (depends only on ai_identity)"""
+        return " ".join([
+            f"You are {self.ai_identity['name']} v{self.ai_identity['version']}, an advanced AI assistant.",
+            "Provide clear, accurate, and comprehensive responses."
+        ])
+    
+    def lookup_prefix_cache(self, input_ids: List[int]):
+        """Fork the precomputed system-prefix KV for a prompt, rebuilding it if ai_identity changed"""
+        if not self.config["prefix_cache"] or self.model is None:
+            return None
+        
+        prefix_text = self.system_prefix_text()
+        if not self.prefix_cache.is_current(prefix_text):
+            print("🔄 AI identity changed, rebuilding system prompt cache")
+            self.prefix_cache.build(self.model, self.tokenizer, prefix_text, device=DEVICE)
+            self.register_prefix_with_engine()
+        return self.prefix_cache.match(input_ids)
+    
+    def build_system_prompt(self, sources: List[SourceInfo]) -> str:
+        """Build the system preamble, optionally grounded in research sources"""
+        system_parts = [self.system_prefix_text()]
+        
+        if sources:
+            system_parts.append("Use the following research information to enhance your response:")
+            for i, source in enumerate(sources[:3], 1):
+                system_parts.append(f"Source {i} [{source.source_type}]: {source.content}")
+        
+        system_parts.append("Provide a well-structured, informative response.")
+        
+        return " ".join(system_parts)
+    
+    def prepare_prompt(self, prompt: str, research_enabled: Optional[bool] = None,
+                       deadline: Optional[Deadline] = None,
+                       research: Optional[Tuple[List[SourceInfo], SearchDecision]] = None
+                       ) -> Tuple[torch.Tensor, List[SourceInfo], SearchDecision]:
+        """Run research (unless the caller already did) and encode the full prompt"""
+        sources, search_decision = research or self.run_research(prompt, research_enabled, deadline)
+        
+        system_prompt = self.build_system_prompt(sources)
+        full_prompt = f"{system_prompt}\n\nUser: {prompt}\nTurboTalk AI:"
+        
+        inputs = self.tokenizer.encode(full_prompt, return_tensors="pt", max_length=self.config["max_prompt_tokens"], truncation=True)
+        return inputs.to(DEVICE), sources, search_decision
+    
+    def prepare_session_prompt(self, session_id: str, prompt: str, research_enabled: Optional[bool] = None,
+                               deadline: Optional[Deadline] = None, adapter: Optional[str] = None,
+                               research: Optional[Tuple[List[SourceInfo], SearchDecision]] = None):
+        """Encode the next turn of a session, reusing its cached KV where possible.
+
+        Returns (inputs, sources, search_decision, past_key_values) where the
+        cache covers a prefix of inputs, so only the new turn is prefilled.
+        """
+        sources, search_decision = research or self.run_research(prompt, research_enabled, deadline)
+        
+        # Sources are scoped to this turn rather than the shared system prompt
+        turn_text = f"User: {prompt}\nTurboTalk AI:"
+        if sources:
+            research = " ".join(f"Source {i} [{s.source_type}]: {s.content}" for i, s in enumerate(sources[:3], 1))
+            turn_text = f"Research for the next question: {research}\n{turn_text}"
+        
+        state = self.session_cache.get(session_id)
+        if self.stored_turns is not None:
+            state = self.sync_session(session_id, state)
+        if state is not None and state.past_key_values is not None:
+            new_ids = state.pending_ids + self.tokenizer.encode(
+                "\n" + turn_text, max_length=self.config["max_prompt_tokens"], truncation=True
+            )
+            if len(state.token_ids) + len(new_ids) + self.config["max_new_tokens"] <= self.max_context_tokens():
+                inputs = torch.tensor([state.token_ids + new_ids], device=DEVICE)
+                # KV computed under another LoRA adapter is stale; the tokens are still the conversation
+                past_key_values = state.past_key_values if state.adapter == adapter else None
+                return inputs, sources, search_decision, past_key_values
+        
+        # Cold start, evicted KV or context overflow: re-prefill the most recent turns
+        turns = list(state.turns) if state is not None else []
+        while True:
+            history = "".join(f"User: {user}\nTurboTalk AI: {assistant}\n" for user, assistant in turns)
+            full_prompt = f"{self.build_system_prompt([])}\n\n{history}{turn_text}"
+            input_ids = self.tokenizer.encode(full_prompt)
+            if not turns or len(input_ids) <= self.config["max_prompt_tokens"]:
+                break
+            turns.pop(0)
+        
+        inputs = torch.tensor([input_ids[:self.config["max_prompt_tokens"]]], device=DEVICE)
+        return inputs, sources, search_decision, None
+    
+    def sync_session(self, session_id: str, state: Optional[SessionState]) -> Optional[SessionState]:
+        """Check a session against its persisted turns, which may include turns another worker served.
+
+        Local state that lacks the last stored turn is stale (its KV misses
+        the newer turns) and is replaced by the stored turns, which the caller
+        then re-prefills.
+        """
+        stored = self.stored_turns(session_id)[-self.config["session_history_turns"]:]
+        if not stored or (state is not None and stored[-1] in state.turns):
+            return state
+        state = SessionState(turns=stored)
+        self.session_cache.put(session_id, state)
+        return state
+    
+    def update_session(self, session_id: str, inputs: torch.Tensor, request: GenerationRequest, prompt: str, response: str):
+        """Keep the finished turn's KV so the next turn only prefills new tokens"""
+        previous = self.session_cache.peek(session_id)
+        turns = (list(previous.turns) if previous is not None else []) + [(prompt, response)]
+        new_tokens = request.generated_ids
+        
+        state = SessionState(turns=turns[-self.config["session_history_turns"]:], adapter=request.adapter)
+        if request.past_key_values is not None and new_tokens:
+            if request.stopper is not None and request.stopper.stopped:
+                # Drop the stop sequence from the cache so the next turn doesn't continue after it
+                state.token_ids = inputs[0].tolist() + new_tokens[:request.stopper.kept_tokens()]
+                state.past_key_values = slice_cache_row(request.past_key_values, 0, 0, len(state.token_ids))
             else:
-                input_text = self.tokenizer.decode(inputs[0], skip_special_tokens=True)
-                response = full_response[len(input_text):].strip()
+                state.token_ids = inputs[0].tolist() + new_tokens[:-1]
+                state.past_key_values = request.past_key_values
+                if new_tokens[-1] != self.tokenizer.eos_token_id:
+                    state.pending_ids = [new_tokens[-1]]
+        
+        self.session_cache.put(session_id, state)
+    
+    def response_tokens(self, request: GenerationRequest, deadline: Optional[Deadline] = None,
+                        tier: str = LARGE_TIER) -> List[int]:
+        """Generated tokens up to the stop point, counting what stopping early saved"""
+        new_tokens = request.generated_ids
+        self.stop_stats["requests"] += 1
+        self.record_decode_rate(request, tier)
+        if request.stopper is not None and request.stopper.stopped:
+            self.stop_stats["stopped_early"] += 1
+            self.stop_stats["tokens_saved"] += max(0, request.max_new_tokens - len(new_tokens))
+            if deadline is not None and request.stopper.reason == "deadline":
+                deadline.trim("answer", f"stopped after {len(new_tokens)} tokens")
+            new_tokens = new_tokens[:request.stopper.kept_tokens()]
+        return new_tokens
+    
+    def route(self, prompt: str, sources: List[SourceInfo], adapter: Optional[str] = None) -> str:
+        """Model tier for a prompt: grounded answers, adapters and substantial queries need the full model"""
+        if self.router is None or sources or adapter:
+            return LARGE_TIER
+        # Classify the query itself, whether or not research is enabled for it
+        search_decision, _ = self.researcher.search_engine.should_search(prompt)
+        tier, reason = self.router.route(prompt, search_decision.value)
+        print(f"🔀 Routed to {tier} model ({reason})")
+        return tier
+    
+    def extract_response(self, inputs: torch.Tensor, new_tokens: List[int]) -> str:
+        """Decode generated tokens into a cleaned answer"""
+        full_response = self.tokenizer.decode(inputs[0].tolist() + new_tokens, skip_special_tokens=True)
+        
+        if "TurboTalk AI:" in full_response:
+            response = full_response.split("TurboTalk AI:")[-1].strip()
+        else:
+            input_text = self.tokenizer.decode(inputs[0], skip_special_tokens=True)
+            response = full_response[len(input_text):].strip()
+        
+        return self.clean_response(response)
+    
+    def response_cache_partition(self, temperature: float, research_enabled: Optional[bool] = None,
+                                 sampling: Optional[Dict] = None, adapter: Optional[str] = None) -> Tuple:
+        """Request settings besides the prompt that shape an answer; cache hits never cross them"""
+        if research_enabled is None:
+            research_enabled = self.research_enabled
+        return bool(research_enabled), round(temperature, 1), adapter, tuple(sorted((sampling or {}).items()))
+    
+    def cached_response(self, prompt: str, temperature: float, research_enabled: Optional[bool] = None,
+                        session_id: Optional[str] = None, sampling: Optional[Dict] = None,
+                        adapter: Optional[str] = None, record: bool = True):
+        """(entry, hit kind) from the response cache for a stateless request, or None"""
+        if self.response_cache is None or session_id:
+            return None
+        partition = self.response_cache_partition(temperature, research_enabled, sampling, adapter)
+        return self.response_cache.get(prompt, partition, record=record)
+    
+    def cache_response(self, prompt: str, temperature: float, research_enabled: Optional[bool], sampling: Optional[Dict],
+                       adapter: Optional[str], deadline: Optional[Deadline], value: Dict, cost_s: float,
+                       sources: List[SourceInfo], search_decision: SearchDecision):
+        """Keep a finished stateless answer, unless a deadline cut it short or research it needed came back empty"""
+        if self.response_cache is None or (deadline is not None and deadline.trimmed):
+            return
+        if search_decision != SearchDecision.NO_SEARCH and not sources:
+            # A timed-out search (or research skipped on a stale cache check) must not pin a sourceless answer
+            return
+        partition = self.response_cache_partition(temperature, research_enabled, sampling, adapter)
+        self.response_cache.put(prompt, partition, value, cost_s)
+    
+    def hold(self) -> Callable[[], None]:
+        """Count a request as in flight on this instance until the returned release() (safe to call twice)"""
+        with self.active_lock:
+            self.active_requests += 1
+        released = []
+        
+        def release():
+            with self.active_lock:
+                if released:
+                    return
+                released.append(True)
+                self.active_requests -= 1
+        
+        return release
+    
+    @contextmanager
+    def track_request(self):
+        """Count a request as in flight on this instance; a hot reload waits for them"""
+        release = self.hold()
+        try:
+            yield
+        finally:
+            release()
+    
+    def generate_response(self, prompt: str, temperature: float = 0.7, research_enabled: Optional[bool] = None,
+                          session_id: Optional[str] = None, sampling: Optional[Dict] = None,
+                          deadline: Optional[Deadline] = None, adapter: Optional[str] = None,
+                          research: Optional[Tuple[List[SourceInfo], SearchDecision]] = None) -> str:
+        """Generate enhanced response with clean output.
+        
+        With a deadline (the request's deadline_ms), research and generation
+        shrink to fit it and record what they trimmed on the deadline.
+        adapter picks one of the registered LoRA adapters for this request.
+        research passes in (sources, search_decision) gathered by the caller
+        (the async app researches on its event loop) instead of researching here.
+        Requests without a session_id may be answered from the response cache,
+        and identical ones running concurrently share a single generation.
+        """
+        cached = self.cached_response(prompt, temperature, research_enabled, session_id, sampling, adapter)
+        if cached is not None:
+            entry, kind = cached
+            print(f"💾 Response cache {kind} hit")
+            return entry.value["formatted_response"]
+        
+        args = (prompt, temperature, research_enabled, session_id, sampling, deadline, adapter, research)
+        if session_id:
+            return self.produce_response(*args)
+        
+        key = (normalize_prompt(prompt),) + self.response_cache_partition(temperature, research_enabled, sampling, adapter)
+        try:
+            response, shared = self.generation_flight.do(
+                key, lambda: self.produce_response(*args), timeout=deadline.remaining_ms() / 1000 if deadline else None
+            )
+        except FuturesTimeoutError:
+            # The shared answer won't arrive within this request's deadline: answer on its own
+            return self.produce_response(*args)
+        if shared:
+            print("🔗 Shared an identical generation already in flight")
+        return response
+    
+    def produce_response(self, prompt: str, temperature: float = 0.7, research_enabled: Optional[bool] = None,
+                         session_id: Optional[str] = None, sampling: Optional[Dict] = None,
+                         deadline: Optional[Deadline] = None, adapter: Optional[str] = None,
+                         research: Optional[Tuple[List[SourceInfo], SearchDecision]] = None) -> str:
+        """One research + generation pass, without the cache or coalescing of generate_response"""
+        start_time = time.time()
+        with self.track_request():
+            try:
+                past_key_values = None
+                if session_id:
+                    inputs, sources, search_decision, past_key_values = self.prepare_session_prompt(
+                        session_id, prompt, research_enabled, deadline, adapter, research
+                    )
+                else:
+                    inputs, sources, search_decision = self.prepare_prompt(prompt, research_enabled, deadline, research)
+                tier = self.route(prompt, sources, adapter)
             
-            # Clean response
-            response = self.clean_response(response)
+                # Generate response
+                request = self.submit_generation(
+                    inputs, temperature, past_key_values=past_key_values, keep_cache=bool(session_id), prompt_lookup=bool(sources),
+                    sampling=sampling, deadline=deadline, tier=tier, adapter=adapter
+                )
+                request.result()
+                new_tokens = self.response_tokens(request, deadline, tier)
+                if self.router is not None:
+                    self.router.record(tier, time.time() - start_time, len(request.generated_ids))
             
-            # Format final output with metadata
-            final_output = self.format_final_response(response, sources, temperature, search_decision)
+                # Extract and clean response
+                response = self.extract_response(inputs, new_tokens)
             
-            return final_output
+                if session_id:
+                    self.update_session(session_id, inputs, request, prompt, response)
             
-        except Exception as e:
-            print(f"❌ Generation error: {e}")
-            return "TurboTalk AI: I apologize, but I encountered an error. Please try rephrasing your question."
+                # Format final output with metadata
+                final_output = self.format_final_response(response, sources, temperature, search_decision)
+                
+                if not session_id and request.finish_reason not in ("cancelled", "error"):
+                    self.cache_response(prompt, temperature, research_enabled, sampling, adapter, deadline, {
+                        "response": response,
+                        "formatted_response": final_output,
+                        "metadata": self.build_response_metadata(sources, temperature, search_decision),
+                        "model_tier": tier
+                    }, time.time() - start_time, sources, search_decision)
+            
+                return final_output
+            
+            except Exception as e:
+                print(f"❌ Generation error: {e}")
+                return "TurboTalk AI: I apologize, but I encountered an error. Please try rephrasing your question."
+    
+    def stream_response(self, prompt: str, temperature: float = 0.7, research_enabled: Optional[bool] = None,
+                        session_id: Optional[str] = None, sampling: Optional[Dict] = None,
+                        deadline: Optional[Deadline] = None, adapter: Optional[str] = None,
+                        research: Optional[Tuple[List[SourceInfo], SearchDecision]] = None) -> Iterator[Tuple[str, Dict]]:
+        """Stream (event, payload) pairs: text deltas, then one final event with metadata"""
+        start_time = time.time()
+        cached = self.cached_response(prompt, temperature, research_enabled, session_id, sampling, adapter)
+        if cached is not None:
+            entry, kind = cached
+            yield "token", {"text": entry.value["response"]}
+            yield "done", {
+                **entry.value,
+                "session_id": session_id,
+                "adapter": adapter,
+                "cache_hit": kind,
+                "deadline": deadline.report() if deadline else None,
+                "timing": {
+                    "research_ms": 0.0,
+                    "time_to_first_token_ms": round((time.time() - start_time) * 1000, 1),
+                    "total_ms": round((time.time() - start_time) * 1000, 1),
+                    "tokens_generated": 0,
+                    "tokens_per_second": None,
+                    "finish_reason": "cache",
+                    "tokens_saved": 0
+                }
+            }
+            return
+        
+        with self.track_request():
+            try:
+                past_key_values = None
+                if session_id:
+                    inputs, sources, search_decision, past_key_values = self.prepare_session_prompt(
+                        session_id, prompt, research_enabled, deadline, adapter, research
+                    )
+                else:
+                    inputs, sources, search_decision = self.prepare_prompt(prompt, research_enabled, deadline, research)
+                research_time = time.time() - start_time
+                tier = self.route(prompt, sources, adapter)
+            
+                request = self.submit_generation(
+                    inputs, temperature, past_key_values=past_key_values, stream=True, keep_cache=bool(session_id),
+                    prompt_lookup=bool(sources), sampling=sampling, deadline=deadline, tier=tier, adapter=adapter
+                )
+                detokenizer = IncrementalDetokenizer(self.tokenizer)
+                first_token_time = None
+                generated_text, emitted = "", 0
+            
+                try:
+                    for token_id in request.stream():
+                        generated_text += detokenizer.add(token_id)
+                        # Hold back text that may turn out to be the start of a stop sequence
+                        safe = request.stopper.holdback(generated_text) if request.stopper else len(generated_text)
+                        if safe > emitted:
+                            if first_token_time is None:
+                                first_token_time = time.time()
+                                self.ttft_history.append(first_token_time - start_time)
+                            yield "token", {"text": generated_text[emitted:safe]}
+                            emitted = safe
+                    # Generation ended without a stop: release the held-back tail
+                    if len(generated_text) > emitted and not (request.stopper and request.stopper.stopped):
+                        yield "token", {"text": generated_text[emitted:]}
+                finally:
+                    # Client went away mid-stream: free the batch slot
+                    if not request.done.is_set():
+                        request.cancel()
+            
+                end_time = time.time()
+                generated_count = len(request.generated_ids)
+                new_tokens = self.response_tokens(request, deadline, tier)
+                if self.router is not None:
+                    self.router.record(tier, end_time - start_time, generated_count)
+                response = self.extract_response(inputs, new_tokens)
+                decode_time = end_time - (first_token_time or end_time)
+            
+                formatted_response = self.format_final_response(response, sources, temperature, search_decision)
+                metadata = self.build_response_metadata(sources, temperature, search_decision)
+                if session_id:
+                    self.update_session(session_id, inputs, request, prompt, response)
+                elif request.finish_reason not in ("cancelled", "error"):
+                    self.cache_response(prompt, temperature, research_enabled, sampling, adapter, deadline, {
+                        "response": response,
+                        "formatted_response": formatted_response,
+                        "metadata": metadata,
+                        "model_tier": tier
+                    }, end_time - start_time, sources, search_decision)
+            
+                yield "done", {
+                    "response": response,
+                    "formatted_response": formatted_response,
+                    "metadata": metadata,
+                    "session_id": session_id,
+                    "model_tier": tier,
+                    "cache_hit": None,
+                    "adapter": adapter,
+                    "deadline": deadline.report() if deadline else None,
+                    "timing": {
+                        "research_ms": round(research_time * 1000, 1),
+                        "time_to_first_token_ms": round((first_token_time - start_time) * 1000, 1) if first_token_time else None,
+                        "total_ms": round((end_time - start_time) * 1000, 1),
+                        "tokens_generated": generated_count,
+                        "tokens_per_second": round((generated_count - 1) / decode_time, 2) if decode_time > 0 else None,
+                        "finish_reason": request.finish_reason,
+                        "tokens_saved": max(0, request.max_new_tokens - generated_count) if request.finish_reason == "stop" else 0
+                    }
+                }
+            
+            except Exception as e:
+                print(f"❌ Streaming error: {e}")
+                yield "error", {"error": "I apologize, but I encountered an error. Please try rephrasing your question."}
+    
+    def get_stop_stats(self) -> Dict:
+        """How often stopping criteria ended generation early and the decode steps it saved"""
+        requests = self.stop_stats["requests"]
+        return {
+            **self.stop_stats,
+            "stop_sequences": self.config["stop_sequences"],
+            "max_sentences": self.config["max_sentences"],
+            "tokens_saved_per_request": round(self.stop_stats["tokens_saved"] / requests, 1) if requests else None,
+        }
+    
+    def get_latency_stats(self) -> Dict:
+        """Time-to-first-token percentiles over recent streamed requests"""
+        samples = sorted(self.ttft_history)
+        if not samples:
+            return {"ttft_samples": 0}
+        
+        def percentile(q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+        
+        return {
+            "ttft_samples": len(samples),
+            "ttft_p50_ms": percentile(0.50),
+            "ttft_p95_ms": percentile(0.95),
+            "ttft_p99_ms": percentile(0.99)
+        }
     
     def clean_response(self, response: str) -> str:
         """Enhanced response cleaning"""
@@ -457,6 +1619,36 @@ class TurboTalkAI:
         
         return response
     
+    def build_response_metadata(self, sources: List[SourceInfo], temperature: float, search_decision: SearchDecision) -> Dict:
+        """Structured version of the metadata section in format_final_response"""
+        metadata = {
+            "temperature": temperature,
+            "search_strategy": search_decision.value,
+            "sources_found": len(sources),
+            "sources": [
+                {
+                    "source_type": source.source_type,
+                    "title": source.title,
+                    "url": source.url,
+                    "relevance_score": round(source.relevance_score, 3),
+                    "reliability_score": source.reliability_score
+                }
+                for source in sources[:3]
+            ],
+            "content_quality": None
+        }
+        
+        if sources:
+            metadata["content_quality"] = round(sum(s.relevance_score for s in sources) / len(sources), 3)
+        
+        return metadata
+    
+    @staticmethod
+    def answer_text(formatted: str) -> str:
+        """The bare answer inside a format_final_response output"""
+        answer = formatted.split("\n\n" + "─" * 50)[0]
+        return answer[len("TurboTalk AI: "):] if answer.startswith("TurboTalk AI: ") else answer
+    
     def format_final_response(self, response: str, sources: List[SourceInfo], temperature: float, search_decision: SearchDecision) -> str:
         """Format the final response with metadata"""
         output = f"TurboTalk AI: {response}"
@@ -595,6 +1787,7 @@ def main():
         print("\n❌ Failed to load TurboTalk AI")
         return
     
+    turbotalk.startup.print_report()
     print(f"\n🎯 Enhanced TurboTalk AI v1.3.0 Ready!")
     print("🔥 Key Improvements:")
     print("   • Clean output with 'TurboTalk AI:' prefix only")
@@ -13,14 +13,42 @@ from transformers import (
     pipeline
 )
 import json
+import multiprocessing
 import os
+import tempfile
 from datetime import datetime
 
+from kv_cache import from_legacy_cache, to_legacy_cache
+from quantization import benchmark_model as measure_model, is_quantized_artifact, load_int8_model
+
 # Model configuration
 MODEL_PATH = r"D:\ttm\model\3bmodel\t\M\TTM\model\snapshots\32b71b12589c2f8d625668d2335a01cac3249519"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# Optional small model with the same tokenizer, used for assisted (speculative) generation
+DRAFT_MODEL_PATH = None
+# "int8" stores Linear weights as int8 with per-channel scales (CPU only)
+QUANTIZATION = None
+QUANTIZED_MODEL_PATH = None  # saved int8 artifact; created on first int8 load if missing
+
+BENCHMARK_PROMPTS = [
+    "Hello, how are you?",
+    "What is artificial intelligence?",
+    "Tell me a short story about",
+    "Explain quantum computing in simple terms:",
+    "Write a haiku about technology:"
+]
+
+PERPLEXITY_TEXTS = [
+    "Artificial intelligence is the capability of computational systems to perform tasks typically "
+    "associated with human intelligence, such as learning, reasoning, problem-solving, perception, "
+    "and decision-making.",
+    "The Sun is the star at the center of the Solar System. It is a massive, nearly perfect sphere of "
+    "hot plasma, heated to incandescence by nuclear fusion reactions in its core.",
+    "Python is a high-level, general-purpose programming language. Its design philosophy emphasizes "
+    "code readability with the use of significant indentation.",
+]
 
-def load_model_and_tokenizer():
+def load_model_and_tokenizer(quantization=QUANTIZATION, quantized_path=QUANTIZED_MODEL_PATH):
     """Load the model and tokenizer from local path"""
     print(f"🚀 Loading model from: {MODEL_PATH}")
     print(f"📱 Using device: {DEVICE}")
@@ -32,12 +60,17 @@ def load_model_and_tokenizer():
         
         # Load model
         print("🧠 Loading model...")
-        model = AutoModelForCausalLM.from_pretrained(
-            MODEL_PATH,
-            torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
-            device_map="auto" if DEVICE == "cuda" else None,
-            trust_remote_code=True
-        )
+        if quantization == "int8" and DEVICE == "cpu":
+            model = load_int8_model(MODEL_PATH, quantized_path, trust_remote_code=True)
+        else:
+            if quantization == "int8":
+                print("⚠️ Int8 quantization is CPU-only; loading float16 weights")
+            model = AutoModelForCausalLM.from_pretrained(
+                MODEL_PATH,
+                torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
+                device_map="auto" if DEVICE == "cuda" else None,
+                trust_remote_code=True
+            )
         
         if DEVICE == "cpu":
             model = model.to(DEVICE)
@@ -49,13 +82,34 @@ def load_model_and_tokenizer():
         print(f"❌ Error loading model: {e}")
         return None, None
 
-def generate_response(model, tokenizer, prompt, max_length=150, temperature=0.7, top_p=0.9):
-    """Generate response using the model"""
+def load_draft_model():
+    """Load the draft model for assisted generation, if one is configured"""
+    if not DRAFT_MODEL_PATH:
+        return None
+    
+    try:
+        print(f"📝 Loading draft model from: {DRAFT_MODEL_PATH}")
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            DRAFT_MODEL_PATH,
+            torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
+            trust_remote_code=True
+        )
+        draft_model = draft_model.to(DEVICE)
+        draft_model.eval()
+        print("✅ Draft model loaded - assisted generation enabled")
+        return draft_model
+    except Exception as e:
+        print(f"❌ Error loading draft model: {e}")
+        return None
+
+def generate_response(model, tokenizer, prompt, max_length=150, temperature=0.7, top_p=0.9, draft_model=None):
+    """Generate response using the model (drafted by draft_model when given)"""
     try:
         # Encode input
         inputs = tokenizer.encode(prompt, return_tensors="pt").to(DEVICE)
         
         # Generate
+        assisted = {"assistant_model": draft_model} if draft_model is not None else {}
         with torch.no_grad():
             outputs = model.generate(
                 inputs,
@@ -64,7 +118,8 @@ def generate_response(model, tokenizer, prompt, max_length=150, temperature=0.7,
                 top_p=top_p,
                 do_sample=True,
                 pad_token_id=tokenizer.eos_token_id,
-                num_return_sequences=1
+                num_return_sequences=1,
+                **assisted
             )
         
         # Decode response
@@ -75,6 +130,28 @@ def generate_response(model, tokenizer, prompt, max_length=150, temperature=0.7,
         print(f"❌ Error generating response: {e}")
         return None
 
+def generate_with_cache(model, tokenizer, input_ids, past_key_values=None, max_new_tokens=150, temperature=0.7, top_p=0.9):
+    """Generate from token ids whose prefix is already held in past_key_values.
+
+    Returns the new token ids and a cache covering input_ids + new_ids[:-1].
+    """
+    inputs = torch.tensor([input_ids], device=DEVICE)
+    
+    with torch.no_grad():
+        outputs = model.generate(
+            inputs,
+            past_key_values=from_legacy_cache(past_key_values),
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            do_sample=True,
+            pad_token_id=tokenizer.eos_token_id,
+            return_dict_in_generate=True
+        )
+    
+    new_ids = outputs.sequences[0][len(input_ids):].tolist()
+    return new_ids, to_legacy_cache(outputs.past_key_values)
+
 def interactive_chat(model, tokenizer):
     """Interactive chat interface"""
     print("\n🎯 TurboTalk AI Interactive Chat")
@@ -85,6 +162,13 @@ def interactive_chat(model, tokenizer):
     
     conversation_history = []
     
+    # KV cache of the conversation so far: only each new message gets prefilled
+    context_ids = []        # tokens covered by past_key_values
+    pending_ids = []        # last generated token, not yet fed back
+    past_key_values = None
+    max_new_tokens = 150
+    max_context = getattr(model.config, "n_positions", None) or getattr(model.config, "max_position_embeddings", 1024)
+    
     while True:
         try:
             user_input = input("\n👤 You: ").strip()
@@ -95,21 +179,38 @@ def interactive_chat(model, tokenizer):
             
             if user_input.lower() == 'clear':
                 conversation_history = []
+                context_ids, pending_ids, past_key_values = [], [], None
                 print("🧹 Conversation history cleared!")
                 continue
             
             if not user_input:
                 continue
             
-            # Build context with conversation history
-            context = ""
-            for turn in conversation_history[-5:]:  # Keep last 5 turns
-                context += f"Human: {turn['human']}\nAssistant: {turn['assistant']}\n"
+            turn_ids = pending_ids + tokenizer.encode(f"\nHuman: {user_input}\nAssistant:")
             
-            prompt = f"{context}Human: {user_input}\nAssistant:"
+            if past_key_values is None or len(context_ids) + len(turn_ids) + max_new_tokens > max_context:
+                # Cold start or context full: rebuild context from the last 5 turns
+                context = ""
+                for turn in conversation_history[-5:]:  # Keep last 5 turns
+                    context += f"Human: {turn['human']}\nAssistant: {turn['assistant']}\n"
+                
+                context_ids, past_key_values = [], None
+                turn_ids = tokenizer.encode(f"{context}Human: {user_input}\nAssistant:")
             
             print("🤖 TurboTalk AI: ", end="", flush=True)
-            response = generate_response(model, tokenizer, prompt, max_length=200)
+            input_ids = context_ids + turn_ids
+            try:
+                new_ids, past_key_values = generate_with_cache(
+                    model, tokenizer, input_ids, past_key_values, max_new_tokens=max_new_tokens
+                )
+                response = tokenizer.decode(new_ids, skip_special_tokens=True).strip()
+            except Exception as e:
+                print(f"❌ Error generating response: {e}")
+                new_ids, past_key_values, response = [], None, None
+            
+            if new_ids:
+                context_ids = input_ids + new_ids[:-1]
+                pending_ids = [] if new_ids[-1] == tokenizer.eos_token_id else new_ids[-1:]
             
             if response:
                 print(response)
@@ -127,27 +228,68 @@ def interactive_chat(model, tokenizer):
         except Exception as e:
             print(f"\n❌ Error: {e}")
 
-def benchmark_model(model, tokenizer):
+def benchmark_model(model, tokenizer, draft_model=None):
     """Run some benchmark tests"""
     print("\n🏃‍♂️ Running benchmark tests...")
     
-    test_prompts = [
-        "Hello, how are you?",
-        "What is artificial intelligence?",
-        "Tell me a short story about",
-        "Explain quantum computing in simple terms:",
-        "Write a haiku about technology:"
-    ]
-    
-    for i, prompt in enumerate(test_prompts, 1):
+    for i, prompt in enumerate(BENCHMARK_PROMPTS, 1):
         print(f"\n📝 Test {i}: {prompt}")
-        response = generate_response(model, tokenizer, prompt, max_length=100)
+        response = generate_response(model, tokenizer, prompt, max_length=100, draft_model=draft_model)
         if response:
             print(f"🤖 Response: {response}")
         else:
             print("❌ Failed to generate response")
         print("-" * 50)
 
+def _save_int8_artifact_worker(quantized_path):
+    """Quantize from the fp32 checkpoint and save, in a process of its own"""
+    load_model_and_tokenizer("int8", quantized_path)
+
+def _quantization_benchmark_worker(quantization, quantized_path, results):
+    """Measure one precision in a fresh process so RSS reflects only that model"""
+    try:
+        model, tokenizer = load_model_and_tokenizer(quantization, quantized_path)
+        stats = measure_model(model, tokenizer, BENCHMARK_PROMPTS, PERPLEXITY_TEXTS, device=DEVICE)
+    except Exception as e:
+        print(f"❌ Benchmark failed for {quantization or 'fp32'}: {e}")
+        stats = None
+    results.put((quantization or "fp32", stats))
+
+def benchmark_quantization():
+    """Compare tokens/sec, memory and perplexity of fp32 against int8 on the same prompts"""
+    print("\n🗜️ Running quantization benchmark (fp32 vs int8)...")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    report = {}
+    
+    # Quantizing at load time peaks at the fp32 size, so the measured int8 run loads a saved artifact
+    quantized_path = QUANTIZED_MODEL_PATH or os.path.join(tempfile.gettempdir(), "turbotalk-int8")
+    if DEVICE == "cpu" and not is_quantized_artifact(quantized_path):
+        worker = context.Process(target=_save_int8_artifact_worker, args=(quantized_path,))
+        worker.start()
+        worker.join()
+    
+    for quantization in (None, "int8"):
+        worker = context.Process(target=_quantization_benchmark_worker, args=(quantization, quantized_path, results))
+        worker.start()
+        name, stats = results.get()
+        worker.join()
+        report[name] = stats
+    
+    print(f"\n{'Mode':<6} {'tok/s':>8} {'RSS MB':>9} {'Weights MB':>11} {'PPL':>9}")
+    for name, stats in report.items():
+        if stats is None:
+            print(f"{name:<6} {'failed':>8}")
+            continue
+        print(f"{name:<6} {stats['tokens_per_second']:>8} {stats['rss_mb']:>9} {stats['weights_mb']:>11} {stats['perplexity']:>9}")
+    
+    fp32, int8 = report.get("fp32"), report.get("int8")
+    if fp32 and int8 and fp32["tokens_per_second"]:
+        print(f"\n⚡ Speedup: {int8['tokens_per_second'] / fp32['tokens_per_second']:.2f}x | "
+              f"RSS saved: {fp32['rss_mb'] - int8['rss_mb']:.0f} MB | "
+              f"Perplexity change: {int8['perplexity'] - fp32['perplexity']:+.3f}")
+    return report
+
 def main():
     """Main function"""
     print("🎯 TurboTalk AI - Base Model Runner")
@@ -167,6 +309,8 @@ def main():
         print("❌ Failed to load model. Exiting...")
         return
     
+    draft_model = load_draft_model()
+    
     # Print model info
     print(f"\n📊 Model Information:")
     print(f"Model Type: {model.config.model_type}")
@@ -179,22 +323,25 @@ def main():
         print("1. Interactive Chat")
         print("2. Run Benchmarks")
         print("3. Single Generation")
-        print("4. Exit")
+        print("4. Quantization Benchmark (fp32 vs int8)")
+        print("5. Exit")
         
-        choice = input("\nEnter your choice (1-4): ").strip()
+        choice = input("\nEnter your choice (1-5): ").strip()
         
         if choice == "1":
             interactive_chat(model, tokenizer)
         elif choice == "2":
-            benchmark_model(model, tokenizer)
+            benchmark_model(model, tokenizer, draft_model)
         elif choice == "3":
             prompt = input("Enter your prompt: ")
-            response = generate_response(model, tokenizer, prompt)
+            response = generate_response(model, tokenizer, prompt, draft_model=draft_model)
             if response:
                 print(f"\n🤖 Response: {response}")
             else:
                 print("❌ Failed to generate response")
         elif choice == "4":
+            benchmark_quantization()
+        elif choice == "5":
             print("👋 Goodbye!")
             break
         else:
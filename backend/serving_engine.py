@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Serving Engine - Continuous Batching
+Merges concurrent chat requests into one padded decode batch
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import torch
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from kv_cache import (
+    LegacyCache,
+    cache_seq_len,
+    clone_cache,
+    from_legacy_cache,
+    pad_and_stack_caches,
+    slice_cache_row,
+    to_legacy_cache,
+)
+from lora import LoraManager
+from paged_kv_cache import KVCacheFullError, PagedKVCache
+from sampling import BatchSampler, SamplingParams, warp_batch
+from speculative import PromptLookupProposer, verify_draft
+from stopping import StopChecker
+
+
+@dataclass
+class GenerationRequest:
+    """A single generation job tracked by the batching engine"""
+    input_ids: List[int]
+    sampling: SamplingParams = field(default_factory=SamplingParams)
+    max_new_tokens: int = 250
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    generated_ids: List[int] = field(default_factory=list)
+    finish_reason: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancelled: bool = False
+    keep_cache: bool = False
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    token_queue: Optional["queue.Queue[Optional[int]]"] = field(default=None, repr=False)
+    # On submit: cache for a prefix of input_ids that is already prefilled.
+    # After finishing with keep_cache: cache for input_ids + generated_ids[:-1].
+    past_key_values: Optional[LegacyCache] = field(default=None, repr=False)
+    prefill_ids: List[int] = field(default_factory=list, repr=False)
+    prefill_pos: int = 0
+    generator: Optional[torch.Generator] = field(default=None, repr=False)
+    # LoRA adapter applied to this row (None: base model)
+    adapter: Optional[str] = None
+    # Stop sequences / sentence limit checked as tokens arrive
+    stopper: Optional[StopChecker] = field(default=None, repr=False)
+    # Prompt-lookup drafting for answers that quote their prompt (research sources)
+    proposer: Optional[PromptLookupProposer] = field(default=None, repr=False)
+    draft_tokens_proposed: int = 0
+    draft_tokens_accepted: int = 0
+
+    def result(self, timeout: Optional[float] = None) -> List[int]:
+        """Block until the request retires and return the generated token ids"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Generation request {self.request_id} timed out")
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.generated_ids
+
+    def stream(self) -> Iterator[int]:
+        """Yield token ids as the engine produces them (requires stream=True)"""
+        while True:
+            token_id = self.token_queue.get()
+            if token_id is None:
+                break
+            yield token_id
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def cancel(self):
+        """Ask the engine to retire this request at the next token boundary"""
+        self.cancelled = True
+
+
+@dataclass
+class DecodeBatch:
+    """Left-padded KV state shared by every request in the running batch"""
+    rows: List[GenerationRequest]
+    past_key_values: LegacyCache
+    attention_mask: torch.Tensor
+
+
+class ContinuousBatchingEngine:
+    """Request queue plus a background decode loop over one shared batch.
+
+    New requests are prefilled and merged into the batch at token boundaries,
+    finished ones are retired immediately, so the model always decodes every
+    in-flight request in a single forward pass.
+
+    With a PagedKVCache the per-request KV lives in fixed-size blocks instead
+    of contiguous tensors: admission is limited by free blocks, requests that
+    start with a registered prefix share its blocks, and when the pool runs
+    dry the newest request is preempted and later recomputed. Each decode
+    step gathers a padded copy of the batch's KV from the blocks, and the
+    pool is reserved up front, so paged mode bounds KV memory rather than
+    shrinking it below contiguous mode. Prompt lookup needs contiguous KV:
+    paged requests decode without it (counted in prompt_lookup_skipped).
+
+    Requests submitted with prompt_lookup draft their continuation by copying
+    from their own prompt; the decode step then verifies every row's drafts in
+    one wider forward pass and keeps the accepted prefix of each.
+
+    With a LoraManager, each request may name a LoRA adapter; rows with
+    different adapters still share every forward pass.
+    """
+
+    def __init__(self, model, tokenizer, device: str = "cpu", max_batch_size: int = 8,
+                 top_p: float = 0.9, top_k: int = 50, repetition_penalty: float = 1.1,
+                 paged_cache: Optional[PagedKVCache] = None, prefill_chunk_size: int = 256,
+                 prompt_lookup_tokens: int = 10, prompt_lookup_ngram: int = 3,
+                 lora: Optional[LoraManager] = None):
+        self.model = model
+        self.lora = lora
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.top_p = top_p
+        self.top_k = top_k
+        self.repetition_penalty = repetition_penalty
+        self.eos_token_id = tokenizer.eos_token_id
+        self.sampler = BatchSampler()
+        self.max_positions = getattr(model.config, "n_positions", None) or getattr(model.config, "max_position_embeddings", None)
+
+        self.paged_cache = paged_cache
+        self.prefill_chunk_size = prefill_chunk_size
+        self.prefixes: Dict[str, List[int]] = {}
+        self.prompt_lookup_tokens = prompt_lookup_tokens
+        self.prompt_lookup_ngram = prompt_lookup_ngram
+
+        self.pending: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self.preempted: "deque[GenerationRequest]" = deque()
+        self.prefilling: "deque[GenerationRequest]" = deque()
+        self.active: List[GenerationRequest] = []
+        self.batch: Optional[DecodeBatch] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._submit_lock = threading.Lock()   # a submit never slips past stop()'s drain
+        self._last_decode_at: Optional[float] = None
+        self.inter_token_latencies: "deque[float]" = deque(maxlen=2048)
+
+        self.stats = {
+            "requests_submitted": 0,
+            "requests_completed": 0,
+            "requests_failed": 0,
+            "preemptions": 0,
+            "tokens_generated": 0,
+            "prefill_tokens": 0,
+            "prefill_tokens_reused": 0,
+            "prefill_chunks": 0,
+            "decode_steps": 0,
+            "batched_rows": 0,
+            "busy_time": 0.0,
+            "verify_steps": 0,
+            "draft_tokens_proposed": 0,
+            "draft_tokens_accepted": 0,
+            "prompt_lookup_skipped": 0,
+        }
+
+    def start(self):
+        """Start the background decode loop"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="turbotalk-engine", daemon=True)
+        self._thread.start()
+        print(f"⚙️ Continuous batching engine started (max batch {self.max_batch_size})")
+
+    def in_flight(self) -> int:
+        """Requests queued, prefilling or decoding"""
+        return self.pending.qsize() + len(self.preempted) + len(self.prefilling) + len(self.active)
+
+    def stop(self):
+        """Stop the decode loop after the current step and fail every request still in it"""
+        with self._submit_lock:
+            self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            if self._thread.is_alive():
+                # Still inside a model step that uses the queues below: let it return first
+                print("⏳ Engine step still running, waiting for it before failing queued requests")
+                self._thread.join()
+            self._thread = None
+
+        # Nothing will advance these any more: wake their result() and stream() callers
+        self._split_batch()
+        unfinished = list(self.preempted) + list(self.prefilling) + list(self.active)
+        self.preempted.clear()
+        self.prefilling.clear()
+        self.active = []
+        while True:
+            try:
+                unfinished.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        for request in unfinished:
+            if not request.done.is_set():
+                self._finish(request, error="engine stopped")
+
+    def submit(self, input_ids: List[int], sampling: Optional[SamplingParams] = None, max_new_tokens: int = 250,
+               stream: bool = False, past_key_values: Optional[LegacyCache] = None,
+               keep_cache: bool = False, prompt_lookup: bool = False,
+               stopper: Optional[StopChecker] = None, adapter: Optional[str] = None) -> GenerationRequest:
+        """Queue a prompt for generation and return its request handle.
+
+        sampling defaults to the engine's top-k/top-p/repetition penalty at
+        temperature 0.7; every request in a batch may use different values.
+
+        past_key_values may cover a prefix of input_ids (e.g. an earlier turn of
+        the same conversation); only the remaining tokens are prefilled. With
+        keep_cache the finished request hands its cache back to the caller.
+        prompt_lookup drafts tokens from the prompt itself (contiguous KV only).
+        stopper ends the request early on a stop sequence or sentence limit.
+        adapter names a LoRA adapter registered with the engine's LoraManager.
+        """
+        if adapter is not None and (self.lora is None or adapter not in self.lora.paths):
+            raise ValueError(f"Unknown LoRA adapter: {adapter}")
+        if self.max_positions:
+            max_new_tokens = max(1, min(max_new_tokens, self.max_positions - len(input_ids)))
+        request = GenerationRequest(
+            input_ids=list(input_ids),
+            sampling=sampling or SamplingParams(top_k=self.top_k, top_p=self.top_p, repetition_penalty=self.repetition_penalty),
+            max_new_tokens=max_new_tokens,
+            token_queue=queue.Queue() if stream else None,
+            past_key_values=past_key_values,
+            keep_cache=keep_cache,
+            stopper=stopper,
+            adapter=adapter,
+        )
+        request.generator = request.sampling.make_generator(self.device)
+        if prompt_lookup and self.paged_cache is None:
+            request.proposer = PromptLookupProposer(self.prompt_lookup_ngram, self.prompt_lookup_tokens)
+            request.proposer.reset(request.input_ids)
+        elif prompt_lookup:
+            self.stats["prompt_lookup_skipped"] += 1
+        with self._submit_lock:
+            if not self._running:
+                raise RuntimeError("Serving engine is stopped")
+            self.stats["requests_submitted"] += 1
+            self.pending.put(request)
+        return request
+
+    def register_prefix(self, name: str, token_ids: List[int], past_key_values: LegacyCache):
+        """Store a shared prompt prefix in the paged cache so requests can fork it"""
+        if self.paged_cache is None:
+            return
+        seq_id = f"prefix:{name}"
+        self.paged_cache.free(seq_id)
+        self.paged_cache.allocate(seq_id)
+        self.paged_cache.append(seq_id, past_key_values)
+        self.prefixes[seq_id] = list(token_ids)
+
+    def get_stats(self) -> Dict:
+        """Aggregate throughput and batching statistics"""
+        steps = self.stats["decode_steps"]
+        busy = self.stats["busy_time"]
+        proposed = self.stats["draft_tokens_proposed"]
+        latencies = sorted(self.inter_token_latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+        return {
+            **self.stats,
+            "active_requests": len(self.active),
+            "prefilling_requests": len(self.prefilling),
+            "prefill_chunk_size": self.prefill_chunk_size,
+            "inter_token_latency_p50_ms": percentile(0.50),
+            "inter_token_latency_p99_ms": percentile(0.99),
+            "queued_requests": self.pending.qsize() + len(self.preempted),
+            "avg_batch_size": round(self.stats["batched_rows"] / steps, 2) if steps else 0.0,
+            "tokens_per_second": round(self.stats["tokens_generated"] / busy, 2) if busy else 0.0,
+            "draft_acceptance_rate": round(self.stats["draft_tokens_accepted"] / proposed, 4) if proposed else None,
+            "prompt_lookup_supported": self.paged_cache is None,
+            **self.sampler.get_stats(),
+            "sampling_share_of_busy_time": round(self.sampler.stats["time"] / busy, 4) if busy else None,
+            "paged_kv": self.paged_cache.get_stats() if self.paged_cache is not None else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Decode loop
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while self._running:
+            self._admit_pending()
+            if not self.active and not self.prefilling:
+                self._last_decode_at = None
+                continue
+
+            step_start = time.time()
+            if self.prefilling:
+                self._prefill_step()
+
+            if self.active:
+                try:
+                    self._decode_step()
+                except Exception as e:
+                    print(f"❌ Engine error: {e}")
+                    self._fail_active(str(e))
+
+                now = time.time()
+                if self._last_decode_at is not None:
+                    self.inter_token_latencies.append(now - self._last_decode_at)
+                self._last_decode_at = now
+            else:
+                self._last_decode_at = None
+            self.stats["busy_time"] += time.time() - step_start
+
+    def _next_request(self, block: bool) -> Optional[GenerationRequest]:
+        """Preempted requests resume before new ones are admitted"""
+        if self.preempted:
+            return self.preempted.popleft()
+        try:
+            return self.pending.get(block=block, timeout=0.1 if block else None)
+        except queue.Empty:
+            return None
+
+    def _has_room_for(self, request: GenerationRequest) -> bool:
+        """Paged mode: admit only if the prompt fits, keeping one spare block per running row.
+
+        Prompts still prefilling take their blocks only when they finish, so
+        the blocks they will need count as taken already.
+        """
+        if self.paged_cache is None or not (self.active or self.prefilling):
+            return True
+        needed = self.paged_cache.blocks_needed(len(request.input_ids) + len(request.generated_ids))
+        owed = sum(self.paged_cache.blocks_needed(len(r.prefill_ids)) for r in self.prefilling)
+        in_flight = len(self.active) + len(self.prefilling)
+        return self.paged_cache.can_allocate(needed + owed + in_flight + 1)
+
+    def _admit_pending(self):
+        """Pull queued requests into the batch at a token boundary"""
+        block = not self.active and not self.prefilling
+        while len(self.active) + len(self.prefilling) < self.max_batch_size:
+            request = self._next_request(block)
+            if request is None:
+                return
+            block = False
+
+            if not request.cancelled and not self._has_room_for(request):
+                self.preempted.appendleft(request)
+                return
+
+            if request.cancelled:
+                request.finish_reason = "cancelled"
+                self._finish(request)
+                continue
+
+            self._start_prefill(request)
+            self.prefilling.append(request)
+
+    def _start_prefill(self, request: GenerationRequest):
+        """Set up prefill state, reusing any cached prefix of the prompt"""
+        request.started_at = request.started_at or time.time()
+
+        # A preempted request recomputes its KV and resumes with its pending token
+        request.prefill_ids = request.input_ids + request.generated_ids[:-1]
+
+        # Reuse a cached prefix, always leaving at least one token to feed
+        past = request.past_key_values
+        cached_len = min(cache_seq_len(past), len(request.prefill_ids) - 1)
+        if past is not None and cache_seq_len(past) > cached_len:
+            past = slice_cache_row(past, 0, 0, cached_len)
+
+        request.past_key_values = past if cached_len else None
+        request.prefill_pos = cached_len
+        self.stats["prefill_tokens_reused"] += cached_len
+
+    def _prefill_step(self):
+        """Prefill one chunk of the oldest admitted prompt.
+
+        Long prompts are split into prefill_chunk_size pieces so that the
+        decode step of every running request is never stuck behind them.
+        """
+        request = self.prefilling[0]
+        if request.cancelled:
+            self.prefilling.popleft()
+            request.finish_reason = "cancelled"
+            self._finish(request)
+            return
+
+        try:
+            finished_prefill = self._prefill_chunk(request)
+        except KVCacheFullError as e:
+            self.prefilling.popleft()
+            if not (self.active or self.prefilling):
+                # Nothing will free blocks: the prompt alone is bigger than the pool
+                self._finish(request, error=str(e))
+                return
+            # Wait for blocks to free up; its prefilled cache is kept, so resuming costs one token
+            self.preempted.append(request)
+            self.stats["preemptions"] += 1
+            return
+        except Exception as e:
+            print(f"❌ Prefill error: {e}")
+            self.prefilling.popleft()
+            self._finish(request, error=str(e))
+            return
+
+        if not finished_prefill:
+            return
+
+        self.prefilling.popleft()
+        if request.finish_reason is None:
+            self._split_batch()
+            self.active.append(request)
+        else:
+            self._finish(request)
+
+    def _prefill_chunk(self, request: GenerationRequest) -> bool:
+        """Feed the next chunk of the prompt; returns True once the prompt is done"""
+        prompt_ids = request.prefill_ids
+        start = request.prefill_pos
+        end = len(prompt_ids)
+        if self.prefill_chunk_size:
+            end = min(end, start + self.prefill_chunk_size)
+
+        input_ids = torch.tensor([prompt_ids[start:end]], device=self.device)
+        position_ids = torch.arange(start, end, device=self.device).unsqueeze(0)
+
+        with torch.no_grad(), self._adapters([request]):
+            outputs = self.model(
+                input_ids=input_ids,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(request.past_key_values),
+                use_cache=True,
+            )
+        request.past_key_values = to_legacy_cache(outputs.past_key_values)
+        request.prefill_pos = end
+        self.stats["prefill_tokens"] += end - start
+        self.stats["prefill_chunks"] += 1
+
+        if end < len(prompt_ids):
+            return False
+
+        if self.paged_cache is not None:
+            self._page_in(request)
+
+        if not request.generated_ids:
+            next_token = self._sample(outputs.logits[:, -1, :], [request])[0]
+            self._append_token(request, next_token)
+        return True
+
+    def _page_in(self, request: GenerationRequest):
+        """Move a freshly prefilled cache into blocks, sharing a registered prefix"""
+        prompt_ids = request.input_ids
+        start = 0
+        # Registered prefixes hold base-model KV, which an adapter changes
+        prefixes = {} if request.adapter else self.prefixes
+        for seq_id, prefix_ids in list(prefixes.items()):
+            if len(prefix_ids) > start and prompt_ids[:len(prefix_ids)] == prefix_ids:
+                prefix_seq_id, start = seq_id, len(prefix_ids)
+
+        try:
+            if start:
+                self.paged_cache.fork(prefix_seq_id, request.request_id)
+            else:
+                self.paged_cache.allocate(request.request_id)
+            self.paged_cache.append(request.request_id, request.past_key_values, start=start)
+        except KVCacheFullError:
+            self.paged_cache.free(request.request_id)
+            raise
+        request.past_key_values = None
+
+    def _decode_step(self):
+        """Advance every active request by one token in a single forward pass"""
+        if self.paged_cache is not None:
+            return self._decode_step_paged()
+
+        if self.batch is None:
+            self._build_batch()
+        batch = self.batch
+        rows = batch.rows
+
+        drafts = [self._propose(r) for r in rows]
+        if any(drafts):
+            return self._verify_step(drafts)
+
+        input_ids = torch.tensor([[r.generated_ids[-1]] for r in rows], device=self.device)
+        attention_mask = torch.cat(
+            [batch.attention_mask, batch.attention_mask.new_ones(len(rows), 1)], dim=1
+        )
+        position_ids = (attention_mask.sum(dim=1, keepdim=True) - 1).long()
+
+        with torch.no_grad(), self._adapters(rows):
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(batch.past_key_values),
+                use_cache=True,
+            )
+
+        batch.past_key_values = to_legacy_cache(outputs.past_key_values)
+        batch.attention_mask = attention_mask
+        self.stats["decode_steps"] += 1
+        self.stats["batched_rows"] += len(rows)
+
+        next_tokens = self._sample(outputs.logits[:, -1, :], rows)
+        for request, token in zip(rows, next_tokens):
+            self._append_token(request, token)
+
+        if any(r.finish_reason is not None for r in rows):
+            self._split_batch()
+            self._retire_finished()
+
+    def _propose(self, request: GenerationRequest) -> List[int]:
+        """Prompt-lookup draft for one row, capped so it never overruns max_new_tokens"""
+        if request.proposer is None or request.cancelled:
+            return []
+        budget = request.max_new_tokens - len(request.generated_ids) - 1
+        if budget <= 0:
+            return []
+        drafts, _ = request.proposer.propose(request.input_ids + request.generated_ids, budget, None, self.eos_token_id)
+        return drafts
+
+    def _verify_step(self, drafts: List[List[int]]):
+        """Feed each row's pending token plus its drafts and keep what the model accepts.
+
+        Rows are right-padded to the widest draft; padded positions are masked
+        out and cropped away afterwards, so every row ends up with its own cache
+        and the batch is rebuilt at the next step.
+        """
+        batch = self.batch
+        rows = batch.rows
+        width = 1 + max(len(d) for d in drafts)
+        past_len = batch.attention_mask.shape[1]
+        lengths = batch.attention_mask.sum(dim=1)
+
+        input_ids = torch.tensor(
+            [[r.generated_ids[-1]] + d + [self.eos_token_id] * (width - 1 - len(d)) for r, d in zip(rows, drafts)],
+            device=self.device,
+        )
+        new_mask = torch.tensor(
+            [[1] * (1 + len(d)) + [0] * (width - 1 - len(d)) for d in drafts],
+            dtype=batch.attention_mask.dtype, device=self.device,
+        )
+        attention_mask = torch.cat([batch.attention_mask, new_mask], dim=1)
+        position_ids = lengths.unsqueeze(1) + torch.arange(width, device=self.device).unsqueeze(0)
+
+        with torch.no_grad(), self._adapters(rows):
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(batch.past_key_values),
+                use_cache=True,
+            )
+        past = to_legacy_cache(outputs.past_key_values)
+        self.stats["decode_steps"] += 1
+        self.stats["verify_steps"] += 1
+        self.stats["batched_rows"] += len(rows)
+
+        for i, (request, row_drafts) in enumerate(zip(rows, drafts)):
+            context = request.input_ids + request.generated_ids
+            warp = self._warp(request.sampling)
+            pending = verify_draft(outputs.logits[i], context, row_drafts, None, warp, request.generator)
+
+            accepted = len(pending) - 1
+            request.draft_tokens_proposed += len(row_drafts)
+            request.draft_tokens_accepted += accepted
+            self.stats["draft_tokens_proposed"] += len(row_drafts)
+            self.stats["draft_tokens_accepted"] += accepted
+
+            appended = 0
+            for token in pending:
+                self._append_token(request, token)
+                appended += 1
+                if request.finish_reason is not None:
+                    break
+
+            # Keep KV for the fed tokens the row actually used: context + generated[:-1]
+            padding = past_len - int(lengths[i].item())
+            request.past_key_values = slice_cache_row(past, i, padding, past_len + appended)
+
+        self.batch = None
+        self._retire_finished()
+
+    def _adapters(self, rows: List[GenerationRequest]):
+        """Apply each row's LoRA adapter for the duration of one forward pass"""
+        if self.lora is None or not any(r.adapter for r in rows):
+            return nullcontext()
+        return self.lora.activate([r.adapter for r in rows])
+
+    def _warp(self, sampling: SamplingParams):
+        def warp(logits: torch.Tensor, context_ids: List[int]) -> torch.Tensor:
+            return warp_batch(logits.unsqueeze(0), [context_ids], [sampling])[0]
+        return warp
+
+    def _decode_step_paged(self):
+        """Decode step that gathers the batch from, and writes back to, KV blocks"""
+        rows, slots = self._reserve_slots()
+        seq_ids = [r.request_id for r in rows]
+        past, lengths = self.paged_cache.gather(seq_ids)
+        max_len = max(lengths)
+
+        attention_mask = torch.zeros(len(rows), max_len + 1, dtype=torch.long, device=self.device)
+        for i, length in enumerate(lengths):
+            attention_mask[i, max_len - length:] = 1
+        position_ids = torch.tensor([[length] for length in lengths], device=self.device)
+        input_ids = torch.tensor([[r.generated_ids[-1]] for r in rows], device=self.device)
+
+        with torch.no_grad(), self._adapters(rows):
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(past),
+                use_cache=True,
+            )
+        # Only the new position is kept; the gathered copy is freed with this step
+        del past
+        self.paged_cache.append_token_batch(seq_ids, slots, to_legacy_cache(outputs.past_key_values))
+        self.stats["decode_steps"] += 1
+        self.stats["batched_rows"] += len(rows)
+
+        next_tokens = self._sample(outputs.logits[:, -1, :], rows)
+        for request, token in zip(rows, next_tokens):
+            self._append_token(request, token)
+        self._retire_finished()
+
+    def _reserve_slots(self):
+        """Give every row a writable KV slot, preempting the newest rows if blocks run out"""
+        while True:
+            try:
+                slots = [self.paged_cache.reserve_slot(r.request_id) for r in self.active]
+                return list(self.active), slots
+            except KVCacheFullError:
+                if len(self.active) == 1:
+                    raise
+                victim = self.active.pop()
+                self.paged_cache.free(victim.request_id)
+                self.preempted.appendleft(victim)
+                self.stats["preemptions"] += 1
+
+    def _retire_finished(self):
+        for request in [r for r in self.active if r.finish_reason is not None]:
+            self.active.remove(request)
+            self._finish(request)
+
+    def _build_batch(self):
+        """Merge the per-request caches of all active rows into one padded batch"""
+        lengths = [cache_seq_len(r.past_key_values) for r in self.active]
+        max_len = max(lengths)
+        attention_mask = torch.zeros(len(self.active), max_len, dtype=torch.long, device=self.device)
+        for i, length in enumerate(lengths):
+            attention_mask[i, max_len - length:] = 1
+
+        self.batch = DecodeBatch(
+            rows=list(self.active),
+            past_key_values=pad_and_stack_caches([r.past_key_values for r in self.active], max_len),
+            attention_mask=attention_mask,
+        )
+        for request in self.active:
+            request.past_key_values = None
+
+    def _split_batch(self):
+        """Hand each row its own (unpadded) cache view before the batch changes shape"""
+        if self.batch is None:
+            return
+        for i, request in enumerate(self.batch.rows):
+            padding = int((self.batch.attention_mask[i] == 0).sum().item())
+            request.past_key_values = slice_cache_row(self.batch.past_key_values, i, padding)
+        self.batch = None
+
+    # ------------------------------------------------------------------
+    # Sampling and bookkeeping
+    # ------------------------------------------------------------------
+
+    def _sample(self, logits: torch.Tensor, rows: List[GenerationRequest]) -> List[int]:
+        """Sample one token per row with each request's own sampling settings and RNG"""
+        return self.sampler.sample(
+            logits,
+            [r.input_ids + r.generated_ids for r in rows],
+            [r.sampling for r in rows],
+            [r.generator for r in rows],
+        )
+
+    def _append_token(self, request: GenerationRequest, token: int):
+        if request.first_token_at is None:
+            request.first_token_at = time.time()
+        request.generated_ids.append(token)
+        self.stats["tokens_generated"] += 1
+        if request.token_queue is not None:
+            request.token_queue.put(token)
+
+        stop = request.stopper.add(token) if request.stopper is not None else False
+        if request.cancelled:
+            request.finish_reason = "cancelled"
+        elif token == self.eos_token_id:
+            request.finish_reason = "eos"
+        elif stop:
+            request.finish_reason = "stop"
+        elif len(request.generated_ids) >= request.max_new_tokens:
+            request.finish_reason = "length"
+
+    def _finish(self, request: GenerationRequest, error: Optional[str] = None):
+        if self.paged_cache is not None and self.paged_cache.has_sequence(request.request_id):
+            if request.keep_cache and not error:
+                request.past_key_values = self.paged_cache.to_legacy(request.request_id)
+            self.paged_cache.free(request.request_id)
+
+        if request.keep_cache and not error and request.past_key_values is not None:
+            # Detach from the shared batch tensors so the batch can be freed
+            request.past_key_values = clone_cache(request.past_key_values)
+        else:
+            request.past_key_values = None
+        request.finished_at = time.time()
+        if error:
+            request.error = error
+            request.finish_reason = "error"
+            self.stats["requests_failed"] += 1
+        else:
+            self.stats["requests_completed"] += 1
+        if request.token_queue is not None:
+            request.token_queue.put(None)
+        request.done.set()
+
+    def _fail_active(self, error: str):
+        self.batch = None
+        for request in self.active:
+            self._finish(request, error=error)
+        self.active = []
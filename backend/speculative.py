@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Speculative Decoding
+A cheap proposer drafts several tokens, the main model verifies them in one pass
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import copy
+import inspect
+import torch
+import torch.nn as nn
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kv_cache import LegacyCache, cache_seq_len, from_legacy_cache, slice_cache_row, to_legacy_cache
+from sampling import SamplingParams, warp_batch
+
+
+def verify_draft(logits: torch.Tensor, context_ids: List[int], drafts: List[int],
+                 draft_probs: Optional[List[torch.Tensor]], warp: Callable,
+                 generator: Optional[torch.Generator] = None) -> List[int]:
+    """Speculative-sampling acceptance over one verify pass.
+
+    logits[j] is the main model's prediction after context_ids + drafts[:j].
+    Draft tokens are accepted with probability min(1, p/q) (q is one-hot when
+    draft_probs is None); the first rejection is resampled from the residual
+    distribution, and a fully accepted draft earns one bonus token. Returns the
+    accepted drafts followed by that one extra token.
+    """
+    tokens = []
+    device = generator.device if generator is not None else None
+    for j, token in enumerate(drafts):
+        p = warp(logits[j], context_ids + drafts[:j])
+        q_token = draft_probs[j][token] if draft_probs is not None else 1.0
+        if torch.rand(1, generator=generator, device=device).item() < min(1.0, float(p[token] / q_token)):
+            tokens.append(token)
+            continue
+
+        # Rejected: resample from what the main model wanted and the draft under-proposed
+        if draft_probs is not None:
+            residual = torch.clamp(p - draft_probs[j], min=0)
+        else:
+            residual = p.clone()
+            residual[token] = 0
+        if residual.sum() <= 0:
+            residual = p
+        tokens.append(int(torch.multinomial(residual / residual.sum(), 1, generator=generator).item()))
+        return tokens
+
+    # Every draft accepted: the verify pass also gives the next token for free
+    bonus = warp(logits[len(drafts)], context_ids + drafts)
+    tokens.append(int(torch.multinomial(bonus, 1, generator=generator).item()))
+    return tokens
+
+
+def build_shallow_draft(model, num_layers: int):
+    """Early-exit draft: the main model's embeddings, first num_layers blocks and LM head.
+
+    No weights are copied; the draft shares every tensor with the main model.
+    """
+    transformer = getattr(model, "transformer", None)
+    if transformer is None or not hasattr(transformer, "h"):
+        raise ValueError("Shallow drafts need a GPT-2 style model; set draft_model_path instead")
+
+    config = copy.deepcopy(model.config)
+    config.n_layer = num_layers
+
+    draft_transformer = copy.copy(transformer)
+    draft_transformer._modules = dict(transformer._modules)
+    draft_transformer.h = nn.ModuleList(list(transformer.h)[:num_layers])
+    draft_transformer.config = config
+
+    draft = copy.copy(model)
+    draft._modules = dict(model._modules)
+    draft.transformer = draft_transformer
+    draft.config = config
+    return draft
+
+
+class DraftModelProposer:
+    """Proposes tokens by sampling autoregressively from a small draft model"""
+
+    def __init__(self, draft_model, device: str = "cpu"):
+        self.model = draft_model
+        self.device = device
+        # Stub models such as TurboTalkAIForCausalLM take no cache; re-run them on the full context
+        self.uses_cache = "past_key_values" in inspect.signature(draft_model.forward).parameters
+        self.past_key_values: Optional[LegacyCache] = None
+
+    def reset(self, input_ids: List[int]):
+        self.past_key_values = None
+
+    def propose(self, context_ids: List[int], num_tokens: int, warp: Callable, eos_token_id: int,
+                generator: Optional[torch.Generator] = None):
+        """Return draft tokens and the distribution each one was sampled from (with the request's RNG)"""
+        tokens, probs = [], []
+        for _ in range(num_tokens):
+            ids = context_ids + tokens
+            with torch.no_grad():
+                if self.uses_cache:
+                    fed = cache_seq_len(self.past_key_values)
+                    outputs = self.model(
+                        input_ids=torch.tensor([ids[fed:]], device=self.device),
+                        position_ids=torch.arange(fed, len(ids), device=self.device).unsqueeze(0),
+                        past_key_values=from_legacy_cache(self.past_key_values),
+                        use_cache=True,
+                    )
+                    self.past_key_values = to_legacy_cache(outputs["past_key_values"])
+                else:
+                    outputs = self.model(input_ids=torch.tensor([ids], device=self.device))
+
+            q = warp(outputs["logits"][0, -1], ids)
+            token = int(torch.multinomial(q, 1, generator=generator).item())
+            tokens.append(token)
+            probs.append(q)
+            if token == eos_token_id:
+                break
+        return tokens, probs
+
+    def rollback(self, length: int):
+        """Forget draft KV beyond the accepted context length"""
+        if self.past_key_values is not None and cache_seq_len(self.past_key_values) > length:
+            self.past_key_values = slice_cache_row(self.past_key_values, 0, 0, length)
+
+
+class PromptLookupProposer:
+    """Draft-model-free proposer: copies what followed the latest n-gram in the prompt.
+
+    Research answers often quote the injected source passages, so the tokens
+    that came after the same n-gram in the prompt are a cheap, good guess.
+    """
+
+    def __init__(self, max_ngram_size: int = 3, num_tokens: int = 10):
+        self.max_ngram_size = max_ngram_size
+        self.num_tokens = num_tokens
+        self.prompt_ids: List[int] = []
+        self.index: Dict[Tuple[int, ...], int] = {}
+
+    def reset(self, input_ids: List[int]):
+        """Index every prompt n-gram by the position right after its last occurrence"""
+        self.prompt_ids = list(input_ids)
+        self.index = {}
+        for n in range(1, self.max_ngram_size + 1):
+            for i in range(len(self.prompt_ids) - n):
+                self.index[tuple(self.prompt_ids[i:i + n])] = i + n
+
+    def propose(self, context_ids: List[int], num_tokens: int, warp: Optional[Callable], eos_token_id: int,
+                generator: Optional[torch.Generator] = None):
+        """Continuation of the longest recent n-gram found in the prompt (no probabilities)"""
+        num_tokens = min(num_tokens, self.num_tokens)
+        for n in range(self.max_ngram_size, 0, -1):
+            if len(context_ids) < n:
+                continue
+            position = self.index.get(tuple(context_ids[-n:]))
+            if position is not None:
+                return self.prompt_ids[position:position + num_tokens], None
+        return [], None
+
+    def rollback(self, length: int):
+        pass
+
+
+class SpeculativeDecoder:
+    """Draft-then-verify sampling that leaves the main model's output distribution unchanged.
+
+    Each iteration the proposer drafts up to num_draft_tokens tokens and the
+    main model scores all of them in a single forward pass. Draft tokens are
+    accepted with probability min(1, p/q); the first rejection is resampled
+    from the residual distribution, and a fully accepted draft earns one bonus
+    token from the main model.
+
+    Requests run concurrently: each works on its own shallow copy of the
+    proposer, so per-sequence draft state (draft KV, prompt index) is never
+    shared while the weights are.
+    """
+
+    def __init__(self, model, proposer, tokenizer, num_draft_tokens: int = 4, device: str = "cpu",
+                 top_k: int = 50, top_p: float = 0.9, repetition_penalty: float = 1.1):
+        self.model = model
+        self.proposer = proposer
+        self.eos_token_id = tokenizer.eos_token_id
+        self.num_draft_tokens = num_draft_tokens
+        self.device = device
+        self.top_k = top_k
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.stats = {"verify_passes": 0, "draft_tokens_proposed": 0, "draft_tokens_accepted": 0, "tokens_generated": 0}
+        self.probe_report: Optional[Dict] = None
+
+    def probe(self, input_ids: List[int], max_new_tokens: int = 48) -> Dict:
+        """Acceptance on one sample generation, measured before serving (stats start over afterwards)"""
+        self.generate(input_ids, max_new_tokens=max_new_tokens)
+        self.probe_report = self.get_stats()
+        self.stats = {key: 0 for key in self.stats}
+        return self.probe_report
+
+    def generate(self, input_ids: List[int], temperature: float = 0.7, max_new_tokens: int = 250,
+                 past_key_values: Optional[LegacyCache] = None,
+                 on_token: Optional[Callable[[int], bool]] = None,
+                 sampling: Optional[SamplingParams] = None) -> Tuple[List[int], LegacyCache]:
+        """Generate up to max_new_tokens; on_token returning False stops early.
+
+        sampling, when given, replaces temperature and the decoder's default
+        top-k/top-p/repetition penalty. Returns the new token ids and a
+        main-model cache covering input_ids + new_ids[:-1].
+        """
+        sampling = sampling or SamplingParams(temperature, self.top_k, self.top_p, self.repetition_penalty)
+        return self._generate(input_ids, sampling, max_new_tokens, past_key_values, on_token)
+
+    def _warp(self, sampling: SamplingParams) -> Callable:
+        def warp(logits: torch.Tensor, context_ids: List[int]) -> torch.Tensor:
+            return warp_batch(logits.unsqueeze(0), [context_ids], [sampling])[0]
+        return warp
+
+    def _forward(self, ids: List[int], start: int, past: Optional[LegacyCache]):
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=torch.tensor([ids[start:]], device=self.device),
+                position_ids=torch.arange(start, len(ids), device=self.device).unsqueeze(0),
+                past_key_values=from_legacy_cache(past) if start else None,
+                use_cache=True,
+            )
+        return outputs.logits[0], to_legacy_cache(outputs.past_key_values)
+
+    def _generate(self, input_ids, sampling, max_new_tokens, past_key_values, on_token):
+        warp = self._warp(sampling)
+        generator = sampling.make_generator(self.device)
+        # Per-request draft state over the shared draft weights
+        proposer = copy.copy(self.proposer)
+        proposer.reset(input_ids)
+
+        # Prefill (reusing any cached prefix) and sample the first token from the main model
+        cached_len = min(cache_seq_len(past_key_values), len(input_ids) - 1)
+        if cached_len and cache_seq_len(past_key_values) > cached_len:
+            past_key_values = slice_cache_row(past_key_values, 0, 0, cached_len)
+        logits, past = self._forward(input_ids, cached_len, past_key_values if cached_len else None)
+        first = int(torch.multinomial(warp(logits[-1], input_ids), 1, generator=generator).item())
+
+        generated: List[int] = []
+        pending = [first]
+        while True:
+            for token in pending:
+                generated.append(token)
+                self.stats["tokens_generated"] += 1
+                keep_going = on_token(token) if on_token is not None else True
+                if token == self.eos_token_id or len(generated) >= max_new_tokens or keep_going is False:
+                    return generated, slice_cache_row(past, 0, 0, len(input_ids) + len(generated) - 1)
+
+            # past covers context[:-1]; the last generated token is still unfed
+            context = input_ids + generated
+            budget = min(self.num_draft_tokens, max_new_tokens - len(generated) - 1)
+            drafts, draft_probs = proposer.propose(context, budget, warp, self.eos_token_id, generator) if budget > 0 else ([], [])
+
+            logits, past = self._forward(context + drafts, len(context) - 1, past)
+            self.stats["verify_passes"] += 1
+            self.stats["draft_tokens_proposed"] += len(drafts)
+
+            pending = verify_draft(logits, context, drafts, draft_probs, warp, generator)
+            accepted = len(pending) - 1
+            self.stats["draft_tokens_accepted"] += accepted
+            past = slice_cache_row(past, 0, 0, len(context) + accepted)
+            proposer.rollback(len(context) + accepted)
+
+    def get_stats(self) -> Dict:
+        proposed = self.stats["draft_tokens_proposed"]
+        passes = self.stats["verify_passes"]
+        return {
+            **self.stats,
+            "num_draft_tokens": self.num_draft_tokens,
+            "acceptance_rate": round(self.stats["draft_tokens_accepted"] / proposed, 4) if proposed else None,
+            "tokens_per_verify_pass": round((self.stats["draft_tokens_accepted"] + passes) / passes, 2) if passes else None,
+            "probe": self.probe_report,
+        }
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Startup
+Per-phase startup timing and background model loading behind a readiness flag
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class StartupProfiler:
+    """Wall-clock time of each startup phase, reported together"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.phases: "OrderedDict[str, float]" = OrderedDict()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def total_ms(self) -> float:
+        return ((self.finished_at or time.time()) - self.started_at) * 1000
+
+    def report(self) -> Dict:
+        return {
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "total_ms": round(self.total_ms(), 1),
+        }
+
+    def print_report(self):
+        """Print every phase and close the profile (the total stops growing)"""
+        self.finished_at = self.finished_at or time.time()
+        print("⏱️ Startup timing:")
+        for name, seconds in self.phases.items():
+            print(f"   {name:<28}{seconds * 1000:>10.1f} ms")
+        print(f"   {'total (wall clock)':<28}{self.total_ms():>10.1f} ms")
+
+
+class BackgroundStartup:
+    """Runs slow startup work (model loading) off the main thread.
+
+    The server binds its port straight away and reports ready once target
+    returns True; until then request handlers can answer 503.
+    """
+
+    def __init__(self, target: Callable[[], bool]):
+        self.target = target
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.ready_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="turbotalk-startup", daemon=True)
+        self._thread.start()
+
+    def run(self) -> bool:
+        self.state = "loading"
+        try:
+            ok = self.target()
+        except Exception as e:
+            ok, self.error = False, str(e)
+        self.state = "ready" if ok else "failed"
+        self.ready_at = time.time() if ok else None
+        return ok
+
+    def status(self) -> Dict:
+        return {"state": self.state, "ready": self.ready, "error": self.error}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Stopping Criteria
+Stop sequences and sentence limits checked token by token during generation
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import time
+from typing import List, Optional
+
+import torch
+from transformers import StoppingCriteria
+
+from streaming import IncrementalDetokenizer
+
+DEFAULT_STOP_SEQUENCES = ["\nUser:", "Human:"]
+SENTENCE_ENDINGS = ".!?"
+
+
+class StopChecker:
+    """Incremental stop detection for one request.
+
+    Fed every generated token, it tracks the decoded text and reports when a
+    stop sequence appears or the answer has max_sentences complete sentences.
+    With a deadline, it stops at the first sentence end after soft_deadline
+    and unconditionally at hard_deadline (both wall-clock times).
+    stop_index marks where the answer text should end.
+    """
+
+    def __init__(self, tokenizer, stop_sequences: Optional[List[str]] = None, max_sentences: Optional[int] = None,
+                 soft_deadline: Optional[float] = None, hard_deadline: Optional[float] = None):
+        self.tokenizer = tokenizer
+        self.stop_sequences = [s for s in (stop_sequences or []) if s]
+        self.max_sentences = max_sentences
+        self.soft_deadline = soft_deadline
+        self.hard_deadline = hard_deadline
+        self.detokenizer = IncrementalDetokenizer(tokenizer)
+        self.token_ids: List[int] = []
+        self.text = ""
+        self.sentences = 0
+        self.scanned = 0
+        self.stop_index: Optional[int] = None
+        self.reason: Optional[str] = None
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_index is not None
+
+    def add(self, token_id: int) -> bool:
+        """Append one token; returns True once generation should stop"""
+        if self.stopped:
+            return True
+        self.token_ids.append(token_id)
+        delta = self.detokenizer.add(token_id)
+        if delta:
+            self.text += delta
+            self._scan(delta)
+        if not self.stopped and self.hard_deadline is not None and time.time() >= self.hard_deadline:
+            self.stop_index, self.reason = len(self.text), "deadline"
+        return self.stopped
+
+    def _scan(self, delta: str):
+        # Only the tail can contain a stop sequence that wasn't there before
+        window = max((len(s) for s in self.stop_sequences), default=0) + len(delta)
+        tail_start = max(0, len(self.text) - window)
+        for sequence in self.stop_sequences:
+            index = self.text.find(sequence, tail_start)
+            if index != -1 and (self.stop_index is None or index < self.stop_index):
+                self.stop_index, self.reason = index, "stop_sequence"
+        if self.stopped:
+            return
+
+        if self.max_sentences or self.soft_deadline is not None:
+            # A terminator counts once the following whitespace confirms it ("3.14" is not a sentence end)
+            for i in range(self.scanned, len(self.text) - 1):
+                if self.text[i] in SENTENCE_ENDINGS and self.text[i + 1].isspace():
+                    self.sentences += 1
+                    if self.max_sentences and self.sentences >= self.max_sentences:
+                        self.stop_index, self.reason = i + 1, "max_sentences"
+                        return
+                    if self.soft_deadline is not None and time.time() >= self.soft_deadline:
+                        self.stop_index, self.reason = i + 1, "deadline"
+                        return
+            self.scanned = max(self.scanned, len(self.text) - 1)
+
+    def kept_tokens(self) -> int:
+        """Number of generated tokens that lie entirely before the stop point"""
+        if not self.stopped:
+            return len(self.token_ids)
+        for count in range(len(self.token_ids), -1, -1):
+            text = self.tokenizer.decode(self.token_ids[:count], skip_special_tokens=True)
+            if len(text) <= self.stop_index:
+                return count
+        return 0
+
+    def holdback(self, text: str) -> int:
+        """Length of text that is safe to stream: never emit a possible stop-sequence prefix"""
+        if self.stop_index is not None:
+            return min(len(text), self.stop_index)
+        for size in range(min(len(text), max((len(s) for s in self.stop_sequences), default=0)), 0, -1):
+            if any(s.startswith(text[-size:]) for s in self.stop_sequences):
+                return len(text) - size
+        return len(text)
+
+
+class CancelledCriteria(StoppingCriteria):
+    """Ends model.generate once the request is cancelled (e.g. its stream client went away)"""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.request.cancelled, dtype=torch.bool, device=input_ids.device)
+
+
+class StopCheckerCriteria(StoppingCriteria):
+    """Adapter so model.generate consults a StopChecker after every token (batch size 1)"""
+
+    def __init__(self, checker: StopChecker):
+        self.checker = checker
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor, **kwargs) -> torch.BoolTensor:
+        stop = self.checker.add(int(input_ids[0, -1]))
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+TurboTalk AI Streaming Utilities
+Incremental detokenization and server-sent-event helpers for token streaming
+Company: Rango Productions
+Created by: Rushi Bhavinkumar Soni (CEO/Founder)
+"""
+
+import json
+import queue
+from typing import Dict, List, Optional
+
+from transformers.generation.streamers import BaseStreamer
+
+
+class IncrementalDetokenizer:
+    """Turns a growing list of token ids into text deltas.
+
+    Only a small window of recent tokens is decoded per step, and output is
+    held back while the window ends in a partial multi-byte character.
+    """
+
+    def __init__(self, tokenizer, skip_special_tokens: bool = True):
+        self.tokenizer = tokenizer
+        self.skip_special_tokens = skip_special_tokens
+        self.token_ids: List[int] = []
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+    def add(self, token_id: int) -> str:
+        """Append one token and return the newly completed text (may be empty)"""
+        self.token_ids.append(token_id)
+        prefix_text = self.tokenizer.decode(
+            self.token_ids[self.prefix_offset:self.read_offset],
+            skip_special_tokens=self.skip_special_tokens
+        )
+        new_text = self.tokenizer.decode(
+            self.token_ids[self.prefix_offset:],
+            skip_special_tokens=self.skip_special_tokens
+        )
+
+        if len(new_text) > len(prefix_text) and not new_text.endswith("\ufffd"):
+            self.prefix_offset = self.read_offset
+            self.read_offset = len(self.token_ids)
+            return new_text[len(prefix_text):]
+        return ""
+
+
+class TokenQueueStreamer(BaseStreamer):
+    """`model.generate` streamer that hands new token ids to another thread"""
+
+    def __init__(self, token_queue: "queue.Queue[Optional[int]]"):
+        self.queue = token_queue
+        self._prompt_seen = False
+
+    def put(self, value):
+        # generate() pushes the prompt first; only forward generated tokens
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        for token_id in value.reshape(-1).tolist():
+            self.queue.put(token_id)
+
+    def end(self):
+        pass  # the caller closes the queue once outputs are collected
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import BATCH, INTERACTIVE, RESEARCH, SHORT, AdmissionController, AdmissionRejected
+from deadline import Deadline
+
+
+def controller(**kwargs):
+    return AdmissionController(memory_percent=None, **kwargs)
+
+
+def test_admits_up_to_max_running_then_queues():
+    admission = controller(max_running=1, max_queue=4)
+    first = admission.acquire()
+    waiter = threading.Thread(target=lambda: admission.release(admission.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    assert admission.get_stats()["queue_depth"] == 1
+
+    admission.release(first)
+    waiter.join(1)
+    stats = admission.get_stats()
+    assert stats["admitted"] == 2 and stats["running"] == 0 and stats["queue_depth"] == 0
+
+
+def test_full_queue_rejects_with_429():
+    admission = controller(max_running=1, max_queue=1)
+    admission.acquire()
+    admission._enqueue(INTERACTIVE, SHORT)
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire()
+    assert rejected.value.status == 429 and rejected.value.retry_after >= 1
+
+
+def test_batch_requests_get_a_share_of_the_queue():
+    admission = controller(max_running=1, max_queue=2, batch_queue_share=0.5)
+    admission.acquire()
+    admission._enqueue(BATCH, SHORT)
+    with pytest.raises(AdmissionRejected):
+        admission.acquire(BATCH, SHORT)
+    admission._enqueue(INTERACTIVE, SHORT)
+
+
+def test_memory_pressure_rejects_with_503(monkeypatch):
+    monkeypatch.setattr("admission.memory_percent", lambda: 95.0)
+    admission = AdmissionController(memory_percent=90.0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire()
+    assert rejected.value.status == 503
+
+
+def test_wait_is_capped_by_the_deadline():
+    admission = controller(max_running=1, max_wait_s=30)
+    admission.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire(deadline=Deadline(50))
+    assert rejected.value.status == 503
+    assert admission.get_stats()["timed_out"] == 1
+    assert admission.get_stats()["queue_depth"] == 0
+
+
+def test_interactive_then_shortest_job_first():
+    admission = controller(max_running=1, aging_ms_per_s=0)
+    running = admission.acquire()
+    batch = admission._enqueue(BATCH, SHORT)
+    research = admission._enqueue(INTERACTIVE, RESEARCH)
+    short = admission._enqueue(INTERACTIVE, SHORT)
+
+    order = []
+    for _ in range(3):
+        admission.release(running)
+        running = next(t for t in (batch, research, short) if t.event.is_set() and t not in order)
+        order.append(running)
+    assert order == [short, research, batch]
+
+
+def test_release_is_idempotent_and_drops_queued_tickets():
+    admission = controller(max_running=1)
+    first = admission.acquire()
+    queued = admission._enqueue(INTERACTIVE, SHORT)
+    admission.release(queued)
+    assert admission.get_stats()["queue_depth"] == 0
+    admission.release(first)
+    admission.release(first)
+    assert admission.get_stats()["running"] == 0
+
+
+def test_async_admission_waits_without_a_thread():
+    async def scenario():
+        admission = controller(max_running=1)
+        first = await admission.acquire_async()
+        waiting = asyncio.ensure_future(admission.acquire_async())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        admission.release(first)
+        second = await asyncio.wait_for(waiting, 1)
+        admission.release(second)
+        return admission.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2 and stats["running"] == 0
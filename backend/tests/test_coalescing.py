@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import pytest
+
+from coalescing import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers=5):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(key, fn))) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    return results
+
+
+def slow(value, calls):
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return value
+    return fn
+
+
+def test_concurrent_calls_share_one_execution():
+    flight, calls = SingleFlight(), []
+    results = run_concurrently(flight, "k", slow(42, calls))
+    assert len(calls) == 1
+    assert sorted(results) == [(42, False)] + [(42, True)] * 4
+    stats = flight.get_stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flight, calls = SingleFlight(), []
+    threads = [threading.Thread(target=flight.do, args=(key, slow(key, calls))) for key in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert len(calls) == 2
+
+
+def test_results_are_not_kept_after_the_call():
+    flight, calls = SingleFlight(), []
+    flight.do("k", slow(1, calls))
+    flight.do("k", slow(2, calls))
+    assert len(calls) == 2
+
+
+def test_leader_exception_reaches_waiters():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("search failed")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert errors == ["search failed"] * 3
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_waiter_timeout_leaves_the_leader_running():
+    flight, calls = SingleFlight(), []
+    leader = threading.Thread(target=lambda: calls.append(flight.do("k", slow("done", []))))
+    leader.start()
+    time.sleep(0.02)
+    with pytest.raises(FuturesTimeoutError):
+        flight.do("k", slow("unused", []), timeout=0.01)
+    leader.join(2)
+    assert calls == [("done", False)]
+    assert flight.get_stats()["waiter_timeouts"] == 1
+
+
+def test_async_callers_coalesce():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "sources"
+
+        results = await asyncio.gather(*(flight.do_async("k", fetch) for _ in range(4)))
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(results) == [("sources", False)] + [("sources", True)] * 3
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from compiled_generation import CompiledGenerator
+
+
+def make_generator(buckets=(128, 256, 512, 1024), max_new_tokens=250, n_positions=1024):
+    model = SimpleNamespace(config=SimpleNamespace(n_positions=n_positions))
+    tokenizer = SimpleNamespace(pad_token_id=None, eos_token_id=50256)
+    return CompiledGenerator(model, tokenizer, buckets=buckets, max_new_tokens=max_new_tokens)
+
+
+def test_buckets_that_overflow_the_context_are_dropped():
+    generator = make_generator(buckets=(512, 128, 1024, 256))
+    assert generator.buckets == [128, 256, 512]
+
+
+def test_bucket_for_picks_the_smallest_that_fits():
+    generator = make_generator()
+    assert generator.bucket_for(1) == 128
+    assert generator.bucket_for(128) == 128
+    assert generator.bucket_for(129) == 256
+    assert generator.bucket_for(513) is None
+
+
+def test_not_accepting_until_warmed_up():
+    generator = make_generator()
+    assert not generator.accepts(10)
+    generator.enabled = True
+    assert generator.accepts(10)
+    assert not generator.accepts(600)
+
+
+def test_pad_left_pads_to_the_bucket_with_eos():
+    generator = make_generator()
+    input_ids = torch.tensor([[5, 6, 7]])
+    padded, attention_mask = generator._pad(input_ids)
+    assert padded.shape == (1, 128) and attention_mask.shape == (1, 128)
+    assert padded[0, -3:].tolist() == [5, 6, 7]
+    assert (padded[0, :-3] == 50256).all()
+    assert attention_mask[0, :-3].sum() == 0 and attention_mask[0, -3:].tolist() == [1, 1, 1]
@@ -0,0 +1,24 @@
+import time
+
+from deadline import Deadline
+
+
+def test_remaining_never_goes_negative():
+    deadline = Deadline(10)
+    time.sleep(0.02)
+    assert deadline.remaining_ms() == 0.0
+    assert not deadline.report()["met"]
+
+
+def test_at_is_a_share_of_the_remaining_budget():
+    deadline = Deadline(1000)
+    now = time.time()
+    assert now + 0.4 <= deadline.at(0.5) <= now + 0.51
+
+
+def test_report_lists_trimmed_stages():
+    deadline = Deadline(5000)
+    deadline.trim("research", "2 of 5 searches")
+    report = deadline.report()
+    assert report["met"] and report["deadline_ms"] == 5000
+    assert report["trimmed"] == {"research": "2 of 5 searches"}
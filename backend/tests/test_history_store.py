@@ -0,0 +1,70 @@
+import time
+
+from history_store import ConversationStore
+
+
+def turn(text):
+    return {"user": text, "assistant": f"re: {text}"}
+
+
+def test_keeps_last_max_turns_in_memory():
+    store = ConversationStore(max_turns=3)
+    for i in range(5):
+        store.append("s", turn(i))
+    assert [t["user"] for t in store.turns("s")] == [2, 3, 4]
+    assert store.get_stats()["trimmed_turns"] == 2
+
+
+def test_evicts_least_recently_used_session():
+    store = ConversationStore(max_sessions=2)
+    store.append("a", turn(1))
+    store.append("b", turn(1))
+    store.turns("a")
+    store.append("c", turn(1))
+    assert set(store.sessions) == {"a", "c"}
+    assert store.get_stats()["evicted_sessions"] == 1
+
+
+def test_idle_sessions_expire():
+    store = ConversationStore(ttl_s=0.01)
+    store.append("old", turn(1))
+    time.sleep(0.02)
+    store.append("new", turn(1))
+    assert list(store.sessions) == ["new"]
+    assert store.get_stats()["expired_sessions"] == 1
+
+
+def test_evicted_session_reloads_from_disk(tmp_path):
+    store = ConversationStore(db_path=str(tmp_path / "history.db"), max_sessions=1)
+    store.append("a", turn(1))
+    store.append("b", turn(1))
+    store.close()
+    assert "a" not in store.sessions
+
+    assert [t["user"] for t in store.turns("a")] == [1]
+    assert store.get_stats()["loaded_from_disk"] == 1
+
+
+def test_append_after_eviction_keeps_stored_turns(tmp_path):
+    store = ConversationStore(db_path=str(tmp_path / "history.db"), max_sessions=1)
+    store.append("a", turn(1))
+    store.append("a", turn(2))
+    store.append("b", turn(1))
+    store.close()
+    assert "a" not in store.sessions
+
+    store.append("a", turn(3))
+    assert [t["user"] for t in store.turns("a")] == [1, 2, 3]
+    store.close()
+    assert [t["user"] for t in store._load("a")] == [1, 2, 3]
+
+
+def test_shared_stores_see_each_others_turns(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    worker_a = ConversationStore(db_path=db_path, shared=True)
+    worker_b = ConversationStore(db_path=db_path, shared=True)
+    worker_a.append("s", turn(1))
+    worker_b.append("s", turn(2))
+    assert [t["user"] for t in worker_a.turns("s")] == [1, 2]
+    assert [t["user"] for t in worker_b.turns("s", limit=1)] == [2]
+    assert not worker_a.sessions and not worker_b.sessions
@@ -0,0 +1,99 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from paged_kv_cache import KVCacheFullError, PagedKVCache
+
+LAYERS, HEADS, HEAD_DIM, BLOCK = 2, 2, 4, 4
+
+
+def make_cache(num_blocks=8):
+    block_bytes = 2 * LAYERS * HEADS * BLOCK * HEAD_DIM * 4
+    return PagedKVCache(LAYERS, HEADS, HEAD_DIM, num_blocks * block_bytes, block_size=BLOCK)
+
+
+def legacy(seq_len, offset=0.0):
+    """Single-row cache whose values identify layer, head, position and dim"""
+    layers = []
+    for layer in range(LAYERS):
+        k = torch.arange(HEADS * seq_len * HEAD_DIM, dtype=torch.float32).reshape(1, HEADS, seq_len, HEAD_DIM)
+        k = k + 1000 * layer + offset
+        layers.append((k, -k))
+    return tuple(layers)
+
+
+def test_fork_shares_blocks_and_free_releases_at_zero_refs():
+    cache = make_cache()
+    cache.allocate("a")
+    cache.append("a", legacy(6))
+    cache.fork("a", "b")
+    blocks = cache.block_tables["a"]
+    assert cache.block_tables["b"] == blocks
+    assert [cache.ref_counts[block] for block in blocks] == [2, 2]
+    assert cache.get_stats()["shared_blocks"] == 2
+
+    cache.free("a")
+    assert [cache.ref_counts[block] for block in blocks] == [1, 1]
+    assert len(cache.free_blocks) == 6
+
+    cache.free("b")
+    assert len(cache.free_blocks) == 8
+    assert cache.get_stats()["used_blocks"] == 0
+
+
+def test_write_into_shared_block_copies_it():
+    cache = make_cache()
+    cache.allocate("a")
+    cache.append("a", legacy(6))
+    cache.fork("a", "b")
+    full, partial = cache.block_tables["a"]
+
+    block, offset = cache.reserve_slot("b")
+    assert block != partial and offset == 2
+    assert cache.block_tables["b"] == [full, block]
+    assert cache.block_tables["a"] == [full, partial]
+    assert cache.ref_counts[full] == 2
+    assert cache.ref_counts[partial] == 1 and cache.ref_counts[block] == 1
+    assert cache.get_stats()["cow_copies"] == 1
+    assert torch.equal(cache.key_pool[:, block, :, :2], cache.key_pool[:, partial, :, :2])
+
+    # The fork's writes stay out of the original sequence
+    cache.key_pool[:, block, :, offset] = -1.0
+    cache.seq_lens["b"] += 1
+    gathered, _ = cache.gather(["a"])
+    assert torch.equal(gathered[0][0], legacy(6)[0][0])
+
+
+def test_reserve_in_unshared_block_does_not_copy():
+    cache = make_cache()
+    cache.allocate("a")
+    cache.append("a", legacy(6))
+    partial = cache.block_tables["a"][1]
+    assert cache.reserve_slot("a") == (partial, 2)
+    assert cache.get_stats()["cow_copies"] == 0
+
+
+def test_gather_left_pads_shorter_sequences():
+    cache = make_cache()
+    cache.allocate("long")
+    cache.append("long", legacy(6))
+    cache.allocate("short")
+    cache.append("short", legacy(3, offset=0.5))
+
+    batch, lengths = cache.gather(["long", "short"])
+    assert lengths == [6, 3]
+    for layer, (k, v) in enumerate(batch):
+        assert k.shape == (2, HEADS, 6, HEAD_DIM)
+        assert torch.equal(k[0:1], legacy(6)[layer][0])
+        assert torch.equal(k[1:2, :, 3:], legacy(3, offset=0.5)[layer][0])
+        assert not k[1, :, :3].any()
+        assert torch.equal(v, -k)
+
+
+def test_out_of_blocks_raises():
+    cache = make_cache(num_blocks=2)
+    cache.allocate("a")
+    cache.append("a", legacy(8))
+    assert not cache.can_allocate(1)
+    with pytest.raises(KVCacheFullError):
+        cache.reserve_slot("a")
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from kv_cache import PrefixKVCache
+
+
+class PrefixTokenizer:
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+
+class CacheModel:
+    """Returns a legacy cache with one position per input token"""
+
+    def __call__(self, input_ids, use_cache=True):
+        seq_len = input_ids.shape[1]
+        layer = (torch.zeros(1, 2, seq_len, 4), torch.ones(1, 2, seq_len, 4))
+        return SimpleNamespace(past_key_values=(layer, layer))
+
+
+def built_cache(prefix="sys"):
+    cache = PrefixKVCache()
+    cache.build(CacheModel(), PrefixTokenizer(), prefix)
+    return cache
+
+
+def test_match_requires_extending_the_prefix():
+    cache = built_cache("sys")
+    assert cache.match([ord(c) for c in "sys: hi"]) is cache.past_key_values
+    assert cache.match([ord(c) for c in "sys"]) is None
+    assert cache.match([ord(c) for c in "other"]) is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["tokens_saved"]) == (1, 2, 3)
+
+
+def test_rebuilt_when_prefix_text_changes():
+    cache = built_cache("sys")
+    assert cache.is_current("sys")
+    assert not cache.is_current("new system prompt")
+    cache.invalidate()
+    assert not cache.is_current("sys")
+    assert cache.match([ord(c) for c in "sys: hi"]) is None
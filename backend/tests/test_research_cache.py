@@ -0,0 +1,54 @@
+import time
+
+from research_cache import ResearchCache
+
+SOURCES = [{"title": "Printing press", "content": "Invented around 1440.", "url": "https://example.org"}]
+
+
+def test_hit_is_keyed_on_decision_and_source_count():
+    cache = ResearchCache()
+    cache.put("printing press", "light_search", 3, SOURCES)
+    assert cache.get("printing press", "light_search", 3) == SOURCES
+    assert cache.get("printing press", "deep_search", 3) is None
+    assert cache.get("printing press", "light_search", 5) is None
+
+
+def test_current_queries_use_the_short_ttl():
+    cache = ResearchCache(ttl_s=60, current_ttl_s=0.01)
+    cache.put("latest news", "light_search", 3, SOURCES, current=True)
+    cache.put("printing press", "light_search", 3, SOURCES)
+    time.sleep(0.02)
+    assert cache.get("latest news", "light_search", 3) is None
+    assert cache.get("printing press", "light_search", 3) == SOURCES
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResearchCache(max_entries=2)
+    for query in ("a", "b"):
+        cache.put(query, "light_search", 3, SOURCES)
+    cache.get("a", "light_search", 3)
+    cache.put("c", "light_search", 3, SOURCES)
+    assert cache.get("b", "light_search", 3) is None
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / "research.db")
+    ResearchCache(db_path=db_path).put("printing press", "light_search", 3, SOURCES)
+
+    other_worker = ResearchCache(db_path=db_path)
+    assert other_worker.get("printing press", "light_search", 3) == SOURCES
+    stats = other_worker.get_stats()
+    assert stats["disk_hits"] == 1 and stats["disk_entries"] == 1
+    assert other_worker.get("printing press", "light_search", 3) == SOURCES
+    assert other_worker.get_stats()["memory_hits"] == 1
+
+
+def test_sweep_drops_expired_rows_and_caps_the_disk(tmp_path):
+    cache = ResearchCache(db_path=str(tmp_path / "research.db"), current_ttl_s=0.01, max_disk_entries=2, sweep_every=4)
+    cache.put("old", "light_search", 3, SOURCES, current=True)
+    time.sleep(0.02)
+    for query in ("a", "b", "c"):
+        cache.put(query, "light_search", 3, SOURCES)
+    assert cache.disk_entries() == 2
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from response_cache import EXACT_HIT, SEMANTIC_HIT, ResponseCache, normalize_prompt
+
+
+def test_normalize_prompt_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_prompt("  What is  AI?? ") == normalize_prompt("what is ai") == "what is ai"
+
+
+def test_exact_hit_stays_within_its_partition():
+    cache = ResponseCache()
+    cache.put("What is AI?", ("research", 0.7), {"response": "A field."}, cost_s=2.0)
+    entry, kind = cache.get("what is ai", ("research", 0.7))
+    assert kind == EXACT_HIT and entry.value == {"response": "A field."}
+    assert cache.get("what is ai", ("no_research", 0.7)) is None
+    assert cache.get_stats()["latency_saved_s"] == 2.0
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl_s=0.01)
+    cache.put("hi", "p", {"response": "hello"}, cost_s=1.0)
+    time.sleep(0.02)
+    assert cache.get("hi", "p") is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_least_recently_used_evicted_beyond_max_bytes():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("a", "p", {"response": "x" * 20}, cost_s=1.0)
+    cache.put("b", "p", {"response": "x" * 20}, cost_s=1.0)
+    cache.get("a", "p")
+    cache.put("c", "p", {"response": "x" * 20}, cost_s=1.0)
+    assert cache.get("b", "p") is None
+    assert cache.get("a", "p") is not None and cache.get("c", "p") is not None
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_semantic_hit_above_the_similarity_threshold():
+    vectors = {"what is ai": [1.0, 0.0], "explain ai": [0.99, 0.14], "weather today": [0.0, 1.0]}
+    cache = ResponseCache(embed=lambda text: torch.nn.functional.normalize(torch.tensor(vectors[text]), dim=0),
+                          similarity_threshold=0.9)
+    cache.put("What is AI?", "p", {"response": "A field."}, cost_s=1.0)
+    entry, kind = cache.get("Explain AI", "p")
+    assert kind == SEMANTIC_HIT and entry.text == "what is ai"
+    assert cache.get("Weather today", "p") is None
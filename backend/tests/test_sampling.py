@@ -0,0 +1,65 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from sampling import BatchSampler, SamplingParams, seeded_global_rng, warp_batch
+
+
+def test_top_k_keeps_only_the_k_most_likely():
+    logits = torch.tensor([[4.0, 3.0, 2.0, 1.0]])
+    probs = warp_batch(logits, [[]], [SamplingParams(temperature=1.0, top_k=2, top_p=1.0, repetition_penalty=1.0)])
+    assert (probs[0, 2:] == 0).all()
+    assert torch.allclose(probs[0, :2], torch.softmax(logits[0, :2], dim=-1))
+
+
+def test_top_p_keeps_the_smallest_prefix_reaching_p():
+    logits = torch.log(torch.tensor([[0.5, 0.3, 0.15, 0.05]]))
+    probs = warp_batch(logits, [[]], [SamplingParams(temperature=1.0, top_k=0, top_p=0.7, repetition_penalty=1.0)])
+    assert probs[0, 2:].sum() == 0
+    assert torch.allclose(probs[0, :2], torch.tensor([0.625, 0.375]))
+
+
+def test_top_p_always_keeps_the_best_token():
+    logits = torch.tensor([[2.0, 1.0, 0.0]])
+    probs = warp_batch(logits, [[]], [SamplingParams(temperature=1.0, top_k=0, top_p=0.0, repetition_penalty=1.0)])
+    assert probs[0].tolist() == [1.0, 0.0, 0.0]
+
+
+def test_repetition_penalty_only_hits_seen_tokens():
+    logits = torch.tensor([[2.0, -2.0, 2.0]])
+    params = SamplingParams(temperature=1.0, top_k=0, top_p=1.0, repetition_penalty=2.0)
+    probs = warp_batch(logits, [[0, 1]], [params])
+    expected = torch.softmax(torch.tensor([1.0, -4.0, 2.0]), dim=-1)
+    assert torch.allclose(probs[0], expected)
+
+
+def test_rows_use_their_own_settings():
+    logits = torch.tensor([[4.0, 3.0, 2.0, 1.0]] * 2)
+    params = [
+        SamplingParams(temperature=1.0, top_k=1, top_p=1.0, repetition_penalty=1.0),
+        SamplingParams(temperature=1.0, top_k=0, top_p=1.0, repetition_penalty=1.0),
+    ]
+    probs = warp_batch(logits, [[], []], params)
+    assert probs[0].tolist() == [1.0, 0.0, 0.0, 0.0]
+    assert (probs[1] > 0).all()
+    assert torch.allclose(probs.sum(dim=-1), torch.ones(2))
+
+
+def test_seeded_rows_sample_the_same_tokens_whatever_the_batch():
+    params = SamplingParams(temperature=1.0, top_k=0, top_p=1.0, repetition_penalty=1.0, seed=3)
+    logits = torch.zeros(1, 50)
+    alone = BatchSampler().sample(logits, [[]], [params], [params.make_generator()])
+    other = SamplingParams(temperature=1.0, top_k=0, top_p=1.0, repetition_penalty=1.0, seed=11)
+    batched = BatchSampler().sample(logits.repeat(2, 1), [[], []], [other, params],
+                                    [other.make_generator(), params.make_generator()])
+    assert batched[1] == alone[0]
+
+
+def test_seeded_global_rng_reproduces_and_restores_state():
+    before = torch.random.get_rng_state()
+    with seeded_global_rng(5):
+        first = torch.rand(3)
+    assert torch.equal(torch.random.get_rng_state(), before)
+    with seeded_global_rng(5):
+        second = torch.rand(3)
+    assert torch.equal(first, second)
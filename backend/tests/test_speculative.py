@@ -0,0 +1,46 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from speculative import verify_draft
+
+VOCAB = 5
+
+
+def softmax(logits, context_ids):
+    return torch.softmax(logits, dim=-1)
+
+
+def peaked(*tokens):
+    """One logits row per token, putting (almost) all probability on it"""
+    logits = torch.full((len(tokens), VOCAB), -1e9)
+    for row, token in enumerate(tokens):
+        logits[row, token] = 0.0
+    return logits
+
+
+def test_fully_accepted_draft_earns_a_bonus_token():
+    tokens = verify_draft(peaked(1, 2, 3, 4), [0], [1, 2, 3], None, softmax)
+    assert tokens == [1, 2, 3, 4]
+
+
+def test_first_rejection_is_resampled_and_ends_the_step():
+    # The model wants 3 where the draft proposed 2; the draft's remaining tokens are discarded
+    tokens = verify_draft(peaked(1, 3, 0, 0), [0], [1, 2, 4], None, softmax)
+    assert tokens == [1, 3]
+
+
+def test_draft_matching_the_model_distribution_is_always_accepted():
+    logits = torch.randn(3, VOCAB)
+    draft_probs = [torch.softmax(row, dim=-1) for row in logits[:2]]
+    for seed in range(20):
+        generator = torch.Generator().manual_seed(seed)
+        tokens = verify_draft(logits, [0], [1, 2], draft_probs, softmax, generator)
+        assert tokens[:2] == [1, 2] and len(tokens) == 3
+
+
+def test_seeded_generator_reproduces_tokens():
+    logits = torch.zeros(4, VOCAB)
+    runs = [verify_draft(logits, [0], [1, 2, 3], None, softmax, torch.Generator().manual_seed(7)) for _ in range(2)]
+    assert runs[0] == runs[1]
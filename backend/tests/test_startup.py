@@ -0,0 +1,35 @@
+import time
+
+from startup import BackgroundStartup, StartupProfiler
+
+
+def test_phases_accumulate_and_the_total_stops_at_the_report():
+    profiler = StartupProfiler()
+    for _ in range(2):
+        with profiler.phase("load"):
+            time.sleep(0.01)
+    with profiler.phase("engine"):
+        pass
+    profiler.print_report()
+    report = profiler.report()
+    assert list(report["phases_ms"]) == ["load", "engine"]
+    assert report["phases_ms"]["load"] >= 20
+    time.sleep(0.01)
+    assert profiler.report()["total_ms"] == report["total_ms"]
+
+
+def test_background_startup_reports_ready():
+    task = BackgroundStartup(lambda: True)
+    assert task.status() == {"state": "starting", "ready": False, "error": None}
+    task.start()
+    task._thread.join(1)
+    assert task.ready and task.ready_at is not None
+
+
+def test_background_startup_reports_failures():
+    def fail():
+        raise RuntimeError("no weights")
+
+    task = BackgroundStartup(fail)
+    assert not task.run()
+    assert task.status() == {"state": "failed", "ready": False, "error": "no weights"}
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from stopping import StopChecker
+
+
+class PieceTokenizer:
+    """Token id i decodes to pieces[i]"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return "".join(self.pieces[i] for i in token_ids)
+
+
+def feed(checker, count):
+    return [checker.add(i) for i in range(count)]
+
+
+def test_stop_sequence_split_across_tokens():
+    checker = StopChecker(PieceTokenizer(["Hello", " there", ".\n", "Us", "er:", " more"]), ["\nUser:"])
+    assert feed(checker, 5) == [False, False, False, False, True]
+    assert checker.reason == "stop_sequence"
+    assert checker.text[:checker.stop_index] == "Hello there."
+    # ".\n" straddles the stop point, so only the first two tokens lie wholly before it
+    assert checker.kept_tokens() == 2
+    assert checker.add(5)
+
+
+def test_holdback_never_streams_a_stop_sequence_prefix():
+    checker = StopChecker(PieceTokenizer(["Hi", "\n", "Us", "ing"]), ["\nUser:"])
+    checker.add(0)
+    assert checker.holdback(checker.text) == 2
+    checker.add(1)
+    assert checker.holdback(checker.text) == 2
+    checker.add(2)
+    assert checker.holdback(checker.text) == 2
+    # "\nUsing" can no longer become "\nUser:": everything is released
+    checker.add(3)
+    assert checker.holdback(checker.text) == len("Hi\nUsing")
+    assert not checker.stopped
+
+
+def test_holdback_after_stop_ends_at_the_stop_point():
+    checker = StopChecker(PieceTokenizer(["Yes", "\nUser:"]), ["\nUser:"])
+    feed(checker, 2)
+    assert checker.holdback(checker.text) == 3
+
+
+def test_max_sentences_ends_after_the_last_full_sentence():
+    checker = StopChecker(PieceTokenizer(["Pi is 3.14", ". Two", ". Three", ". Four"]), max_sentences=2)
+    assert feed(checker, 4) == [False, False, True, True]
+    assert checker.reason == "max_sentences"
+    assert checker.text[:checker.stop_index] == "Pi is 3.14. Two."
+
+
+def test_hard_deadline_stops_immediately():
+    checker = StopChecker(PieceTokenizer(["a", "b"]), hard_deadline=time.time() - 1)
+    assert checker.add(0)
+    assert checker.reason == "deadline"
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from streaming import IncrementalDetokenizer, format_sse
+
+
+class ByteTokenizer:
+    """One token per UTF-8 byte, so a multi-byte character spans several tokens"""
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return bytes(token_ids).decode("utf-8", errors="replace")
+
+
+def test_deltas_concatenate_to_the_full_text():
+    detokenizer = IncrementalDetokenizer(ByteTokenizer())
+    text = "Hi there"
+    deltas = [detokenizer.add(byte) for byte in text.encode("utf-8")]
+    assert "".join(deltas) == text
+
+
+def test_partial_multibyte_character_is_held_back():
+    detokenizer = IncrementalDetokenizer(ByteTokenizer())
+    first, second = "é".encode("utf-8")
+    assert detokenizer.add(ord("a")) == "a"
+    assert detokenizer.add(first) == ""
+    assert detokenizer.add(second) == "é"
+
+
+def test_format_sse():
+    event = format_sse("token", {"text": "hi"})
+    assert event.startswith("event: token\ndata: ")
+    assert event.endswith("\n\n")
+    assert json.loads(event.split("data: ", 1)[1]) == {"text": "hi"}